@@ -0,0 +1,301 @@
+import os
+import math
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+
+from src.metrics import ADMISSION_QUEUED, ADMISSION_SHED, ADMISSION_UTILIZATION
+
+
+def _weights(value: str) -> dict:
+    # "name=number,..." -> {name: number}
+    weights = {}
+    for item in value.split(","):
+        if item.strip():
+            name, _, number = item.partition("=")
+            weights[name.strip()] = float(number)
+    return weights
+
+
+# 0 admits every request immediately
+ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "1") != "0"
+# Cost units admitted at once across all endpoints (about one unit per slide rendered)
+ADMISSION_GLOBAL_BUDGET = float(os.environ.get("ADMISSION_GLOBAL_BUDGET", 400))
+# Per-endpoint budgets as "endpoint=units,..."; unlisted endpoints only have the global one
+ADMISSION_BUDGETS = _weights(os.environ.get(
+    "ADMISSION_BUDGETS",
+    "generate_presentation=300,generate_ppt_with_audio=200,generate_presentations_batch=300,generate_json_content=150",
+))
+# Longest a request waits for budget before it is shed with a 429
+ADMISSION_MAX_WAIT = float(os.environ.get("ADMISSION_MAX_WAIT", 10))
+# Requests waiting at once; beyond that they are shed right away
+ADMISSION_MAX_QUEUED = int(os.environ.get("ADMISSION_MAX_QUEUED", 64))
+# Cost model: units per request, per slide, per 1000 characters of bullet
+# HTML, per 1000 characters of narrated speaker notes and per 1000 LLM
+# max_tokens
+ADMISSION_COSTS = {
+    "request": 1.0, "slide": 1.0, "html_kchar": 0.5, "notes_kchar": 2.0, "llm_ktoken": 5.0,
+    **_weights(os.environ.get("ADMISSION_COSTS", "")),
+}
+
+
+def deck_cost(prs_content, narrated: bool = False) -> float:
+    """
+    Estimated cost of rendering a deck, and with `narrated` of synthesizing
+    its speaker notes too.
+    """
+    html_chars = 0
+    notes_chars = 0
+    for slide in prs_content.slides:
+        for placeholder in slide.placeholders:
+            for text in placeholder.content or ():
+                html_chars += len(text)
+        if narrated and slide.speaker_notes:
+            notes_chars += len(slide.speaker_notes)
+    return (
+        ADMISSION_COSTS["request"]
+        + ADMISSION_COSTS["slide"] * len(prs_content.slides)
+        + ADMISSION_COSTS["html_kchar"] * html_chars / 1000
+        + ADMISSION_COSTS["notes_kchar"] * notes_chars / 1000
+    )
+
+
+def llm_cost(max_tokens: int) -> float:
+    return ADMISSION_COSTS["request"] + ADMISSION_COSTS["llm_ktoken"] * max_tokens / 1000
+
+
+class AdmissionRejected(RuntimeError):
+    """
+    Raised when a request is shed: too many requests are already waiting,
+    or it waited ADMISSION_MAX_WAIT seconds without getting budget.
+    """
+
+    def __init__(self, endpoint: str, reason: str, retry_after: int):
+        self.endpoint = endpoint
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"{endpoint} is over capacity ({reason}), retry in {retry_after} s")
+
+
+class Ticket:
+    """
+    Budget held by one admitted request; release() is idempotent.
+    """
+
+    def __init__(self, controller: "AdmissionController", endpoint: str, cost: float):
+        self.controller = controller
+        self.endpoint = endpoint
+        self.cost = cost
+        self.started = time.perf_counter()
+        self.released = False
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.controller._release(self)
+
+
+class _Waiter:
+    __slots__ = ("endpoint", "cost", "future")
+
+    def __init__(self, endpoint: str, cost: float, future: asyncio.Future):
+        self.endpoint = endpoint
+        self.cost = cost
+        self.future = future
+
+
+class AdmissionController:
+    """
+    Admits requests by estimated cost against a global budget and
+    per-endpoint budgets. Requests that do not fit wait in FIFO order for
+    a bounded time; a waiter blocked only by its own endpoint's budget
+    lets other endpoints' requests pass, one blocked by the global budget
+    holds everyone behind it so large requests are not starved.
+    """
+
+    def __init__(
+        self,
+        global_budget: float = ADMISSION_GLOBAL_BUDGET,
+        budgets: dict = ADMISSION_BUDGETS,
+        max_wait: float = ADMISSION_MAX_WAIT,
+        max_queued: int = ADMISSION_MAX_QUEUED,
+        enabled: bool = ADMISSION_ENABLED,
+        ):
+        self.global_budget = global_budget
+        self.budgets = dict(budgets)
+        self.max_wait = max_wait
+        self.max_queued = max_queued
+        self.enabled = enabled
+        self.in_use = 0.0
+        self._endpoints = {}
+        self._waiters = deque()
+        # Moving average of request seconds per cost unit, for Retry-After
+        self.seconds_per_unit = 0.0
+        self.counters = {"admitted": 0, "waited": 0, "shed": 0, "wait_seconds_total": 0.0}
+
+    def budget_for(self, endpoint: str) -> float:
+        return min(self.budgets.get(endpoint, self.global_budget), self.global_budget)
+
+    def _endpoint(self, endpoint: str) -> dict:
+        state = self._endpoints.get(endpoint)
+        if state is None:
+            state = self._endpoints[endpoint] = {"in_use": 0.0, "running": 0, "queued": 0, "admitted": 0, "shed": 0}
+        return state
+
+    def _blocked_by(self, endpoint: str, cost: float):
+        if self._endpoint(endpoint)["in_use"] + cost > self.budget_for(endpoint):
+            return "endpoint"
+        if self.in_use + cost > self.global_budget:
+            return "global"
+        return None
+
+    def _take(self, endpoint: str, cost: float) -> Ticket:
+        state = self._endpoint(endpoint)
+        state["in_use"] += cost
+        state["running"] += 1
+        state["admitted"] += 1
+        self.in_use += cost
+        self.counters["admitted"] += 1
+        return Ticket(self, endpoint, cost)
+
+    def _release(self, ticket: Ticket) -> None:
+        state = self._endpoint(ticket.endpoint)
+        state["in_use"] = max(0.0, state["in_use"] - ticket.cost)
+        state["running"] -= 1
+        self.in_use = max(0.0, self.in_use - ticket.cost)
+        sample = (time.perf_counter() - ticket.started) / ticket.cost
+        self.seconds_per_unit = sample if not self.seconds_per_unit else 0.9 * self.seconds_per_unit + 0.1 * sample
+        self._wake()
+
+    def _wake(self) -> None:
+        for waiter in list(self._waiters):
+            if waiter.future.done():
+                self._dequeue(waiter)
+                continue
+            blocked = self._blocked_by(waiter.endpoint, waiter.cost)
+            if blocked == "global":
+                break
+            if blocked is None:
+                self._dequeue(waiter)
+                waiter.future.set_result(self._take(waiter.endpoint, waiter.cost))
+        self._publish()
+
+    def _dequeue(self, waiter: _Waiter) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            return
+        self._endpoint(waiter.endpoint)["queued"] -= 1
+
+    def retry_after(self, cost: float = 0.0) -> int:
+        """
+        Seconds until about `cost` more units of work could be admitted,
+        from the work running and queued and the observed seconds per unit.
+        """
+        backlog = self.in_use + sum(waiter.cost for waiter in self._waiters) + cost
+        # Each running request finishes a unit every seconds_per_unit
+        running = sum(state["running"] for state in self._endpoints.values())
+        seconds = backlog * (self.seconds_per_unit or 0.05) / max(running, 1)
+        return int(min(60, max(1, math.ceil(seconds))))
+
+    def _shed(self, endpoint: str, cost: float, reason: str) -> AdmissionRejected:
+        self._endpoint(endpoint)["shed"] += 1
+        self.counters["shed"] += 1
+        ADMISSION_SHED.inc(1, endpoint, reason)
+        self._publish()
+        return AdmissionRejected(endpoint, reason, self.retry_after(cost))
+
+    async def acquire(self, endpoint: str, cost: float) -> Ticket:
+        """
+        Wait for budget for a request of `cost` units and return its
+        ticket. Costs above the endpoint's budget are capped to it, so a
+        very large request still runs, alone. Raises AdmissionRejected.
+        """
+        cost = max(min(cost, self.budget_for(endpoint)), 0.001)
+        if not self.enabled:
+            ticket = Ticket(self, endpoint, cost)
+            # Nothing was taken, so there is nothing to give back
+            ticket.released = True
+            return ticket
+        if not self._waiters and self._blocked_by(endpoint, cost) is None:
+            ticket = self._take(endpoint, cost)
+            self._publish()
+            return ticket
+        if len(self._waiters) >= self.max_queued:
+            raise self._shed(endpoint, cost, "queue_full")
+        waiter = _Waiter(endpoint, cost, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        self._endpoint(endpoint)["queued"] += 1
+        self.counters["waited"] += 1
+        # Waiters ahead may only be blocked by their own endpoint's budget
+        self._wake()
+        start = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.max_wait):
+                ticket = await waiter.future
+        except TimeoutError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just as the wait ran out
+                ticket = waiter.future.result()
+            else:
+                self._dequeue(waiter)
+                self._wake()
+                raise self._shed(endpoint, cost, "timeout")
+        except BaseException:
+            # The request went away (e.g. client disconnect) while waiting
+            if waiter.future.done() and not waiter.future.cancelled():
+                waiter.future.result().release()
+            else:
+                self._dequeue(waiter)
+                self._wake()
+            raise
+        finally:
+            self.counters["wait_seconds_total"] += time.perf_counter() - start
+        ticket.started = time.perf_counter()
+        return ticket
+
+    @asynccontextmanager
+    async def admit(self, endpoint: str, cost: float):
+        """
+        Hold budget for the block; see acquire().
+        """
+        ticket = await self.acquire(endpoint, cost)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def _publish(self) -> None:
+        ADMISSION_UTILIZATION.set(self.in_use / self.global_budget if self.global_budget else 0.0, "global")
+        for endpoint, state in self._endpoints.items():
+            budget = self.budget_for(endpoint)
+            ADMISSION_UTILIZATION.set(state["in_use"] / budget if budget else 0.0, endpoint)
+            ADMISSION_QUEUED.set(state["queued"], endpoint)
+
+    def stats(self) -> dict:
+        endpoints = {}
+        for endpoint in sorted({*self.budgets, *self._endpoints}):
+            state = self._endpoint(endpoint)
+            budget = self.budget_for(endpoint)
+            endpoints[endpoint] = {
+                "budget": budget,
+                **state,
+                "utilization": round(state["in_use"] / budget, 4) if budget else 0.0,
+            }
+        return {
+            "enabled": self.enabled,
+            "budget": self.global_budget,
+            "in_use": self.in_use,
+            "utilization": round(self.in_use / self.global_budget, 4) if self.global_budget else 0.0,
+            "queued": len(self._waiters),
+            "max_queued": self.max_queued,
+            "max_wait": self.max_wait,
+            "seconds_per_unit": self.seconds_per_unit,
+            "retry_after": self.retry_after(),
+            "endpoints": endpoints,
+            **self.counters,
+        }
+
+
+admission = AdmissionController()
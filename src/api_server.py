@@ -1,365 +1,833 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.staticfiles import StaticFiles
+from starlette.background import BackgroundTask
+from pydantic import AnyHttpUrl, BaseModel, TypeAdapter, ValidationError, field_validator
+from typing import Any, List, Optional, Literal
 import os
 import json
-import tempfile
+import hashlib
+from functools import lru_cache
+import time
+from contextlib import asynccontextmanager, nullcontext
 
 from src.utils import (
-    get_layouts,
     load_prompt_template,
     generate_timestamped_filename,
     ppt_template,
-    process_html,
-    get_reverse_index,
+    prompt_template,
 )
-from src.model import PresentationContent
-from pptx import Presentation
-
-import openai
-import cloudinary
-import cloudinary.uploader
-from docx import Document
-import edge_tts
+from src.layouts import get_registry, reload_registry, LayoutNotFoundError, LayoutRegistry
+from src.llm_cache import completion_cache, completion_key
+from src.render import deck_fingerprint
+from src.docx_engine import (
+    DOCX_BATCH_CHARS,
+    DOCX_TEMPLATE,
+    DOCX_MAX_BYTES,
+    DocxWriter,
+    NdjsonSections,
+    ParagraphSplitter,
+    docx_base,
+    spooled_docx_file,
+    utf8_decoder,
+    write_docx,
+)
+from src.render_pool import render_deck, render_deck_file, sweep_shared_memory, warm_worker
+from src.render_large import LARGE_DECK_SLIDES
+from src.template_cache import template_digest
+from src.deck_cache import deck_cache
+from src.admission import admission, AdmissionRejected, deck_cost, llm_cost
+from src.executor import run_io, executor_stats, ExecutorBusy, cpu_executor, io_executor
+from src.clients import start_clients, close_clients, get_openai_client
+from src.storage import get_storage, object_key, content_digest, StorageError, StoredObject, LocalStorage
+from src.audio import synthesize_deck_audio, voice_for, SlideAudio, AudioBundle
+from src.tts_cache import get_tts_cache
+from src.jobs import JobScheduler, JobQueueFull, check_webhook_url, create_job_store
+from src.model import NarratedPresentationContent, PresentationContent, Slide
+from src.json_stream import SlideStreamParser
+from src.metrics import (
+    PROFILE_HEADER,
+    PROFILE_TOKEN,
+    LLM_TOKENS,
+    REQUEST_SECONDS,
+    annotate,
+    collect,
+    configure_logging,
+    profile_path,
+    profiling,
+    record,
+    render_metrics,
+    stage,
+)
+from loguru import logger
+
 import asyncio
 
-cloudinary.config(
-    cloud_name=os.environ.get("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.environ.get("CLOUDINARY_API_KEY"),
-    api_secret=os.environ.get("CLOUDINARY_API_SECRET"),
-    secure=True
-)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm shared state (already built if src.serve preloaded it before
+    # forking this worker) and open pooled clients once per worker
+    preload()
+    await start_clients()
+    await cpu_executor.prestart()
+    yield
+    await close_clients()
+    io_executor.shutdown()
+    cpu_executor.shutdown()
+    sweep_shared_memory()
 
 app = FastAPI(
+    lifespan=lifespan,
     title="PPT Generator API",
     description="HTTP API for generating PowerPoint presentations, Word documents, JSON content, and adding AI voice narration.",
     version="0.1.0"
 )
 
+configure_logging()
+
+@app.middleware("http")
+async def request_timing(request: Request, call_next):
+    """
+    Time every request's pipeline stages: Server-Timing header, /metrics
+    histograms and one structured log record per request. Requests sending
+    `X-Profile: <PROFILE_TOKEN>` are also run under cProfile.
+    """
+    profile = bool(PROFILE_TOKEN) and request.headers.get(PROFILE_HEADER) == PROFILE_TOKEN
+    start = time.perf_counter()
+    status = 500
+    with collect(profile) as timings:
+        try:
+            with profiling(timings, f"{request.method} {request.url.path}"):
+                response = await call_next(request)
+            status = response.status_code
+            response.headers["Server-Timing"] = timings.server_timing()
+            if profile:
+                response.headers["X-Profile-File"] = timings.notes.get("profile", "")
+            return response
+        finally:
+            elapsed = time.perf_counter() - start
+            # The route template, not the raw path, keeps label cardinality bounded
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(elapsed, request.method, route, str(status))
+            log = logger.bind(
+                method=request.method,
+                route=route,
+                status=status,
+                duration_ms=round(elapsed * 1000, 3),
+                stages=timings.summary(),
+                failed_stage=timings.failed_stage if status >= 500 else None,
+            )
+            if status >= 500:
+                log.error("{} {} {} in {:.1f} ms (failed stage: {})", request.method, request.url.path, status, elapsed * 1000, timings.failed_stage)
+            else:
+                log.info("{} {} {} in {:.1f} ms", request.method, request.url.path, status, elapsed * 1000)
+
 class GeneratePresentationRequest(BaseModel):
-    json_content: dict
+    json_content: PresentationContent
+    # Reuse the unchanged slides of the last deck rendered under the same filename
+    incremental: bool = False
+
+class GeneratePptWithAudioRequest(BaseModel):
+    json_content: NarratedPresentationContent
+    incremental: bool = False
 
 class GenerateJsonContentRequest(BaseModel):
     user_text: str
     theme_mode: Optional[str] = "light"
+    # Stream slides to the client as they are generated
+    stream: bool = False
+    stream_format: Literal["ndjson", "sse"] = "ndjson"
+    # Skip the response cache (identical in-flight requests still coalesce)
+    no_cache: bool = False
+
+LLM_MODEL = os.environ.get("LLM_MODEL", "gpt-3.5-turbo")
+LLM_TEMPERATURE = 0.3
+LLM_MAX_TOKENS = 4096
 
 class GenerateWordDocRequest(BaseModel):
     content: str
     filename: Optional[str] = "blog_post"
+    # "html": paragraphs use the same inline HTML subset as slide bullets
+    format: Literal["text", "html"] = "text"
 
-class GeneratePresentationRequest(BaseModel):
-    json_content: dict
+class JobOptions(BaseModel):
+    priority: int = 0  # higher runs first
+    # http(s) only, on a host in JOB_WEBHOOK_ALLOWED_HOSTS
+    webhook_url: Optional[AnyHttpUrl] = None
+
+    @field_validator("webhook_url")
+    @classmethod
+    def _allowed_webhook(cls, value: Optional[AnyHttpUrl]) -> Optional[AnyHttpUrl]:
+        if value is not None:
+            check_webhook_url(str(value))
+        return value
+
+class SubmitPresentationJobRequest(GeneratePresentationRequest, JobOptions):
+    pass
+
+class SubmitPptWithAudioJobRequest(GeneratePptWithAudioRequest, JobOptions):
+    pass
+
+class GeneratePresentationsBatchRequest(BaseModel):
+    # Checked per deck, so one malformed entry does not fail the batch
+    decks: List[Any]
+
+# Upper bound on decks accepted by /generate_presentations_batch
+BATCH_MAX_DECKS = int(os.environ.get("BATCH_MAX_DECKS", 50))
+
+def preload() -> None:
+    """
+    Build the read-only state requests share instead of on the first
+    request: layout registry, parsed deck template and slide skeletons,
+    HTML parser, Word template and system prompt.
+    """
+    warm_worker(ppt_template)
+    docx_base()
+    try:
+        system_prompt_with_version()
+    except OSError as e:
+        logger.warning("Could not preload the system prompt: {}", e)
+
+# Serve stored artifacts from this app when using the local storage backend
+storage = get_storage()
+if isinstance(storage, LocalStorage):
+    os.makedirs(storage.root, exist_ok=True)
+    app.mount(storage.base_url, StaticFiles(directory=storage.root), name="files")
+
+def body_errors(e: ValidationError) -> list:
+    """
+    Pydantic errors of a request body in FastAPI's 422 format.
+    """
+    errors = []
+    for err in e.errors(include_url=False):
+        err["loc"] = ("body", *err["loc"])
+        if err["type"] == "json_invalid":
+            # The input is the whole raw body
+            err["input"] = {}
+        errors.append(err)
+    return errors
+
+def error_messages(e: ValidationError) -> list:
+    return [err["msg"] + f" at {'.'.join(str(p) for p in err['loc'])}" for err in e.errors()]
+
+def layout_context() -> dict:
+    """
+    Validation context that also checks layouts, placeholders and theme
+    variants against the layout registry (see Slide._check_layout).
+    """
+    return {"registry": get_registry()}
+
+def validate_body(adapter: TypeAdapter, body: bytes):
+    """
+    Validate a raw JSON body in one pass: pydantic's JSON parser straight
+    into the typed models, layout registry checks included, instead of
+    json.loads into dicts and a second validation of those. Raises
+    RequestValidationError (a 422 in FastAPI's format).
+    """
+    with stage("validate"):
+        try:
+            return adapter.validate_json(body, context=layout_context())
+        except ValidationError as e:
+            raise RequestValidationError(body_errors(e))
+
+def json_body(model):
+    """
+    Dependency for a body parameter validated through validate_body().
+    """
+    adapter = TypeAdapter(model)
+
+    async def read_body(request: Request):
+        return validate_body(adapter, await request.body())
+
+    return Depends(read_body)
+
+PRESENTATION_ADAPTER = TypeAdapter(PresentationContent)
+VALIDATE_ADAPTER = TypeAdapter(GeneratePptWithAudioRequest)
+
+def openapi_body(model) -> dict:
+    """
+    openapi_extra documenting `model` as the JSON body of a route that
+    reads the body through json_body().
+    """
+    schema = TypeAdapter(model).json_schema()
+    defs = schema.pop("$defs", {})
+
+    def inline(node):
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return inline(defs[node["$ref"].rsplit("/", 1)[1]])
+            return {key: inline(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [inline(value) for value in node]
+        return node
+
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": inline(schema)}}}}
+
+PPTX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+DOCX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+@app.exception_handler(ExecutorBusy)
+async def executor_busy_handler(request: Request, exc: ExecutorBusy):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": str(exc.retry_after)})
+
+@app.exception_handler(StorageError)
+async def storage_error_handler(request: Request, exc: StorageError):
+    return JSONResponse(status_code=502, content={"detail": f"Storage upload error: {exc}"})
+
+async def store_presentation(
+    prs_content: PresentationContent,
+    incremental: bool = False,
+    render_slots: Optional[asyncio.Semaphore] = None,
+    ) -> tuple:
+    """
+    Render a deck and store it under a key derived from its fingerprint; a
+    deck that is already stored is neither rendered nor uploaded again.
+
+    With `incremental`, only slides that changed since the last render of
+    the same filename are rebuilt. Decks of LARGE_DECK_SLIDES or more are
+    rendered in chunks to a temp file and streamed to storage instead, and
+    are always rebuilt in full. Only the render step holds one of
+    `render_slots`, not the lookup or upload. Returns (stored, rebuilt_slides).
+    """
+    key = object_key("presentations", deck_fingerprint(prs_content, ppt_template), prs_content.filename, ".pptx")
+    url = await storage.lookup(key)
+    if url is not None:
+        return StoredObject(key, url, 0, True), []
+    render_slot = render_slots or nullcontext()
+    if len(prs_content.slides) >= LARGE_DECK_SLIDES:
+        async with render_slot:
+            with stage("render"):
+                path, _ = await render_deck_file(prs_content, ppt_template)
+        try:
+            with open(path, "rb") as f:
+                stored = await storage.put(f, key, PPTX_CONTENT_TYPE)
+        finally:
+            os.unlink(path)
+        return stored, list(range(1, len(prs_content.slides) + 1))
+    base = f"{template_digest(ppt_template)}:{get_registry().version}"
+    previous = deck_cache.get(prs_content.filename, base) if incremental else None
+    async with render_slot:
+        with stage("render"):
+            pptx_bytes, slide_hashes, rebuilt = await render_deck(prs_content, previous, ppt_template)
+    if incremental:
+        deck_cache.put(prs_content.filename, base, pptx_bytes, slide_hashes)
+    return await storage.put(pptx_bytes, key, PPTX_CONTENT_TYPE), rebuilt
 
 # 1. get_presentation_rules
 @app.get("/get_presentation_rules")
 async def get_presentation_rules():
     try:
-        layouts_str = get_layouts()
-        prompt_str = load_prompt_template()
-        from string import Template
-        prompt_template = Template(prompt_str)
-        rule_prompt = prompt_template.substitute(layouts_description=layouts_str)
+        rule_prompt = build_system_prompt()
         return {"rule_prompt": rule_prompt}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating rules: {str(e)}")
 
-@app.post("/generate_json_content")
-async def generate_json_content(data: GenerateJsonContentRequest):
-    openai.api_key = os.environ.get("OPENAI_API_KEY")
-    if not openai.api_key:
-        raise HTTPException(status_code=503, detail="OpenAI API key not set in environment variable OPENAI_API_KEY.")
+@app.post("/reload_layouts")
+async def reload_layouts():
     try:
-        layouts_str = get_layouts()
-        prompt_str = load_prompt_template()
-        from string import Template
-        prompt_template = Template(prompt_str)
-        system_prompt = prompt_template.substitute(layouts_description=layouts_str)
-        user_prompt = (
-            f"Input for presentation: {data.user_text}\n"
-            f"Please use theme_mode: '{data.theme_mode}'."
-        )
-        completion = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
+        registry = reload_registry()
+        return {"version": registry.version, "layouts_count": len(registry)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reloading layouts: {str(e)}")
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/profiles/{name}")
+async def get_profile(name: str, request: Request):
+    # Same token as the one that turns profiling on
+    if not PROFILE_TOKEN or request.headers.get(PROFILE_HEADER) != PROFILE_TOKEN:
+        raise HTTPException(status_code=404, detail="Not found")
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile '{name}' not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=name)
+
+@app.get("/executor_stats")
+async def get_executor_stats():
+    return executor_stats()
+
+@app.get("/llm_cache_stats")
+async def llm_cache_stats():
+    return completion_cache.stats()
+
+@app.get("/storage_stats")
+async def storage_stats():
+    return storage.stats()
+
+@app.get("/deck_cache_stats")
+async def deck_cache_stats():
+    return deck_cache.stats()
+
+@app.get("/admission_stats")
+async def admission_stats():
+    # Budget utilization and queue depth per endpoint, for autoscaling
+    return admission.stats()
+
+@app.get("/tts_cache_stats")
+async def tts_cache_stats():
+    cache = get_tts_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@lru_cache(maxsize=8)
+def _render_system_prompt(registry: LayoutRegistry, prompt_mtime_ns: int) -> tuple:
+    prompt_str = load_prompt_template()
+    from string import Template
+    system_prompt = Template(prompt_str).substitute(layouts_description=registry.layouts_prompt)
+    return system_prompt, hashlib.sha1(system_prompt.encode("utf-8")).hexdigest()[:12]
+
+def system_prompt_with_version() -> tuple:
+    """
+    The rendered system prompt and its version hash, memoized per layout
+    registry version and prompt template mtime.
+    """
+    return _render_system_prompt(get_registry(), os.stat(prompt_template).st_mtime_ns)
+
+def build_system_prompt() -> str:
+    return system_prompt_with_version()[0]
+
+def build_user_prompt(data: GenerateJsonContentRequest) -> str:
+    return (
+        f"Input for presentation: {data.user_text}\n"
+        f"Please use theme_mode: '{data.theme_mode}'."
+    )
+
+async def stream_json_content(data: GenerateJsonContentRequest, system_prompt: str, user_prompt: str):
+    """
+    Yield events as the completion streams in: top-level fields, then each
+    slide validated against the Slide model and the layout registry.
+    """
+    registry = get_registry()
+    parser = SlideStreamParser()
+    theme_mode = data.theme_mode
+    slides_count = 0
+    usage = None
+    start = time.perf_counter()
+    try:
+        client = get_openai_client()
+        stream = await client.chat.completions.create(
+            model=LLM_MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
-            temperature=0.3,
-            max_tokens=4096
+            temperature=LLM_TEMPERATURE,
+            max_tokens=LLM_MAX_TOKENS,
+            stream=True,
+            # Token usage only comes in a last chunk, which has no choices
+            stream_options={"include_usage": True},
         )
-        ai_json = completion.choices[0].message.content
-        import re
-        pattern = r"```(?:json)?\s*([\s\S]+?)\s*```"
-        match = re.search(pattern, ai_json)
-        if match:
-            json_text = match.group(1)
-        else:
-            json_text = ai_json
-        result = json.loads(json_text)
+        async for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+                record_llm_usage(usage)
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            for event in parser.feed(chunk.choices[0].delta.content):
+                if event[0] == "field":
+                    if event[1] == "theme_mode":
+                        theme_mode = event[2]
+                    yield {"type": "field", "name": event[1], "value": event[2]}
+                    continue
+                slides_count += 1
+                if event[0] == "invalid":
+                    yield {"type": "slide", "index": slides_count, "slide": None, "errors": [f"Invalid JSON: {event[2]}"]}
+                    continue
+                try:
+                    Slide.model_validate(event[1], context={"registry": registry, "theme_mode": theme_mode})
+                    errors = []
+                except ValidationError as e:
+                    errors = error_messages(e)
+                yield {"type": "slide", "index": slides_count, "slide": event[1], "errors": errors}
+        record("llm", time.perf_counter() - start)
+        done = {"type": "done", "slides_count": slides_count, "complete": parser.done}
+        if usage is not None:
+            # Headers (and Server-Timing) went out before the tokens were known
+            done["usage"] = {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens}
+        yield done
+    except Exception as e:
+        logger.bind(stage="llm").error("OpenAI completion stream failed: {!r}", e)
+        yield {"type": "error", "detail": f"OpenAI completion error: {str(e)}"}
+
+def record_llm_usage(usage) -> None:
+    if usage is None:
+        return
+    LLM_TOKENS.inc(usage.prompt_tokens or 0, LLM_MODEL, "prompt")
+    LLM_TOKENS.inc(usage.completion_tokens or 0, LLM_MODEL, "completion")
+    annotate("llm_tokens", f"prompt={usage.prompt_tokens} completion={usage.completion_tokens}")
+
+def format_stream_event(event: dict, stream_format: str) -> str:
+    if stream_format == "sse":
+        return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    return json.dumps(event) + "\n"
+
+@app.post("/generate_json_content")
+async def generate_json_content(data: GenerateJsonContentRequest):
+    if not os.environ.get("OPENAI_API_KEY"):
+        raise HTTPException(status_code=503, detail="OpenAI API key not set in environment variable OPENAI_API_KEY.")
+    try:
+        system_prompt, prompt_version = system_prompt_with_version()
+        user_prompt = build_user_prompt(data)
+        if data.stream:
+            media_type = "text/event-stream" if data.stream_format == "sse" else "application/x-ndjson"
+            ticket = await admission.acquire("generate_json_content", llm_cost(LLM_MAX_TOKENS))
+
+            async def body():
+                # The budget is held until the stream ends
+                try:
+                    async for event in stream_json_content(data, system_prompt, user_prompt):
+                        yield format_stream_event(event, data.stream_format)
+                finally:
+                    ticket.release()
+
+            # background releases it too if the body is never iterated
+            return StreamingResponse(body(), media_type=media_type, background=BackgroundTask(ticket.release))
+
+        async def complete():
+            # Only cache misses (not hits or coalesced requests) take budget
+            async with admission.admit("generate_json_content", llm_cost(LLM_MAX_TOKENS)):
+                with stage("llm"):
+                    completion = await get_openai_client().chat.completions.create(
+                        model=LLM_MODEL,
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": user_prompt}
+                        ],
+                        temperature=LLM_TEMPERATURE,
+                        max_tokens=LLM_MAX_TOKENS
+                    )
+            record_llm_usage(completion.usage)
+            ai_json = completion.choices[0].message.content
+            import re
+            pattern = r"```(?:json)?\s*([\s\S]+?)\s*```"
+            match = re.search(pattern, ai_json)
+            if match:
+                json_text = match.group(1)
+            else:
+                json_text = ai_json
+            return json.loads(json_text)
+
+        # Identical prompts share a cached result or one in-flight completion
+        key = completion_key(LLM_MODEL, prompt_version, user_prompt, LLM_TEMPERATURE, LLM_MAX_TOKENS)
+        result = await completion_cache.get_or_compute(key, complete, use_cache=not data.no_cache)
         return result
+    except (ExecutorBusy, AdmissionRejected):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"OpenAI completion error: {str(e)}")
 
 # 2. generate_presentation API
-@app.post("/generate_presentation")
-async def generate_presentation(data: GeneratePresentationRequest):
+@app.post("/generate_presentation", openapi_extra=openapi_body(GeneratePresentationRequest))
+async def generate_presentation(data: GeneratePresentationRequest = json_body(GeneratePresentationRequest)):
+    ticket = await admission.acquire("generate_presentation", deck_cost(data.json_content))
     try:
-        prs_content = PresentationContent(**data.json_content)
-        slides_content = prs_content.slides
-        theme_mode = prs_content.theme_mode
-
-        message = {"slides_count": 0}
-        prs = Presentation(ppt_template)
-        reverse_index = get_reverse_index()
-        import re
-        layout_keys = set(reverse_index.keys())
-        def normalize_layout_key(in_key):
-            if in_key in layout_keys:
-                return in_key
-            alt = in_key.replace("_", "/").strip()
-            if alt in layout_keys:
-                return alt
-            for key in layout_keys:
-                if key.replace(" ", "").replace("/", "").lower() == in_key.replace(" ", "").replace("_", "").lower():
-                    return key
-            return None
-
-        for slide_content in slides_content:
-            orig_layout = slide_content.layout
-            layout_name = normalize_layout_key(orig_layout)
-            if not layout_name:
-                raise HTTPException(
-                    status_code=422,
-                    detail=f"Layout '{orig_layout}' not recognized. Valid layouts: {sorted(layout_keys)}"
-                )
-            layout_index = reverse_index[layout_name]["layout_index"][theme_mode]
-            placeholders_reverse = reverse_index[layout_name]["placeholders"]
-            slide_layout = prs.slide_layouts[layout_index]
-            slide = prs.slides.add_slide(slide_layout)
-            for placeholder in slide_content.placeholders:
-                name = placeholder.placeholder_name
-                content = placeholder.content
-                try:
-                    index = placeholders_reverse[name][theme_mode]
-                    ph = slide.placeholders.__getitem__(idx=index)
-                    text_frame = ph.text_frame
-                    text_frame.clear()
-                    text_frame._element.remove(text_frame.paragraphs[0]._p)
-                    if isinstance(content, list):
-                        for c in content:
-                            p = text_frame.add_paragraph()
-                            process_html(c, p)
-                except Exception as e:
-                    break
-            # Add speaker notes if provided
-            if hasattr(slide_content, "speaker_notes") and slide_content.speaker_notes:
-                slide.notes_slide.notes_text_frame.text = slide_content.speaker_notes
-            message["slides_count"] += 1
-
-        # Save PPTX to in-memory buffer, upload to Cloudinary, do not store to disk
-        import io
-        pptx_buffer = io.BytesIO()
-        prs.save(pptx_buffer)
-        pptx_buffer.seek(0)
+        # Build and save off the event loop, upload from memory, do not store to disk
+        return await build_presentation(data.json_content, incremental=data.incremental)
+    except LayoutNotFoundError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except (ExecutorBusy, StorageError):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating PPTX: {str(e)}")
+    finally:
+        ticket.release()
+
+@app.post("/generate_presentations_batch")
+async def generate_presentations_batch(data: GeneratePresentationsBatchRequest):
+    if len(data.decks) > BATCH_MAX_DECKS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_DECKS} decks per batch")
+    results = [{"index": i, "filename": None, "cloudinary_url": None, "error": None} for i in range(len(data.decks))]
+
+    # Validate every deck before rendering any of them
+    valid = []
+    for result, deck in zip(results, data.decks):
+        if not isinstance(deck, dict):
+            result["error"] = f"Invalid presentation: expected an object, got {type(deck).__name__}"
+            continue
+        if isinstance(deck.get("filename"), str):
+            result["filename"] = deck["filename"]
         try:
-            upload_result = cloudinary.uploader.upload(
-                pptx_buffer,
-                resource_type="raw",
-                public_id=prs_content.filename,
-                folder="presentations"
-            )
-            pptx_url = upload_result.get("secure_url")
+            with stage("validate"):
+                prs_content = PRESENTATION_ADAPTER.validate_python(deck, context=layout_context())
+        except ValidationError as e:
+            result["error"] = "Invalid presentation: " + "; ".join(error_messages(e))
+            continue
+        valid.append((result, prs_content))
+
+    # Keep the batch's renders within the CPU pool's worker count so it does
+    # not trip the pool's pending limit on its own; uploads are not capped
+    render_slots = asyncio.Semaphore(cpu_executor.max_workers)
+
+    async def render_and_upload(result: dict, prs_content: PresentationContent):
+        try:
+            stored, _ = await store_presentation(prs_content, render_slots=render_slots)
+        except StorageError as e:
+            result["error"] = f"Storage upload error: {str(e)}"
+            return
         except Exception as e:
-            pptx_url = None
+            result["error"] = f"Error generating PPTX: {str(e)}"
+            return
+        result["cloudinary_url"] = stored.url
 
-        return { "cloudinary_url": pptx_url }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating PPTX: {str(e)}")
+    async with admission.admit("generate_presentations_batch", sum(deck_cost(prs_content) for _, prs_content in valid)):
+        await asyncio.gather(*(render_and_upload(result, prs_content) for result, prs_content in valid))
+    return {
+        "results": results,
+        "succeeded": sum(1 for result in results if result["error"] is None),
+        "failed": sum(1 for result in results if result["error"] is not None),
+    }
+
+def docx_digest(kind: str):
+    """
+    sha256 object for the key of a Word document built from `kind` input
+    ("text", "html" or "ndjson") on the current DOCX_TEMPLATE; feed it the
+    raw content.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{kind}\0{template_digest(DOCX_TEMPLATE)}\0".encode())
+    return digest
 
 @app.post("/generate_word_doc")
 async def generate_word_doc(data: GenerateWordDocRequest):
     try:
-        doc = Document()
-        paragraphs = data.content.split("\n\n")
-        for para in paragraphs:
-            doc.add_paragraph(para.strip())
-        import io
-        docx_buffer = io.BytesIO()
-        doc.save(docx_buffer)
-        docx_buffer.seek(0)
-        try:
-            upload_result = cloudinary.uploader.upload(
-                docx_buffer,
-                resource_type="raw",
-                public_id=data.filename,
-                folder="word_docs"
-            )
-            cloud_url = upload_result.get("secure_url")
-        except Exception as upload_err:
-            raise HTTPException(status_code=500, detail=f"Cloudinary upload error: {str(upload_err)}")
+        # The document depends only on the text, its format and the Word
+        # template, so identical input reuses the stored file
+        digest = docx_digest(data.format)
+        digest.update(data.content.encode("utf-8"))
+        key = object_key("word_docs", digest.hexdigest(), data.filename, ".docx")
+        cloud_url = await storage.lookup(key)
+        if cloud_url is None:
+            docx_file = await run_io(write_docx, data.content, data.format)
+            with docx_file:
+                cloud_url = (await storage.put(docx_file, key, DOCX_CONTENT_TYPE)).url
         return { "cloudinary_url": cloud_url }
+    except (ExecutorBusy, StorageError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating DOCX: {str(e)}")
 
-
-@app.post("/generate_ppt_with_audio")
-async def generate_ppt_with_audio(data: GeneratePresentationRequest):
+@app.post("/generate_word_doc/stream")
+async def generate_word_doc_stream(
+    request: Request,
+    filename: str = "blog_post",
+    format: Literal["text", "html"] = "text",
+    ):
+    """
+    /generate_word_doc for bodies too large to hold as one JSON string.
+    The raw body is either text (split on blank lines, in `format`) or,
+    with Content-Type application/x-ndjson, one {"content", "format"}
+    section per line. Paragraphs are written to the document as the body
+    arrives, and the document is spooled to disk past
+    DOCX_SPOOL_MAX_MEMORY.
+    """
+    if int(request.headers.get("content-length") or 0) > DOCX_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Body larger than {DOCX_MAX_BYTES} bytes")
+    ndjson = request.headers.get("content-type", "").startswith("application/x-ndjson")
+    parser = NdjsonSections(format) if ndjson else ParagraphSplitter()
+    decoder = utf8_decoder()
+    digest = docx_digest("ndjson" if ndjson else format)
+    writer = DocxWriter(spooled_docx_file())
     try:
-        # Now support: "audio" inside json_content root (not at the outer level)
-        # Default: "female" if not set
-        audio_gender = data.json_content.get("audio", "female")
-        prs_content = PresentationContent(**{k: v for k, v in data.json_content.items() if k not in ["audio"]})
-        slides_content = prs_content.slides
-        theme_mode = prs_content.theme_mode
-
-        if audio_gender == "male":
-            voice = "en-US-AndrewMultilingualNeural"
-        else:
-            voice = "en-IN-NeerjaNeural"
-
-        message = {"slides_count": 0}
-        prs = Presentation(ppt_template)
-        reverse_index = get_reverse_index()
-
-        import re
-        layout_keys = set(reverse_index.keys())
-        def normalize_layout_key(in_key):
-            if in_key in layout_keys:
-                return in_key
-            alt = in_key.replace("_", "/").strip()
-            if alt in layout_keys:
-                return alt
-            for key in layout_keys:
-                if key.replace(" ", "").replace("/", "").lower() == in_key.replace(" ", "").replace("_", "").lower():
-                    return key
-            return None
-
-        import zipfile
-
-        slide_audio_urls = []
-        slide_audio_files = []
-        for i, slide_content in enumerate(slides_content, start=1):
-            orig_layout = slide_content.layout
-            layout_name = normalize_layout_key(orig_layout)
-            if not layout_name:
-                raise HTTPException(
-                    status_code=422,
-                    detail=f"Layout '{orig_layout}' not recognized. Valid layouts: {sorted(layout_keys)}"
-                )
-            layout_index = reverse_index[layout_name]["layout_index"][theme_mode]
-            placeholders_reverse = reverse_index[layout_name]["placeholders"]
-            slide_layout = prs.slide_layouts[layout_index]
-            slide = prs.slides.add_slide(slide_layout)
-            for placeholder in slide_content.placeholders:
-                name = placeholder.placeholder_name
-                content = placeholder.content
-                try:
-                    index = placeholders_reverse[name][theme_mode]
-                    ph = slide.placeholders.__getitem__(idx=index)
-                    text_frame = ph.text_frame
-                    text_frame.clear()
-                    text_frame._element.remove(text_frame.paragraphs[0]._p)
-                    if isinstance(content, list):
-                        for c in content:
-                            p = text_frame.add_paragraph()
-                            process_html(c, p)
-                except Exception as e:
-                    break
-            # Per-slide audio logic
-            slide_audio_url = None
-            slide_audio_tmpfile = None
-            if hasattr(slide_content, "speaker_notes") and slide_content.speaker_notes:
-                slide.notes_slide.notes_text_frame.text = slide_content.speaker_notes
-                # Generate audio for this slide's speaker notes only
-                try:
-                    with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as tmpfile:
-                        tmpfilename = tmpfile.name
-                    communicate = edge_tts.Communicate(slide_content.speaker_notes, voice=voice)
-                    await communicate.save(tmpfilename)
-                    with open(tmpfilename, "rb") as f:
-                        upload_result = cloudinary.uploader.upload(
-                            f,
-                            resource_type="video",
-                            public_id=f"{prs_content.filename}_slide{i}_audio",
-                            folder="ppt_audio"
-                        )
-                        slide_audio_url = upload_result.get("secure_url")
-                    slide_audio_tmpfile = tmpfilename
-                except Exception as audio_err:
-                    slide_audio_url = None
-                    slide_audio_tmpfile = None
-            slide_audio_urls.append(slide_audio_url)
-            slide_audio_files.append(slide_audio_tmpfile)
-            message["slides_count"] += 1
-
-        # Create ZIP of all non-None slide audio files
-        audio_zip_url = None
-        audio_zip_tmpfile = None
+        received = 0
+        batch, batch_chars = [], 0
         try:
-            zip_path = tempfile.NamedTemporaryFile(suffix=".zip", delete=False).name
-            with zipfile.ZipFile(zip_path, "w") as zipf:
-                for j, fpath in enumerate(slide_audio_files, start=1):
-                    if fpath and os.path.exists(fpath):
-                        # Name inside ZIP: slide{j}.mp3
-                        zipf.write(fpath, f"slide{j}.mp3")
-            with open(zip_path, "rb") as zf:
-                upload_result = cloudinary.uploader.upload(
-                    zf,
-                    resource_type="raw",
-                    public_id=f"{prs_content.filename}_audio_bundle",
-                    folder="ppt_audio",
-                    use_filename=True,
-                    unique_filename=False,
-                    overwrite=True,
-                    type="upload"  # ensure public accessibility
-                )
-                base_url = upload_result.get("secure_url")
-                audio_zip_url = base_url + "?fl_attachment"
-            audio_zip_tmpfile = zip_path
-        except Exception as zip_err:
-            audio_zip_url = None
-
-        # Clean up temp mp3 files and zip
-        for f in slide_audio_files:
-            if f and os.path.exists(f):
-                try:
-                    os.remove(f)
-                except Exception:
-                    pass
-        if audio_zip_tmpfile and os.path.exists(audio_zip_tmpfile):
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > DOCX_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Body larger than {DOCX_MAX_BYTES} bytes")
+                digest.update(chunk)
+                for paragraph in parser.feed(decoder.decode(chunk)):
+                    batch.append(paragraph)
+                    batch_chars += len(paragraph[0] if ndjson else paragraph)
+                if batch_chars >= DOCX_BATCH_CHARS:
+                    await run_io(writer.write, batch, format)
+                    batch, batch_chars = [], 0
+            batch.extend(parser.feed(decoder.decode(b"", final=True)))
+            batch.extend(parser.close())
+        except ValueError as e:
+            # UnicodeDecodeError and malformed NDJSON lines
+            raise HTTPException(status_code=400, detail=f"Invalid body: {e}")
+        await run_io(writer.write, batch, format)
+        docx_file = await run_io(writer.finish)
+        key = object_key("word_docs", digest.hexdigest(), filename, ".docx")
+        cloud_url = (await storage.put(docx_file, key, DOCX_CONTENT_TYPE)).url
+        return { "cloudinary_url": cloud_url, "paragraphs": writer.paragraphs }
+    except (HTTPException, ExecutorBusy, StorageError):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating DOCX: {str(e)}")
+    finally:
+        writer.close()
+
+
+async def build_ppt_with_audio(content: NarratedPresentationContent, progress=None, incremental: bool = False) -> dict:
+    """
+    Render the deck, narrate every slide's speaker notes and upload both.
+    Narration whose text is unchanged comes from the TTS cache.
+
+    `progress(**fields)` is called as stages complete (used by jobs).
+    """
+    progress = progress or (lambda **fields: None)
+    # "audio" sits inside json_content (not at the outer level), default "female"
+    prs_content = content.presentation()
+    voice = voice_for(content.audio)
+
+    # Build the deck first so layout errors surface before any TTS work
+    progress(stage="rendering")
+    stored_deck, rebuilt_slides = await store_presentation(prs_content, incremental)
+    notes = [slide.speaker_notes for slide in prs_content.slides]
+    clips_done = 0
+    progress(
+        stage="audio",
+        slides_built=len(rebuilt_slides),
+        audio_clips_total=sum(1 for text in notes if text),
+        audio_clips_done=clips_done,
+    )
+
+    # Synthesize clips concurrently, adding each to the in-memory ZIP as it completes
+    audio_zip_url = None
+    audio_zip_error = None
+    zip_ok = True
+    with AudioBundle() as bundle:
+        def add_clip(result: SlideAudio):
+            nonlocal zip_ok, clips_done
             try:
-                os.remove(audio_zip_tmpfile)
+                # Name inside ZIP: slide{j}.mp3
+                bundle.add(f"slide{result.index}.mp3", result.data)
             except Exception:
-                pass
+                zip_ok = False
+            clips_done += 1
+            progress(audio_clips_done=clips_done)
 
-        # Remove single audio file logic
+        audio_results = await synthesize_deck_audio(
+            notes,
+            voice,
+            prs_content.filename,
+            on_clip=add_clip,
+        )
+        progress(stage="uploading")
+        if zip_ok and bundle.count:
+            # Keyed by the clips it contains, which are deterministic unlike the zip bytes
+            bundle_digest = content_digest(json.dumps(
+                [(result.index, content_digest(result.data)) for result in audio_results if result.data is not None]
+            ).encode("utf-8"))
+            try:
+                stored_zip = await storage.put(
+                    bundle.finish(),
+                    object_key("ppt_audio", bundle_digest, f"{prs_content.filename}_audio_bundle", ".zip"),
+                    "application/zip",
+                    attachment=True,
+                )
+                audio_zip_url = stored_zip.url
+            except StorageError as zip_err:
+                audio_zip_error = str(zip_err)
+    slide_audio_urls = [result.url for result in audio_results]
+    slide_audio_errors = [result.error for result in audio_results]
+    audio_cache_hits = sum(1 for result in audio_results if result.cached)
+    resynthesized_slides = [result.index for result in audio_results if result.data is not None and not result.cached]
 
-        import io
-        pptx_buffer = io.BytesIO()
-        prs.save(pptx_buffer)
-        pptx_buffer.seek(0)
-        pptx_url = None
-        try:
-            upload_result = cloudinary.uploader.upload(
-                pptx_buffer,
-                resource_type="raw",
-                public_id=prs_content.filename,
-                folder="presentations"
-            )
-            pptx_url = upload_result.get("secure_url")
-        except Exception as cloud_err:
-            pptx_url = None
-
-        return {
-            "cloudinary_url": pptx_url,
-            "slide_audio_urls": slide_audio_urls,
-            "audio_zip_url": audio_zip_url
-        }
+    progress(stage="done")
+
+    return {
+        "cloudinary_url": stored_deck.url,
+        "rebuilt_slides": rebuilt_slides,
+        "resynthesized_slides": resynthesized_slides,
+        "slide_audio_urls": slide_audio_urls,
+        "slide_audio_errors": slide_audio_errors,
+        "audio_cache_hits": audio_cache_hits,
+        "audio_zip_url": audio_zip_url,
+        "audio_zip_error": audio_zip_error
+    }
+
+@app.post("/generate_ppt_with_audio", openapi_extra=openapi_body(GeneratePptWithAudioRequest))
+async def generate_ppt_with_audio(data: GeneratePptWithAudioRequest = json_body(GeneratePptWithAudioRequest)):
+    ticket = await admission.acquire("generate_ppt_with_audio", deck_cost(data.json_content, narrated=True))
+    try:
+        return await build_ppt_with_audio(data.json_content, incremental=data.incremental)
+    except LayoutNotFoundError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except (ExecutorBusy, StorageError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating PPTX/audio: {str(e)}")
+    finally:
+        ticket.release()
+
+async def build_presentation(prs_content: PresentationContent, progress=None, incremental: bool = False) -> dict:
+    progress = progress or (lambda **fields: None)
+    progress(stage="rendering")
+    stored, rebuilt_slides = await store_presentation(prs_content, incremental)
+    progress(stage="done", slides_built=len(rebuilt_slides), reused=stored.skipped)
+    return {"cloudinary_url": stored.url, "rebuilt_slides": rebuilt_slides}
+
+@app.post("/validate_presentation", openapi_extra=openapi_body(GeneratePptWithAudioRequest))
+async def validate_presentation(request: Request):
+    """
+    Check a /generate_presentation or /generate_ppt_with_audio body without
+    rendering anything: schema, layouts, placeholders and theme variants,
+    with every error reported at once.
+    """
+    body = await request.body()
+    with stage("validate"):
+        try:
+            data = VALIDATE_ADAPTER.validate_json(body, context=layout_context())
+        except ValidationError as e:
+            errors = [{key: err[key] for key in ("type", "loc", "msg")} for err in body_errors(e)]
+            return {"valid": False, "errors": errors}
+    return {"valid": True, "errors": [], "slides": len(data.json_content.slides)}
+
+# Background jobs: submit returns a job id, clients poll /jobs/{id} or get a webhook
+JOB_BUILDERS = {
+    "generate_presentation": (TypeAdapter(SubmitPresentationJobRequest), build_presentation),
+    "generate_ppt_with_audio": (TypeAdapter(SubmitPptWithAudioJobRequest), build_ppt_with_audio),
+}
+job_scheduler = JobScheduler(
+    create_job_store(),
+    per_type_concurrency={
+        "generate_presentation": int(os.environ.get("JOB_PRESENTATION_CONCURRENCY", 4)),
+        "generate_ppt_with_audio": int(os.environ.get("JOB_AUDIO_CONCURRENCY", 2)),
+    },
+)
+
+@app.post("/jobs/{job_type}", openapi_extra=openapi_body(SubmitPptWithAudioJobRequest))
+async def submit_job(job_type: str, request: Request):
+    if job_type not in JOB_BUILDERS:
+        raise HTTPException(status_code=404, detail=f"Unknown job type '{job_type}'. Valid types: {sorted(JOB_BUILDERS)}")
+    adapter, builder = JOB_BUILDERS[job_type]
+    # Invalid decks are rejected here rather than failing as jobs
+    data = validate_body(adapter, await request.body())
+    try:
+        job = await job_scheduler.submit(
+            job_type,
+            lambda progress: builder(data.json_content, progress, data.incremental),
+            priority=data.priority,
+            webhook_url=str(data.webhook_url) if data.webhook_url else None,
+        )
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    return {"job_id": job["id"], "status": job["status"]}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await job_scheduler.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job
+
+@app.get("/job_stats")
+async def get_job_stats():
+    return job_scheduler.stats()
 
 if __name__ == "__main__":
     import uvicorn
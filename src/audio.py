@@ -0,0 +1,246 @@
+import os
+import asyncio
+import zipfile
+import tempfile
+from typing import Callable, List, Optional
+
+from loguru import logger
+
+from src.executor import run_io
+from src.metrics import TTS_BATCHES, stage
+from src.storage import get_storage, object_key, content_digest
+from src.tts_batch import Boundary, batch_text, plan_batches, split_batch
+from src.tts_cache import get_tts_cache, cache_key
+
+
+# Maximum number of TTS sessions in flight for one deck
+TTS_CONCURRENCY = int(os.environ.get("TTS_CONCURRENCY", 4))
+# Notes of consecutive slides are synthesized in one TTS session of up to
+# this many characters and cut back into per-slide clips at the word
+# boundaries; 0 = one session per slide
+TTS_BATCH_CHARS = int(os.environ.get("TTS_BATCH_CHARS", 3000))
+# Audio bundles stay in memory up to this size, then spill to a temp file
+AUDIO_SPOOL_MAX_MEMORY = int(os.environ.get("AUDIO_SPOOL_MAX_MEMORY", 16 * 1024 * 1024))
+
+VOICES = {
+    "male": "en-US-AndrewMultilingualNeural",
+    "female": "en-IN-NeerjaNeural",
+}
+
+
+# Edge TTS boundary offsets and durations are in 100 ns ticks
+_TICKS_PER_SECOND = 10_000_000
+
+
+def voice_for(audio_gender: str) -> str:
+    if audio_gender == "male":
+        return VOICES["male"]
+    return VOICES["female"]
+
+
+class EdgeTTSEngine:
+    """
+    Text-to-speech through Edge TTS, returning the mp3 bytes.
+    """
+
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        import edge_tts
+        communicate = edge_tts.Communicate(text, voice=voice)
+        audio = bytearray()
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                audio.extend(chunk["data"])
+        return bytes(audio)
+
+    async def synthesize_with_boundaries(self, text: str, voice: str) -> tuple:
+        """
+        The mp3 bytes and the word boundary events of one session.
+        """
+        import edge_tts
+        try:
+            communicate = edge_tts.Communicate(text, voice=voice, boundary="WordBoundary")
+        except TypeError:
+            # edge-tts < 7 has no `boundary` and always sends word boundaries
+            communicate = edge_tts.Communicate(text, voice=voice)
+        audio = bytearray()
+        boundaries = []
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                audio.extend(chunk["data"])
+            elif chunk["type"] in ("WordBoundary", "SentenceBoundary"):
+                boundaries.append(Boundary(
+                    chunk["offset"] / _TICKS_PER_SECOND, chunk["duration"] / _TICKS_PER_SECOND, chunk["text"],
+                ))
+        return bytes(audio), boundaries
+
+
+class StorageAudioUploader:
+    """
+    Stores one mp3 clip under a content-hash key and returns its URL.
+    """
+
+    def __init__(self, storage=None):
+        self.storage = storage or get_storage()
+
+    async def upload(self, data: bytes, public_id: str) -> Optional[str]:
+        key = object_key("ppt_audio", content_digest(data), public_id, ".mp3")
+        stored = await self.storage.put(data, key, "audio/mpeg")
+        return stored.url
+
+
+class AudioBundle:
+    """
+    ZIP of per-slide clips written incrementally into a spooled buffer.
+
+    Use as a context manager so the buffer is released on every path.
+    """
+
+    def __init__(self, max_memory: int = AUDIO_SPOOL_MAX_MEMORY):
+        self.buffer = tempfile.SpooledTemporaryFile(max_size=max_memory, suffix=".zip")
+        self._zip = zipfile.ZipFile(self.buffer, "w")
+        self.count = 0
+
+    def add(self, name: str, data: bytes) -> None:
+        self._zip.writestr(name, data)
+        self.count += 1
+
+    def finish(self):
+        """
+        Finalize the archive and return the buffer positioned for reading.
+        """
+        self._zip.close()
+        self.buffer.seek(0)
+        return self.buffer
+
+    def close(self) -> None:
+        try:
+            self._zip.close()
+        finally:
+            self.buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SlideAudio:
+    """
+    Outcome of the audio stage for one slide (1-based `index`).
+    """
+
+    def __init__(self, index: int):
+        self.index = index
+        self.data: Optional[bytes] = None
+        self.url: Optional[str] = None
+        self.error: Optional[str] = None
+        self.cached = False
+
+
+async def synthesize_deck_audio(
+    notes: List[Optional[str]],
+    voice: str,
+    public_id_prefix: str,
+    tts=None,
+    uploader=None,
+    concurrency: int = TTS_CONCURRENCY,
+    on_clip: Optional[Callable[[SlideAudio], None]] = None,
+    cache=None,
+    use_cache: bool = True,
+    batch_chars: int = TTS_BATCH_CHARS,
+    ) -> List[SlideAudio]:
+    """
+    Synthesize and upload narration for every slide with notes.
+
+    Clips and their uploaded URLs are reused from the TTS cache (`cache`,
+    default: the process-wide one) when the notes are unchanged. The other
+    slides' notes are synthesized in batches of up to `batch_chars`
+    characters, one TTS session each, and cut back into per-slide clips at
+    the engine's word boundaries; a batch whose boundaries do not match its
+    text is redone one session per slide, as are all slides when the
+    engine has no synthesize_with_boundaries(). At most `concurrency`
+    sessions run at once; each clip is uploaded as soon as it is ready and
+    handed to `on_clip` (e.g. to add it to a zip). Results keep slide order
+    and a failure only affects its own slide.
+    """
+    tts = tts or EdgeTTSEngine()
+    if not use_cache:
+        cache = None
+    elif cache is None:
+        cache = get_tts_cache()
+    uploader = uploader or StorageAudioUploader()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    results = [SlideAudio(i) for i in range(1, len(notes) + 1)]
+    slides = [(result, text) for result, text in zip(results, notes) if text]
+
+    async def lookup(result: SlideAudio, text: str):
+        if cache is not None:
+            result.data = await run_io(cache.get, cache_key(voice, text))
+            result.cached = result.data is not None
+
+    async def deliver(result: SlideAudio, text: str):
+        key = cache_key(voice, text)
+        public_id = f"{public_id_prefix}_slide{result.index}_audio"
+        if cache is not None and not result.cached:
+            try:
+                await run_io(cache.put, key, result.data)
+            except OSError:
+                pass
+        if on_clip is not None:
+            on_clip(result)
+        if cache is not None and result.cached:
+            result.url = await run_io(cache.get_url, key, public_id)
+            if result.url:
+                return
+        try:
+            result.url = await uploader.upload(result.data, public_id)
+        except Exception as upload_err:
+            result.error = f"Upload error: {upload_err}"
+            return
+        if cache is not None:
+            try:
+                await run_io(cache.put_url, key, public_id, result.url)
+            except OSError:
+                pass
+
+    async def process(result: SlideAudio, text: str):
+        try:
+            async with semaphore:
+                with stage("tts"):
+                    result.data = await tts.synthesize(text, voice)
+        except Exception as tts_err:
+            result.error = f"TTS error: {tts_err}"
+            return
+        await deliver(result, text)
+
+    async def process_batch(batch: list):
+        texts = [text for _, text in batch]
+        try:
+            async with semaphore:
+                with stage("tts"):
+                    audio, boundaries = await tts.synthesize_with_boundaries(batch_text(texts), voice)
+            clips = split_batch(audio, boundaries, texts)
+        except Exception as e:
+            # Also covers a failed session, so a bad slide only fails itself
+            TTS_BATCHES.inc(1, "fallback")
+            logger.warning("Batched TTS of {} slides redone per slide: {!r}", len(batch), e)
+            await asyncio.gather(*(process(result, text) for result, text in batch))
+            return
+        TTS_BATCHES.inc(1, "split")
+        for (result, _), clip in zip(batch, clips):
+            result.data = clip
+        await asyncio.gather(*(deliver(result, text) for result, text in batch))
+
+    await asyncio.gather(*(lookup(result, text) for result, text in slides))
+    misses = [(result, text) for result, text in slides if result.data is None]
+    jobs = [deliver(result, text) for result, text in slides if result.data is not None]
+    if batch_chars > 0 and hasattr(tts, "synthesize_with_boundaries"):
+        batches = plan_batches([text for _, text in misses], batch_chars)
+    else:
+        batches = [[i] for i in range(len(misses))]
+    for indexes in batches:
+        batch = [misses[i] for i in indexes]
+        jobs.append(process_batch(batch) if len(batch) > 1 else process(*batch[0]))
+    await asyncio.gather(*jobs)
+    return results
@@ -0,0 +1,208 @@
+import io
+import os
+import sys
+import asyncio
+from functools import lru_cache
+from typing import Optional
+
+import aiohttp
+from loguru import logger
+
+
+OPENAI_TIMEOUT = float(os.environ.get("OPENAI_TIMEOUT", 120))
+OPENAI_MAX_RETRIES = int(os.environ.get("OPENAI_MAX_RETRIES", 2))
+# Connection pool shared by all uploads
+UPLOAD_POOL_SIZE = int(os.environ.get("UPLOAD_POOL_SIZE", 32))
+UPLOAD_POOL_PER_HOST = int(os.environ.get("UPLOAD_POOL_PER_HOST", 0))  # 0 = no per-host cap
+UPLOAD_KEEPALIVE = float(os.environ.get("UPLOAD_KEEPALIVE", 30))
+UPLOAD_TIMEOUT = float(os.environ.get("UPLOAD_TIMEOUT", 120))
+UPLOAD_CONNECT_TIMEOUT = float(os.environ.get("UPLOAD_CONNECT_TIMEOUT", 10))
+UPLOAD_RETRIES = int(os.environ.get("UPLOAD_RETRIES", 3))
+UPLOAD_BACKOFF = float(os.environ.get("UPLOAD_BACKOFF", 0.5))
+
+
+class UploadError(RuntimeError):
+    pass
+
+
+class _BorrowedFile(io.RawIOBase):
+    """
+    Read-only view of a caller's binary file. aiohttp closes file payloads
+    once sent (depending on its version); closing this view leaves the
+    file open for retries and for the caller.
+    """
+
+    def __init__(self, file):
+        self._file = file
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._file.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+
+class _Clients:
+    """
+    Application-lifetime network clients, created in the FastAPI lifespan
+    (or lazily on first use) and bound to the serving event loop.
+    """
+
+    def __init__(self):
+        self.openai = None
+        self.http: Optional[aiohttp.ClientSession] = None
+        self.loop = None
+
+
+_clients = _Clients()
+
+
+def _new_http_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=UPLOAD_POOL_SIZE,
+        limit_per_host=UPLOAD_POOL_PER_HOST,
+        keepalive_timeout=UPLOAD_KEEPALIVE,
+    )
+    timeout = aiohttp.ClientTimeout(total=UPLOAD_TIMEOUT, connect=UPLOAD_CONNECT_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+def _new_openai_client():
+    import openai
+    return openai.AsyncOpenAI(
+        api_key=os.environ.get("OPENAI_API_KEY"),
+        timeout=OPENAI_TIMEOUT,
+        max_retries=OPENAI_MAX_RETRIES,
+    )
+
+
+def _ensure_loop() -> None:
+    loop = asyncio.get_running_loop()
+    if _clients.loop is not loop:
+        # Clients cannot cross event loops; start over on a new one
+        _clients.loop = loop
+        _clients.http = None
+        _clients.openai = None
+
+
+async def start_clients() -> None:
+    _ensure_loop()
+    if _clients.http is None:
+        _clients.http = _new_http_session()
+    # Importing the OpenAI SDK takes about a second and only one endpoint
+    # needs it, so unless src.serve already preloaded it the client is
+    # built by get_openai_client() on first use
+    if _clients.openai is None and os.environ.get("OPENAI_API_KEY") and "openai" in sys.modules:
+        _clients.openai = _new_openai_client()
+
+
+async def close_clients() -> None:
+    if _clients.http is not None:
+        await _clients.http.close()
+    if _clients.openai is not None:
+        await _clients.openai.close()
+    _clients.http = None
+    _clients.openai = None
+    _clients.loop = None
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    _ensure_loop()
+    if _clients.http is None or _clients.http.closed:
+        _clients.http = _new_http_session()
+    return _clients.http
+
+
+def get_openai_client():
+    _ensure_loop()
+    if _clients.openai is None:
+        _clients.openai = _new_openai_client()
+    return _clients.openai
+
+
+@lru_cache(maxsize=None)
+def cloudinary_utils():
+    """
+    cloudinary.utils, imported and configured on first use so workers on
+    other storage backends never load the SDK.
+    """
+    import cloudinary
+    import cloudinary.utils
+    # Fill in only what is missing, so configuration done in code before
+    # first use (e.g. by benchmarks) is kept
+    config = cloudinary.config()
+    settings = {
+        name: os.environ[env]
+        for name, env in (
+            ("cloud_name", "CLOUDINARY_CLOUD_NAME"),
+            ("api_key", "CLOUDINARY_API_KEY"),
+            ("api_secret", "CLOUDINARY_API_SECRET"),
+        )
+        if os.environ.get(env) and not getattr(config, name, None)
+    }
+    if config.secure is None:
+        settings["secure"] = True
+    cloudinary.config(**settings)
+    return cloudinary.utils
+
+
+def _cloudinary_request(options: dict) -> tuple:
+    utils = cloudinary_utils()
+    # Rebuilt per attempt so every retry carries a fresh signed timestamp
+    params = utils.build_upload_params(**options)
+    params = utils.cleanup_params(params)
+    params = utils.sign_request(params, options)
+    return utils.cloudinary_api_url("upload", **options), params
+
+
+async def cloudinary_upload(file, **options) -> dict:
+    """
+    Async replacement for cloudinary.uploader.upload over the pooled
+    session, retrying connection errors, 429 and 5xx with exponential
+    backoff. `file` is bytes or a seekable binary file-like object.
+    """
+    session = get_http_session()
+    last_error = None
+    for attempt in range(UPLOAD_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(UPLOAD_BACKOFF * 2 ** (attempt - 1))
+        url, params = _cloudinary_request(options)
+        form = aiohttp.FormData()
+        for k, v in params.items():
+            if isinstance(v, list):
+                for item in v:
+                    form.add_field(f"{k}[]", str(item))
+            elif v:
+                form.add_field(k, str(v))
+        body = file
+        if hasattr(file, "read"):
+            # Stream file-like bodies instead of loading them into memory,
+            # through a fresh view per attempt that aiohttp may close
+            file.seek(0)
+            body = _BorrowedFile(file)
+        form.add_field("file", body, filename=options.get("filename") or "file")
+        try:
+            async with session.post(url, data=form) as response:
+                result = await response.json(content_type=None)
+                if response.status == 429 or response.status >= 500:
+                    last_error = UploadError(f"Cloudinary returned HTTP {response.status}")
+                    continue
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            last_error = e
+            logger.warning("Upload attempt {} failed: {!r}", attempt + 1, e)
+            continue
+        if "error" in result:
+            raise UploadError(result["error"].get("message", str(result["error"])))
+        return result
+    raise UploadError(f"Upload failed after {UPLOAD_RETRIES + 1} attempts: {last_error!r}")
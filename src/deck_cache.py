@@ -0,0 +1,64 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+# Last rendered deck kept per filename for incremental re-renders
+DECK_CACHE_SIZE = int(os.environ.get("DECK_CACHE_SIZE", 32))
+DECK_CACHE_MAX_BYTES = int(os.environ.get("DECK_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+
+class DeckCache:
+    """
+    LRU of the last rendered .pptx per filename with its per-slide hashes,
+    bounded by entry count and total bytes. An entry is only handed out for
+    the same `base` (template and layout registry version) it was built on.
+    """
+
+    def __init__(self, maxsize: int = DECK_CACHE_SIZE, max_bytes: int = DECK_CACHE_MAX_BYTES):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0}
+
+    def get(self, filename: str, base: str) -> Optional[tuple]:
+        """
+        (pptx_bytes, slide_hashes) of the last render of `filename`, or None.
+        """
+        with self._lock:
+            entry = self._data.get(filename)
+            if entry is None or entry[0] != base:
+                self.counters["misses"] += 1
+                return None
+            self._data.move_to_end(filename)
+            self.counters["hits"] += 1
+            return entry[1], entry[2]
+
+    def put(self, filename: str, base: str, pptx_bytes: bytes, slide_hashes: list) -> None:
+        if self.maxsize <= 0 or len(pptx_bytes) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(filename, None)
+            if old is not None:
+                self._size -= len(old[1])
+            self._data[filename] = (base, pptx_bytes, list(slide_hashes))
+            self._size += len(pptx_bytes)
+            while len(self._data) > self.maxsize or self._size > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self._size -= len(evicted[1])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.counters,
+                "entries": len(self._data),
+                "bytes": self._size,
+                "maxsize": self.maxsize,
+                "max_bytes": self.max_bytes,
+            }
+
+
+deck_cache = DeckCache()
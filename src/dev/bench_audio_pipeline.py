@@ -0,0 +1,192 @@
+"""
+Audio stage of /generate_ppt_with_audio against fake TTS and upload
+backends: sequential vs. concurrent sessions, the TTS cache, and batched
+synthesis (one session per batch of slides, cut back into per-slide clips
+at the word boundaries) vs. one session per slide.
+
+    PYTHONPATH=. python -m src.dev.bench_audio_pipeline --slides 30 --session-latency 0.3
+"""
+import re
+import sys
+import time
+import tempfile
+import random
+import asyncio
+import argparse
+
+from src.audio import synthesize_deck_audio
+from src.tts_batch import Boundary, mp3_frames
+from src.tts_cache import TTSCache
+
+
+class FakeTTSEngine:
+    """
+    Stands in for Edge TTS: sleeps to simulate the round trip and returns
+    deterministic bytes. Texts containing "FAIL" raise.
+    """
+
+    def __init__(self, latency: float, jitter: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        self.calls += 1
+        await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+        if "FAIL" in text:
+            raise RuntimeError("fake TTS failure")
+        return f"{voice}:{text}".encode("utf-8")
+
+
+class FakeFrameTTSEngine(FakeTTSEngine):
+    """
+    Fake TTS that emits real MPEG-2 Layer III frame headers (24 kHz, 48
+    kbit/s mono, like Edge TTS; 24 ms per frame) with word boundary events.
+    Each frame's payload names the word spoken in it (empty for silence),
+    so clips cut from a batch can be checked word for word. Sessions cost
+    `latency` plus `seconds_per_char` of the text. With `garble_every`,
+    every n-th boundary event names a word that was not in the text.
+    """
+
+    HEADER = bytes((0xFF, 0xF3, 0x64, 0xC0))
+    FRAME_BYTES = 144
+    FRAME_SECONDS = 576 / 24000
+
+    def __init__(self, latency: float, seconds_per_char: float = 0.0, garble_every: int = 0):
+        super().__init__(latency)
+        self.seconds_per_char = seconds_per_char
+        self.garble_every = garble_every
+        self.sessions = 0
+
+    def _frame(self, word: str) -> bytes:
+        payload = word.encode("utf-8")[:self.FRAME_BYTES - 4]
+        return self.HEADER + payload.ljust(self.FRAME_BYTES - 4, b"\0")
+
+    def _speak(self, text: str) -> tuple:
+        frames = [self._frame("")] * 4
+        boundaries = []
+        for n, token in enumerate(text.split(), start=1):
+            word = re.sub(r"\W", "", token)
+            if not word:
+                continue
+            duration = max(2, len(word) // 2)
+            named = "garbled" if self.garble_every and n % self.garble_every == 0 else word
+            boundaries.append(Boundary(len(frames) * self.FRAME_SECONDS, duration * self.FRAME_SECONDS, named))
+            frames += [self._frame(word)] * duration
+            # Longer pauses after sentences, like a real voice
+            frames += [self._frame("")] * (12 if token[-1] in ".!?" else 1)
+        return b"".join(frames), boundaries
+
+    async def _session(self, text: str) -> tuple:
+        self.calls += 1
+        self.sessions += 1
+        await asyncio.sleep(self.latency + self.seconds_per_char * len(text))
+        if "FAIL" in text:
+            raise RuntimeError("fake TTS failure")
+        return self._speak(text)
+
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        return (await self._session(text))[0]
+
+    async def synthesize_with_boundaries(self, text: str, voice: str) -> tuple:
+        return await self._session(text)
+
+
+def spoken_words(clip: bytes) -> list:
+    """
+    The words a FakeFrameTTSEngine clip speaks, in order.
+    """
+    words = []
+    for frame in mp3_frames(clip):
+        word = clip[frame.start + 4:frame.start + frame.length].rstrip(b"\0").decode("utf-8")
+        if word and (not words or words[-1] != word):
+            words.append(word)
+    return words
+
+
+class FakeUploader:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.uploaded = {}
+
+    async def upload(self, data: bytes, public_id: str) -> str:
+        await asyncio.sleep(self.latency)
+        self.uploaded[public_id] = data
+        return f"https://fake.local/{public_id}.mp3"
+
+
+async def run(slides: int, concurrency: int, tts_latency: float, upload_latency: float, cache=None):
+    notes = [f"Narration for slide {i}." for i in range(1, slides + 1)]
+    notes[len(notes) // 2] = None
+    notes[-1] = "FAIL on purpose"
+    tts = FakeTTSEngine(tts_latency, jitter=tts_latency / 2)
+    uploader = FakeUploader(upload_latency)
+    start = time.perf_counter()
+    results = await synthesize_deck_audio(
+        notes, "fake-voice", "bench", tts=tts, uploader=uploader, concurrency=concurrency,
+        cache=cache, use_cache=cache is not None,
+    )
+    elapsed = time.perf_counter() - start
+    assert [r.index for r in results] == list(range(1, slides + 1))
+    assert results[len(notes) // 2].url is None and results[len(notes) // 2].error is None
+    assert results[-1].error and results[-1].url is None
+    assert all(r.url for r in results if r.data)
+    return elapsed
+
+
+async def run_batched(slides: int, concurrency: int, batch_chars: int, session_latency: float, garble_every: int = 0):
+    rng = random.Random(slides)
+    words = ("revenue", "grew", "twelve", "percent", "cloud", "margin", "pipeline", "customers", "quarter")
+    notes = [
+        " ".join(rng.choice(words) for _ in range(rng.randint(8, 40))) + rng.choice((".", "", "!"))
+        for _ in range(slides)
+    ]
+    notes[len(notes) // 2] = None
+    tts = FakeFrameTTSEngine(session_latency, seconds_per_char=0.0002, garble_every=garble_every)
+    start = time.perf_counter()
+    results = await synthesize_deck_audio(
+        notes, "fake-voice", "bench", tts=tts, uploader=FakeUploader(0), concurrency=concurrency,
+        use_cache=False, batch_chars=batch_chars,
+    )
+    elapsed = time.perf_counter() - start
+    for result, text in zip(results, notes):
+        expected = [re.sub(r"\W", "", token) for token in text.split()] if text else []
+        got = spoken_words(result.data) if result.data else []
+        # Adjacent repeats of a word merge into one run of frames
+        assert got == [w for i, w in enumerate(expected) if not i or expected[i - 1] != w], (result.index, got, expected)
+    return elapsed, tts.sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sequential vs. concurrent audio stage with fake backends")
+    parser.add_argument("--slides", type=int, default=30)
+    parser.add_argument("--tts-latency", type=float, default=0.2)
+    parser.add_argument("--upload-latency", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--session-latency", type=float, default=0.3, help="connection/handshake cost of one TTS session")
+    parser.add_argument("--batch-chars", type=int, default=3000)
+    args = parser.parse_args()
+
+    # One session per slide vs. batches cut back into clips; with garbled
+    # boundaries every batch falls back to per-slide sessions
+    for label, batch_chars, garble in (
+        ("per-slide", 0, 0), ("batched", args.batch_chars, 0), ("batched, garbled boundaries", args.batch_chars, 5),
+    ):
+        elapsed, sessions = asyncio.run(run_batched(args.slides, args.concurrency[-1], batch_chars, args.session_latency, garble))
+        print(f"{args.slides} slides, {label}: {elapsed:.2f} s, {sessions} TTS sessions")
+
+    for concurrency in args.concurrency:
+        elapsed = asyncio.run(run(args.slides, concurrency, args.tts_latency, args.upload_latency))
+        print(f"{args.slides} slides, concurrency {concurrency}: {elapsed:.2f} s")
+
+    # Regenerating an unchanged deck should be served from the TTS cache
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = TTSCache(cache_dir, memory_bytes=0)
+        concurrency = args.concurrency[-1]
+        cold = asyncio.run(run(args.slides, concurrency, args.tts_latency, args.upload_latency, cache))
+        warm = asyncio.run(run(args.slides, concurrency, args.tts_latency, args.upload_latency, cache))
+        print(f"{args.slides} slides, TTS cache cold: {cold:.2f} s, warm: {warm:.2f} s, stats: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Per-request HTTP sessions vs. the shared pooled session from src.clients.
+
+Starts a local stub of the Cloudinary upload API, points the cloudinary
+config at it and uploads the same payload concurrently, counting the TCP
+connections the stub sees:
+
+    PYTHONPATH=. python -m src.dev.bench_client_pool --uploads 200 --concurrency 16
+"""
+import sys
+import time
+import asyncio
+import argparse
+
+import aiohttp
+from aiohttp import web
+import cloudinary
+
+from src import clients
+from src.clients import cloudinary_upload, _cloudinary_request
+
+
+class StubCloudinary:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.requests = 0
+        self.peers = set()
+
+    async def upload(self, request: web.Request) -> web.Response:
+        self.peers.add(request.transport.get_extra_info("peername"))
+        form = await request.post()
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        public_id = form.get("public_id", "file")
+        return web.json_response({
+            "public_id": public_id,
+            "secure_url": f"https://stub.local/{public_id}",
+        })
+
+    def reset(self) -> None:
+        self.requests = 0
+        self.peers = set()
+
+
+async def upload_new_session(data: bytes, **options) -> dict:
+    # One session (and therefore one connection) per upload
+    url, params = _cloudinary_request(options)
+    form = aiohttp.FormData()
+    for k, v in params.items():
+        if v:
+            form.add_field(k, str(v))
+    form.add_field("file", data, filename="file")
+    async with aiohttp.ClientSession() as session:
+        async with session.post(url, data=form) as response:
+            return await response.json(content_type=None)
+
+
+async def run(upload, uploads: int, concurrency: int, data: bytes) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(n: int):
+        async with semaphore:
+            result = await upload(data, resource_type="raw", public_id=f"bench_{n}")
+            assert result["public_id"] == f"bench_{n}", result
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(uploads)))
+    return time.perf_counter() - start
+
+
+async def bench(args) -> None:
+    stub = StubCloudinary(args.latency)
+    server = web.Application(client_max_size=64 * 1024 * 1024)
+    server.router.add_post("/v1_1/{cloud}/{resource_type}/upload", stub.upload)
+    runner = web.AppRunner(server, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    cloudinary.config(
+        cloud_name="bench", api_key="bench", api_secret="bench",
+        upload_prefix=f"http://127.0.0.1:{port}",
+    )
+    data = b"x" * args.size
+    try:
+        for name, upload in (("per-request session", upload_new_session), ("pooled session", cloudinary_upload)):
+            stub.reset()
+            elapsed = await run(upload, args.uploads, args.concurrency, data)
+            print(
+                f"{name:20s} {args.uploads} uploads x {args.size} B, concurrency {args.concurrency}: "
+                f"{elapsed:.2f} s, {args.uploads / elapsed:.0f} uploads/s, {len(stub.peers)} connections"
+            )
+    finally:
+        await clients.close_clients()
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Connection reuse benchmark for uploads")
+    parser.add_argument("--uploads", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--size", type=int, default=64 * 1024, help="payload bytes per upload")
+    parser.add_argument("--latency", type=float, default=0.01, help="stub server latency in seconds")
+    args = parser.parse_args()
+    asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Word document generation for 10 KB / 1 MB / 10 MB inputs: the previous
+python-docx build (Document + add_paragraph + save) vs. the template-backed
+writer in src.docx_engine, fed the whole string or 64 KB chunks split as
+/generate_word_doc/stream does. Every run happens in a fresh process;
+tracemalloc counts Python allocations, the RSS growth also counts lxml trees.
+
+    PYTHONPATH=. python -m src.dev.bench_docx --sizes 10K 1M 10M --formats text html
+"""
+import io
+import sys
+import time
+import random
+import argparse
+import resource
+import tracemalloc
+import multiprocessing
+
+from docx import Document
+
+from src.docx_engine import DocxWriter, ParagraphSplitter, docx_base, spooled_docx_file, write_docx
+
+MODES = ("python-docx", "engine", "engine-streamed")
+CHUNK = 64 * 1024
+WORDS = ("pipeline", "latency", "revenue", "cloud", "roadmap", "customer", "quarter", "margin")
+
+
+def _parse_size(size: str) -> int:
+    units = {"K": 1024, "M": 1024 * 1024}
+    return int(size[:-1]) * units[size[-1].upper()] if size[-1].upper() in units else int(size)
+
+
+def _paragraph(rng: random.Random, fmt: str) -> str:
+    words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 60)))
+    if fmt == "text":
+        return words
+    return (
+        f"<p level=\"{rng.randint(0, 2)}\"><span style=\"font-weight: bold\">{rng.choice(WORDS)}</span> "
+        f"<span style=\"color: #C00000\">{words}</span> "
+        f"<span data-link=\"https://example.com/{rng.randint(0, 20)}\">link</span></p>"
+    )
+
+
+def make_chunks(size: int, fmt: str):
+    """
+    About `size` characters of blank-line separated paragraphs, yielded in
+    CHUNK-sized pieces (cut anywhere, like a network body).
+    """
+    rng = random.Random(size)
+    produced, pending = 0, ""
+    while produced < size:
+        pending += _paragraph(rng, fmt) + "\n\n"
+        if len(pending) >= CHUNK:
+            yield pending[:CHUNK]
+            produced += CHUNK
+            pending = pending[CHUNK:]
+    if pending:
+        yield pending
+
+
+def legacy_docx(content: str) -> bytes:
+    # /generate_word_doc before the streaming engine
+    doc = Document()
+    for para in content.split("\n\n"):
+        doc.add_paragraph(para.strip())
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def _rss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _measure(mode: str, size: int, fmt: str, trace: bool) -> dict:
+    docx_base()
+    legacy_docx("warm-up")
+    chunks = list(make_chunks(size, fmt))
+    content = "".join(chunks) if mode != "engine-streamed" else None
+    rss_before = _rss_kb()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    if mode == "python-docx":
+        out = len(legacy_docx(content))
+    elif mode == "engine":
+        with write_docx(content, fmt) as f:
+            out = f.seek(0, io.SEEK_END)
+    else:
+        writer = DocxWriter(spooled_docx_file())
+        splitter = ParagraphSplitter()
+        for chunk in chunks:
+            writer.write(splitter.feed(chunk), fmt)
+        writer.write(splitter.close(), fmt)
+        with writer.finish() as f:
+            out = f.seek(0, io.SEEK_END)
+    elapsed = time.perf_counter() - start
+    traced = tracemalloc.get_traced_memory()[1] if trace else 0
+    tracemalloc.stop()
+    return {"seconds": elapsed, "size": out, "traced": traced, "rss": (_rss_kb() - rss_before) * 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Word document generation benchmark")
+    parser.add_argument("--sizes", nargs="+", default=["10K", "1M", "10M"])
+    parser.add_argument("--formats", nargs="+", choices=("text", "html"), default=["text", "html"])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--no-tracemalloc", dest="tracemalloc", action="store_false",
+                        help="skip tracemalloc (it slows generation several times)")
+    args = parser.parse_args()
+
+    mb = 1024 * 1024
+    ctx = multiprocessing.get_context("spawn")
+    for fmt in args.formats:
+        for size_arg in args.sizes:
+            size = _parse_size(size_arg)
+            for mode in args.modes:
+                # python-docx has no HTML mode; it wrote the markup as text
+                if mode == "python-docx" and fmt == "html":
+                    continue
+                with ctx.Pool(1) as pool:
+                    r = pool.apply(_measure, (mode, size, fmt, args.tracemalloc))
+                print(
+                    f"{fmt:4s} {size_arg:>4s} {mode:15s} {r['seconds']:7.3f} s  output {r['size'] / mb:6.2f} MB  "
+                    f"tracemalloc peak {r['traced'] / mb:7.1f} MB  RSS growth {r['rss'] / mb:7.1f} MB"
+                )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Full deck render vs. incremental re-render after editing a few slides.
+
+    PYTHONPATH=. python -m src.dev.bench_incremental --slides 60 --changed 2 --template path/to/template.pptx
+"""
+import sys
+import time
+import argparse
+
+from src.layouts import get_registry
+from src.model import PresentationContent
+from src.render import render_pptx_bytes, render_pptx_incremental
+from src.utils import ppt_template
+
+
+def make_deck(slides: int, layout: str, placeholder: str, edits: dict) -> PresentationContent:
+    return PresentationContent(
+        filename="bench",
+        theme_mode="light",
+        slides=[
+            {
+                "slide_number": n,
+                "layout": layout,
+                "placeholders": [{
+                    "placeholder_name": placeholder,
+                    "content": [f"<p level=\"1\"><span style=\"font-weight: bold\">{edits.get(n, f'Slide {n}')}</span> body text</p>"],
+                }],
+                "speaker_notes": f"Narration for slide {n}.",
+            }
+            for n in range(1, slides + 1)
+        ],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental re-render benchmark")
+    parser.add_argument("--template", default=ppt_template)
+    parser.add_argument("--layout", default="Title_Pillar")
+    parser.add_argument("--placeholder", default="Title")
+    parser.add_argument("--slides", type=int, default=60)
+    parser.add_argument("--changed", type=int, default=2)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    get_registry()
+
+    original = make_deck(args.slides, args.layout, args.placeholder, {})
+    previous = render_pptx_incremental(original, None, args.template)[:2]
+    step = max(1, args.slides // max(1, args.changed))
+    edited = make_deck(
+        args.slides, args.layout, args.placeholder,
+        {n: f"Edited slide {n}" for n in range(1, args.slides + 1, step)[:args.changed]},
+    )
+
+    full = []
+    incremental = []
+    for _ in range(args.rounds):
+        start = time.perf_counter()
+        render_pptx_bytes(edited, args.template)
+        full.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        _, _, rebuilt = render_pptx_incremental(edited, previous, args.template)
+        incremental.append(time.perf_counter() - start)
+    full_ms = min(full) * 1000
+    incremental_ms = min(incremental) * 1000
+    print(f"{args.slides} slides, {len(rebuilt)} changed (rebuilt {rebuilt})")
+    print(f"full render:        {full_ms:.1f} ms")
+    print(f"incremental render: {incremental_ms:.1f} ms ({full_ms / incremental_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
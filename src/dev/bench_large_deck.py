@@ -0,0 +1,75 @@
+"""
+Peak memory of rendering synthetic 50/300/1000-slide decks in memory
+(render_pptx_bytes) vs. in chunks to a file (render_pptx_file). Every run
+happens in a fresh process so the RSS high-water mark is its own; the
+tracemalloc peak counts Python allocations only, the RSS growth also counts
+lxml trees.
+
+    PYTHONPATH=. python -m src.dev.bench_large_deck --slides 50 300 1000 --template path/to/template.pptx
+"""
+import os
+import sys
+import time
+import argparse
+import resource
+import tempfile
+import tracemalloc
+import multiprocessing
+
+from src.dev.bench_render_pool import make_deck
+from src.render import render_pptx_bytes
+from src.render_large import render_pptx_file, LARGE_DECK_CHUNK
+from src.render_pool import warm_worker
+from src.utils import ppt_template
+
+
+def _rss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _measure(mode: str, slides: int, args) -> dict:
+    warm_worker(args.template)
+    deck = make_deck(0, slides, args.layout, args.placeholder)
+    # Warm-up render so lazy template state is not counted
+    render_pptx_bytes(make_deck(0, 2, args.layout, args.placeholder), args.template)
+    rss_before = _rss_kb()
+    if args.tracemalloc:
+        tracemalloc.start()
+    start = time.perf_counter()
+    if mode == "in-memory":
+        size = len(render_pptx_bytes(deck, args.template))
+    else:
+        with tempfile.NamedTemporaryFile(suffix=".pptx") as f:
+            size = render_pptx_file(deck, f.name, args.template, args.chunk)
+    elapsed = time.perf_counter() - start
+    traced = tracemalloc.get_traced_memory()[1] if args.tracemalloc else 0
+    tracemalloc.stop()
+    return {"seconds": elapsed, "size": size, "traced": traced, "rss": (_rss_kb() - rss_before) * 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Large deck memory benchmark")
+    parser.add_argument("--template", default=ppt_template)
+    parser.add_argument("--layout", default="Title_Pillar")
+    parser.add_argument("--placeholder", default="Title")
+    parser.add_argument("--slides", type=int, nargs="+", default=[50, 300, 1000])
+    parser.add_argument("--chunk", type=int, default=LARGE_DECK_CHUNK)
+    parser.add_argument("--no-tracemalloc", dest="tracemalloc", action="store_false",
+                        help="skip tracemalloc (it slows rendering several times)")
+    args = parser.parse_args()
+
+    mb = 1024 * 1024
+    ctx = multiprocessing.get_context("spawn")
+    print(f"chunk {args.chunk} slides, pid {os.getpid()}")
+    for slides in args.slides:
+        for mode in ("in-memory", "chunked"):
+            with ctx.Pool(1) as pool:
+                r = pool.apply(_measure, (mode, slides, args))
+            print(
+                f"{slides:5d} slides {mode:10s} {r['seconds']:6.2f} s  output {r['size'] / mb:6.2f} MB  "
+                f"tracemalloc peak {r['traced'] / mb:7.1f} MB  RSS growth {r['rss'] / mb:7.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
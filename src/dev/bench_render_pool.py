@@ -0,0 +1,105 @@
+"""
+Deck rendering throughput on warm process pools of 1/2/4/8 workers vs. the
+thread executor, and the cost of returning large results through shared
+memory vs. pickling them over the result pipe.
+
+    PYTHONPATH=. python -m src.dev.bench_render_pool --decks 32 --slides 40 --template path/to/template.pptx
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+from src.executor import BoundedExecutor
+from src.model import PresentationContent
+from src.render_pool import warm_worker, _render_job, _to_shared, _from_shared
+from src.utils import ppt_template
+
+
+def make_deck(n: int, slides: int, layout: str, placeholder: str) -> PresentationContent:
+    return PresentationContent(
+        filename=f"bench_{n}",
+        theme_mode="light",
+        slides=[
+            {
+                "slide_number": i,
+                "layout": layout,
+                "placeholders": [{
+                    "placeholder_name": placeholder,
+                    "content": [f"<p level=\"1\"><span style=\"font-weight: bold\">Deck {n}</span> slide {i}</p>"],
+                }],
+                "speaker_notes": f"Narration for slide {i}.",
+            }
+            for i in range(1, slides + 1)
+        ],
+    )
+
+
+def _payload_job(size: int, shared: bool):
+    data = b"\x00" * size
+    return _to_shared(data, os.getppid()) if shared else data
+
+
+async def throughput(executor: BoundedExecutor, decks: list, template: str) -> float:
+    await executor.prestart()
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        executor.run(_render_job, deck, None, template, os.getpid()) for deck in decks
+    ))
+    for result in results:
+        _from_shared(result[0])
+    return len(decks) / (time.perf_counter() - start)
+
+
+async def transfer(executor: BoundedExecutor, size: int, shared: bool, rounds: int) -> float:
+    await executor.run(_payload_job, 1, shared)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        _from_shared(await executor.run(_payload_job, size, shared))
+    return (time.perf_counter() - start) / rounds
+
+
+async def bench(args) -> None:
+    decks = [make_deck(n, args.slides, args.layout, args.placeholder) for n in range(args.decks)]
+    print(f"{args.decks} decks x {args.slides} slides, {os.cpu_count()} CPUs")
+
+    threads = BoundedExecutor("bench", "thread", 1, args.decks)
+    warm_worker(args.template)
+    print(f"thread x1:  {await throughput(threads, decks, args.template):6.1f} decks/s")
+    threads.shutdown()
+
+    for workers in args.workers:
+        pool = BoundedExecutor("bench", "process", workers, args.decks)
+        pool.set_initializer(warm_worker, (args.template,))
+        try:
+            print(f"process x{workers}: {await throughput(pool, decks, args.template):6.1f} decks/s")
+        finally:
+            pool.shutdown()
+
+    pool = BoundedExecutor("bench", "process", 1, 4)
+    try:
+        size = args.payload_mb * 1024 * 1024
+        pickled = await transfer(pool, size, False, args.rounds)
+        shared = await transfer(pool, size, True, args.rounds)
+        print(f"{args.payload_mb} MB result: pickled {pickled * 1000:.1f} ms, shared memory {shared * 1000:.1f} ms")
+    finally:
+        pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process pool rendering benchmark")
+    parser.add_argument("--template", default=ppt_template)
+    parser.add_argument("--layout", default="Title_Pillar")
+    parser.add_argument("--placeholder", default="Title")
+    parser.add_argument("--decks", type=int, default=32)
+    parser.add_argument("--slides", type=int, default=40)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--payload-mb", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
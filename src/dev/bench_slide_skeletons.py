@@ -0,0 +1,105 @@
+"""
+Per-slide build time of python-pptx add_slide + placeholder scan (before)
+vs. cloning a per-layout skeleton (after), for every layout and theme in
+layouts_template.yaml that the template has. Also checks that both paths
+produce identical slide XML.
+
+    PYTHONPATH=. python -m src.dev.bench_slide_skeletons --template path/to/template.pptx
+"""
+import sys
+import time
+import argparse
+
+from lxml import etree
+
+from src.layouts import get_registry
+from src.model import Slide
+from src.render import add_slide
+from src.slide_skeletons import SkeletonSet
+from src.template_cache import new_presentation
+from src.utils import process_html, ppt_template
+
+
+def legacy_add_slide(prs, slide_content, theme_mode, registry, skeletons=None):
+    # add_slide as it was before skeletons
+    layout_name = registry.require_layout(slide_content.layout)
+    layout_index = registry.reverse_index[layout_name]["layout_index"][theme_mode]
+    placeholders_reverse = registry.reverse_index[layout_name]["placeholders"]
+    slide = prs.slides.add_slide(prs.slide_layouts[layout_index])
+    for placeholder in slide_content.placeholders:
+        try:
+            index = placeholders_reverse[placeholder.placeholder_name][theme_mode]
+            ph = slide.placeholders.__getitem__(idx=index)
+            text_frame = ph.text_frame
+            text_frame.clear()
+            text_frame._element.remove(text_frame.paragraphs[0]._p)
+            if isinstance(placeholder.content, list):
+                for c in placeholder.content:
+                    process_html(c, text_frame.add_paragraph())
+        except Exception:
+            break
+    return slide
+
+
+def sample_slide(layout: str, placeholders: list) -> Slide:
+    return Slide(
+        slide_number=1,
+        layout=layout,
+        placeholders=[
+            {"placeholder_name": name, "content": [
+                f"<p level=\"1\"><span style=\"font-weight: bold\">{name}</span> sample text</p>",
+                "<p level=\"2\">Second point</p>",
+            ]}
+            for name in placeholders
+        ],
+    )
+
+
+def time_build(build, template, slide, theme_mode, registry, rounds) -> tuple:
+    prs = new_presentation(template)
+    skeletons = SkeletonSet()
+    # First call builds the skeleton (and python-pptx lazy state); not timed
+    first = build(prs, slide, theme_mode, registry, skeletons)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        build(prs, slide, theme_mode, registry, skeletons)
+    return (time.perf_counter() - start) / rounds, first
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Slide skeleton micro-benchmark")
+    parser.add_argument("--template", default=ppt_template)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    registry = get_registry()
+    layout_count = len(new_presentation(args.template).slide_layouts)
+
+    totals = [0.0, 0.0]
+    rows = 0
+    skipped = []
+    mismatched = []
+    for layout, entry in sorted(registry.reverse_index.items()):
+        for theme_mode, layout_index in sorted(entry["layout_index"].items()):
+            if layout_index >= layout_count:
+                skipped.append(f"{layout}/{theme_mode}")
+                continue
+            slide = sample_slide(layout, [
+                name for name, themes in entry["placeholders"].items() if theme_mode in themes
+            ])
+            before, legacy = time_build(legacy_add_slide, args.template, slide, theme_mode, registry, args.rounds)
+            after, cloned = time_build(add_slide, args.template, slide, theme_mode, registry, args.rounds)
+            if etree.tostring(legacy._element) != etree.tostring(cloned._element):
+                mismatched.append(f"{layout}/{theme_mode}")
+            totals[0] += before
+            totals[1] += after
+            rows += 1
+            print(f"{layout:40s} {theme_mode:5s} before {before * 1e6:8.0f} us  after {after * 1e6:8.0f} us  {before / after:5.1f}x")
+    if rows:
+        print(f"mean per slide: before {totals[0] / rows * 1e6:.0f} us, after {totals[1] / rows * 1e6:.0f} us ({totals[0] / totals[1]:.1f}x)")
+    if skipped:
+        print(f"skipped {len(skipped)} layout/theme pairs beyond the template's {layout_count} layouts")
+    print(f"identical slide XML: {not mismatched}" + (f" (differs: {mismatched})" if mismatched else ""))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
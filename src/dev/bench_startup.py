@@ -0,0 +1,194 @@
+"""
+Cold start: plain `uvicorn src.api_server:app` vs. the preload-and-fork
+launcher in src.serve. For each mode a fresh server is started (local
+storage, the fake OpenAI server for /generate_json_content) and timed from
+launch to its first 200, then every endpoint gets its first requests
+(one per worker, on new connections) and a few warm ones; the proportional
+set size of the whole process tree shows what the workers share.
+
+    PYTHONPATH=. python -m src.dev.bench_startup --workers 1 4 --rounds 3
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import statistics
+import subprocess
+import urllib.error
+import urllib.request
+
+from src.dev.bench_suite import make_deck
+from src.dev.bench_validate import registry_entries
+
+MODES = ("uvicorn", "serve")
+WARM_REQUESTS = 5
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def endpoints() -> list:
+    deck = make_deck(registry_entries("light"), "light", 20, "rich", 20, "bench_startup")
+    return [
+        ("rules", "GET", "/get_presentation_rules", None),
+        ("validate", "POST", "/validate_presentation", {"json_content": deck}),
+        ("word_doc", "POST", "/generate_word_doc", {"content": "Cold start\n\n<p level=\"1\">bullet</p>", "format": "html"}),
+        ("json_content", "POST", "/generate_json_content", {"user_text": "Cold start", "no_cache": True}),
+    ]
+
+
+def call(port: int, method: str, path: str, body) -> tuple:
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}{path}", data=data, method=method,
+        headers={"Content-Type": "application/json", "Connection": "close"},
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, time.perf_counter() - start
+
+
+def wait_ready(port: int, process: subprocess.Popen, timeout: float = 60) -> float:
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with {process.returncode}")
+        try:
+            if call(port, "GET", "/get_presentation_rules", None)[0] == 200:
+                return time.perf_counter()
+        except OSError:
+            time.sleep(0.01)
+    raise RuntimeError("server did not become ready")
+
+
+def tree_pss_mb(pid: int) -> float:
+    """
+    Proportional set size of `pid` and its descendants: shared pages are
+    split between the processes mapping them, so copy-on-write sharing
+    shows up as a smaller total.
+    """
+    pids, total = [pid], 0
+    while pids:
+        current = pids.pop()
+        try:
+            with open(f"/proc/{current}/smaps_rollup") as f:
+                total += sum(int(line.split()[1]) for line in f if line.startswith("Pss:"))
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return total / 1024
+
+
+def launch(mode: str, port: int, workers: int, env: dict) -> subprocess.Popen:
+    if mode == "uvicorn":
+        command = ["-m", "uvicorn", "src.api_server:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    else:
+        command = ["-m", "src.serve", "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    return subprocess.Popen([sys.executable, *command], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def measure(mode: str, workers: int, env: dict, requests: list) -> dict:
+    port = free_port()
+    start = time.perf_counter()
+    process = launch(mode, port, workers, env)
+    try:
+        result = {"ready": wait_ready(port, process) - start}
+        # Give late workers time to boot so "first" measures cold handlers,
+        # not a worker still importing the app
+        time.sleep(1 + 0.5 * workers)
+        for name, method, path, body in requests:
+            cold = []
+            for _ in range(workers):
+                status, seconds = call(port, method, path, body)
+                if status != 200:
+                    raise RuntimeError(f"{mode} {path} returned {status}")
+                cold.append(seconds)
+            warm = [call(port, method, path, body)[1] for _ in range(WARM_REQUESTS)]
+            result[name] = {"first": cold[0], "cold_max": max(cold), "warm": statistics.median(warm)}
+        result["pss_mb"] = tree_pss_mb(process.pid)
+        return result
+    finally:
+        process.terminate()
+        process.wait(30)
+
+
+def import_seconds(env: dict) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import src.api_server"], env=env, check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup and first-request latency benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    storage_dir = tempfile.mkdtemp(prefix="bench_startup_")
+    openai_port = free_port()
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.getcwd(),
+        STORAGE_BACKEND="local",
+        LOCAL_STORAGE_DIR=storage_dir,
+        OPENAI_BASE_URL=f"http://127.0.0.1:{openai_port}/v1",
+        OPENAI_API_KEY="fake",
+        TTS_CACHE_ENABLED="0",
+    )
+    fake_openai = subprocess.Popen(
+        [sys.executable, "-m", "src.dev.fake_openai_server", "--port", str(openai_port), "--delay", "0"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready_fake = time.perf_counter()
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", openai_port), timeout=1).close()
+                break
+            except OSError:
+                if time.perf_counter() - wait_ready_fake > 30:
+                    raise
+                time.sleep(0.05)
+
+        imports = min(import_seconds(env) for _ in range(args.rounds))
+        print(f"import src.api_server: {imports * 1000:.0f} ms (best of {args.rounds})")
+        requests = endpoints()
+        for workers in args.workers:
+            for mode in args.modes:
+                runs = [measure(mode, workers, env, requests) for _ in range(args.rounds)]
+                best = lambda *keys: min(_get(run, keys) for run in runs) * 1000
+                print(
+                    f"{mode:7s} workers={workers}  ready {best('ready'):6.0f} ms  "
+                    f"PSS {min(run['pss_mb'] for run in runs):6.1f} MB"
+                )
+                for name, *_ in requests:
+                    print(
+                        f"    {name:12s} first {best(name, 'first'):7.1f} ms  "
+                        f"cold max {best(name, 'cold_max'):7.1f} ms  warm {best(name, 'warm'):6.1f} ms"
+                    )
+    finally:
+        fake_openai.terminate()
+        fake_openai.wait(10)
+
+
+def _get(run: dict, keys: tuple) -> float:
+    for key in keys:
+        run = run[key]
+    return run
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Upload throughput of the S3 backend against the in-process fake store:
+single PUT vs. multipart with 1..N parallel parts, then a repeat upload of
+the same content-hash key (skipped).
+
+    PYTHONPATH=. python -m src.dev.bench_storage --size-mb 48 --latency 0.05
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+from aiohttp import web
+
+from src import clients
+from src.storage import S3Storage, object_key, content_digest
+from src.dev.fake_s3_server import FakeS3, make_app
+
+
+async def bench(args) -> None:
+    fake = FakeS3("bench", "benchsecret", latency=args.latency)
+    runner = web.AppRunner(make_app(fake), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    endpoint = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+    data = os.urandom(args.size_mb * 1024 * 1024)
+    part_size = args.part_mb * 1024 * 1024
+    try:
+        runs = [("single PUT", len(data) + 1, 1)] + [
+            (f"multipart x{n}", part_size, n) for n in args.part_concurrency
+        ]
+        for name, threshold, part_concurrency in runs:
+            storage = S3Storage(
+                endpoint=endpoint, bucket="bench", access_key="bench", secret_key="benchsecret",
+                multipart_threshold=threshold, part_size=part_size, part_concurrency=part_concurrency,
+            )
+            key = object_key("bench", content_digest(data), name.replace(" ", "_"), ".bin")
+            start = time.perf_counter()
+            stored = await storage.put(data, key, "application/octet-stream")
+            elapsed = time.perf_counter() - start
+            assert not stored.skipped and fake.objects[("bench", key)] == data
+            print(f"{name:14s} {args.size_mb} MB: {elapsed:.2f} s, {args.size_mb / elapsed:.1f} MB/s")
+        start = time.perf_counter()
+        stored = await storage.put(data, key, "application/octet-stream")
+        assert stored.skipped
+        print(f"{'repeat (skip)':14s} {args.size_mb} MB: {time.perf_counter() - start:.4f} s")
+        print(f"fake store ops: {dict(fake.ops)}, max parallel parts: {fake.max_parallel_parts}")
+    finally:
+        await clients.close_clients()
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="S3 backend upload benchmark")
+    parser.add_argument("--size-mb", type=int, default=48)
+    parser.add_argument("--part-mb", type=int, default=8)
+    parser.add_argument("--part-concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--latency", type=float, default=0.05, help="fake store latency per request")
+    args = parser.parse_args()
+    asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
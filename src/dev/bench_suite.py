@@ -0,0 +1,530 @@
+"""
+Reproducible benchmark suite: builds a synthetic deck corpus from
+layouts_template.yaml (every layout and theme the template has, several
+deck sizes and HTML complexities), runs the render pipeline and the HTTP
+endpoints end to end against in-memory storage, fake TTS and a canned LLM,
+and reports throughput, latency percentiles and peak memory per scenario.
+
+    PYTHONPATH=. python -m src.dev.bench_suite run --template path/to/template.pptx --out bench.json
+    PYTHONPATH=. python -m src.dev.bench_suite compare baseline.json bench.json --threshold 0.15
+    PYTHONPATH=. python -m src.dev.bench_suite corpus --out corpus.json
+
+`run --baseline baseline.json` compares right away; compare exits with
+status 1 when a scenario regressed beyond the threshold.
+"""
+import os
+import io
+import sys
+import re
+import json
+import math
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+import platform
+import resource
+import tempfile
+import contextlib
+import tracemalloc
+from types import SimpleNamespace
+
+from loguru import logger
+from pptx import Presentation
+from pptx.enum.shapes import PP_PLACEHOLDER
+
+# The suite runs everything in this process, without the TTS disk cache
+os.environ.setdefault("PPT_CPU_EXECUTOR", "thread")
+os.environ.setdefault("TTS_CACHE_ENABLED", "0")
+
+from src import storage as storage_module
+from src.dev.bench_audio_pipeline import FakeTTSEngine
+from src.dev.fake_openai_server import canned_deck
+from src.layouts import get_registry
+from src.model import PresentationContent
+from src.render import render_pptx_bytes, render_pptx_incremental, render_docx_bytes
+from src.render_large import render_pptx_file
+from src.storage import StorageBackend
+from src.template_cache import new_presentation, template_digest
+from src.utils import compile_html, ppt_template
+
+
+HTML_LEVELS = ("plain", "simple", "rich")
+THEME_MODES = ("dark", "light")
+# Placeholder types python-pptx never clones onto a new slide
+UNCLONED_PLACEHOLDERS = (PP_PLACEHOLDER.DATE, PP_PLACEHOLDER.FOOTER, PP_PLACEHOLDER.SLIDE_NUMBER)
+# Their registry names, for decks built without the template at hand
+UNCLONED_NAMES = re.compile(r"(Date|Footer|Slide Number)( Placeholder)?( \d+)?", re.IGNORECASE)
+
+
+class MemoryStorage(StorageBackend):
+    """
+    Storage backend that keeps only object sizes; stands in for Cloudinary/S3.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        super().__init__(check_exists=True)
+        self.objects = {}
+
+    def url_for(self, key: str) -> str:
+        return f"memory://{key}"
+
+    async def _exists(self, key: str) -> bool:
+        return key in self.objects
+
+    async def _upload(self, data, key: str, content_type: str, size: int) -> str:
+        if hasattr(data, "read"):
+            data.seek(0)
+            size = len(data.read())
+        self.objects[key] = size
+        return self.url_for(key)
+
+
+class CannedLLM:
+    """
+    Minimal AsyncOpenAI stand-in returning a canned deck after `latency`.
+    """
+
+    def __init__(self, latency: float, theme_mode: str = "light"):
+        content = "```json\n" + json.dumps(canned_deck(theme_mode)) + "\n```"
+        usage = SimpleNamespace(prompt_tokens=1000, completion_tokens=len(content) // 4)
+        self.completion = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage,
+        )
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self.completion
+
+
+def layout_entries(template: str) -> tuple:
+    """
+    ([(layout, theme_mode, placeholder names)], skipped "layout/theme") for
+    every registry layout, split by whether the template has its slide
+    layout. Only placeholders a new slide actually gets are listed: not
+    date, footer or slide number, nor ones the template's layout lacks.
+    """
+    registry = get_registry()
+    slide_layouts = new_presentation(template).slide_layouts
+    layout_count = len(slide_layouts)
+    entries, skipped = [], []
+    for layout, entry in sorted(registry.reverse_index.items()):
+        for theme_mode, layout_index in sorted(entry["layout_index"].items()):
+            if theme_mode not in THEME_MODES:
+                continue
+            if layout_index >= layout_count:
+                skipped.append(f"{layout}/{theme_mode}")
+                continue
+            fillable = {
+                ph.placeholder_format.idx for ph in slide_layouts[layout_index].placeholders
+                if ph.placeholder_format.type not in UNCLONED_PLACEHOLDERS
+            }
+            names = sorted(
+                name for name, themes in entry["placeholders"].items()
+                if themes.get(theme_mode) in fillable
+            )
+            entries.append((layout, theme_mode, names))
+    return entries, skipped
+
+
+def bullet(rng: random.Random, html: str, tag: str) -> str:
+    """
+    One placeholder paragraph; `tag` keeps every string unique so the HTML
+    compile cache does not hide parsing cost.
+    """
+    words = " ".join(rng.choice(("pipeline", "latency", "revenue", "cloud", "roadmap", "customer")) for _ in range(6))
+    if html == "plain":
+        return f"{words} {tag}"
+    if html == "simple":
+        return f"<p level=\"{rng.randint(1, 2)}\"><span style=\"font-weight: bold\">{tag}</span> {words}</p>"
+    spans = [
+        f"<span style=\"font-weight: bold; color: #C74634\">{tag}</span>",
+        f"<span style=\"font-style: italic\"> {words}</span>",
+        f"<span style=\"text-decoration: underline\"> detail</span>",
+        f"<span data-link=\"https://example.com/{tag}\"> link</span>",
+    ]
+    return f"<p level=\"{rng.randint(1, 3)}\">{''.join(spans[:rng.randint(2, 4)])}</p>"
+
+
+def make_deck(entries: list, theme_mode: str, slides: int, html: str, seed: int, name: str) -> dict:
+    """
+    Deck of `slides` slides cycling through every layout available in
+    `theme_mode`, filling each placeholder with 1-4 paragraphs.
+    """
+    rng = random.Random(seed)
+    themed = [entry for entry in entries if entry[1] == theme_mode]
+    deck_slides = []
+    for i in range(1, slides + 1):
+        layout, _, names = themed[(i - 1) % len(themed)]
+        deck_slides.append({
+            "slide_number": i,
+            "layout": layout,
+            "placeholders": [
+                {"placeholder_name": ph, "content": [bullet(rng, html, f"{name}-{i}-{j}-{k}") for k in range(rng.randint(1, 4))]}
+                for j, ph in enumerate(names)
+            ],
+            "speaker_notes": f"Narration for {name} slide {i}.",
+        })
+    return {"filename": name, "theme_mode": theme_mode, "slides": deck_slides}
+
+
+def build_corpus(template: str, sizes: list, seed: int) -> dict:
+    """
+    {(theme_mode, html, size): deck dict} covering both themes, every HTML
+    level and every size, plus the layout coverage report.
+    """
+    entries, skipped = layout_entries(template)
+    themes = sorted({entry[1] for entry in entries})
+    decks = {}
+    for theme_mode in themes:
+        for html in HTML_LEVELS:
+            for size in sizes:
+                name = f"bench_{theme_mode}_{html}_{size}"
+                decks[(theme_mode, html, size)] = make_deck(entries, theme_mode, size, html, seed, name)
+    coverage = {"layouts": len(entries), "skipped": skipped, "themes": themes}
+    return {"decks": decks, "coverage": coverage}
+
+
+def check_corpus(corpus: dict, template: str) -> None:
+    """
+    Render the smallest deck of every HTML level once and fail unless its
+    paragraphs went through compile_html and every placeholder the deck
+    fills has text; otherwise the render scenarios time empty slides.
+    """
+    registry = get_registry()
+    smallest = min(size for _, _, size in corpus["decks"])
+    theme_mode = corpus["coverage"]["themes"][0]
+    for html in HTML_LEVELS:
+        deck = PresentationContent(**corpus["decks"][(theme_mode, html, smallest)])
+        before = compile_html.cache_info()
+        prs = Presentation(io.BytesIO(render_pptx_bytes(deck, template)))
+        misses = compile_html.cache_info().misses - before.misses
+        if not misses:
+            raise RuntimeError(f"{html} deck rendered without compiling any HTML")
+        for content, slide in zip(deck.slides, prs.slides):
+            placeholders = registry.reverse_index[registry.require_layout(content.layout)]["placeholders"]
+            filled = {placeholders[ph.placeholder_name][theme_mode] for ph in content.placeholders if ph.content}
+            rendered = {shape.placeholder_format.idx: shape.text_frame.text for shape in slide.placeholders}
+            empty = sorted(idx for idx in filled if not rendered.get(idx, "").strip())
+            if empty:
+                raise RuntimeError(
+                    f"{html} deck slide {content.slide_number} ({content.layout}) left placeholders {empty} empty"
+                )
+
+
+def corpus_digest(corpus: dict) -> str:
+    payload = json.dumps([[list(key), deck] for key, deck in sorted(corpus["decks"].items())], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    # Nearest-rank percentile
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+def _rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Runner:
+    """
+    Times scenarios: one untimed warm-up call, then `rounds` timed calls
+    per item, optionally under tracemalloc.
+    """
+
+    def __init__(self, rounds: int, trace_memory: bool):
+        self.rounds = rounds
+        self.trace_memory = trace_memory
+        self.results = {}
+
+    def run(self, name: str, items: list, call, units: int = 1, unit: str = "calls") -> None:
+        """
+        `call(item)` is one operation; throughput counts `units` `unit`
+        (e.g. 25 slides) per call.
+        """
+        if not items:
+            return
+        call(items[0])
+        latencies = []
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        for _ in range(self.rounds):
+            for item in items:
+                t0 = time.perf_counter()
+                call(item)
+                latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+        traced = 0.0
+        if self.trace_memory:
+            traced = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            tracemalloc.stop()
+        ms = [value * 1000 for value in latencies]
+        self.results[name] = {
+            "calls": len(latencies),
+            "throughput": round(len(latencies) * units / elapsed, 3),
+            "unit": f"{unit}/s",
+            "p50_ms": round(percentile(ms, 50), 3),
+            "p90_ms": round(percentile(ms, 90), 3),
+            "p99_ms": round(percentile(ms, 99), 3),
+            "max_ms": round(max(ms), 3),
+            "traced_peak_mb": round(traced, 3),
+            "rss_peak_mb": round(_rss_mb(), 1),
+        }
+        r = self.results[name]
+        print(
+            f"{name:45s} {r['calls']:4d} calls  {r['throughput']:9.1f} {r['unit']:9s} p50 {r['p50_ms']:8.1f} ms  "
+            f"p90 {r['p90_ms']:8.1f} ms  p99 {r['p99_ms']:8.1f} ms" + (f"  peak {traced:6.1f} MB" if self.trace_memory else "")
+        )
+
+    def skip(self, name: str, reason: str) -> None:
+        self.results[name] = {"skipped": reason}
+        print(f"{name:45s} skipped: {reason}")
+
+
+def render_scenarios(runner: Runner, corpus: dict, template: str, sizes: list, large_slides: int) -> None:
+    decks = {key: PresentationContent(**deck) for key, deck in corpus["decks"].items()}
+    for html in HTML_LEVELS:
+        for size in sizes:
+            items = [deck for (_, level, n), deck in decks.items() if level == html and n == size]
+            runner.run(f"render/{html}/{size}", items, lambda deck: render_pptx_bytes(deck, template), units=size, unit="slides")
+
+    # One changed slide on top of the previous render
+    size = sizes[-1]
+    deck = decks[(corpus["coverage"]["themes"][0], "simple", size)]
+    pptx_bytes, hashes, _ = render_pptx_incremental(deck, None, template)
+    edited = deck.model_copy(deep=True)
+    edited.slides[size // 2].placeholders[0].content = ["Edited paragraph"] if edited.slides[size // 2].placeholders else []
+    runner.run(f"render_incremental/{size}", [edited], lambda d: render_pptx_incremental(d, (pptx_bytes, hashes), template))
+
+    if large_slides:
+        entries, _ = layout_entries(template)
+        large = PresentationContent(**make_deck(entries, corpus["coverage"]["themes"][0], large_slides, "simple", 1, "bench_large"))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "large.pptx")
+            runner.run(f"render_large/{large_slides}", [large], lambda d: render_pptx_file(d, path, template), units=large_slides, unit="slides")
+
+    text = "\n\n".join(f"Paragraph {i}: " + "lorem ipsum " * 40 for i in range(50))
+    runner.run("render_docx/50", [text], render_docx_bytes)
+
+
+def api_scenarios(runner: Runner, corpus: dict, template: str, sizes: list, tts_latency: float, llm_latency: float) -> None:
+    """
+    Endpoints through the ASGI app; every call uses a new filename so the
+    content-addressed storage never short-circuits the render.
+    """
+    storage = MemoryStorage()
+    storage_module._storage = storage
+    import src.api_server as api
+    import src.audio as audio
+    from fastapi.testclient import TestClient
+
+    api.storage = storage
+    api.ppt_template = template
+    audio.EdgeTTSEngine = lambda: FakeTTSEngine(tts_latency)
+    api.get_openai_client = lambda: CannedLLM(llm_latency)
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    counter = iter(range(10 ** 9))
+
+    def unique(deck: dict) -> dict:
+        return dict(deck, filename=f"{deck['filename']}_{next(counter)}")
+
+    def post(path: str, body: dict) -> None:
+        response = client.post(path, json=body)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}: {response.text[:200]}")
+
+    with TestClient(api.app) as client:
+        size = sizes[len(sizes) // 2]
+        decks = [deck for (_, html, n), deck in corpus["decks"].items() if n == size and html == "simple"]
+        runner.run(
+            f"api/generate_presentation/{size}", decks,
+            lambda deck: post("/generate_presentation", {"json_content": unique(deck)}), units=size, unit="slides",
+        )
+        runner.run(
+            f"api/generate_ppt_with_audio/{size}", decks,
+            lambda deck: post("/generate_ppt_with_audio", {"json_content": unique(deck)}), units=size, unit="slides",
+        )
+        small = [deck for (_, html, n), deck in corpus["decks"].items() if n == sizes[0]]
+        runner.run(
+            f"api/generate_presentations_batch/{len(small)}x{sizes[0]}", [small],
+            lambda batch: post("/generate_presentations_batch", {"decks": [unique(deck) for deck in batch]}),
+            units=len(small), unit="decks",
+        )
+        runner.run(
+            "api/generate_json_content", [f"Topic {i}" for i in range(4)],
+            lambda text: post("/generate_json_content", {"user_text": f"{text} {next(counter)}", "no_cache": True}),
+        )
+        runner.run(
+            "api/generate_word_doc", ["\n\n".join(f"Paragraph {i}" for i in range(50))],
+            lambda text: post("/generate_word_doc", {"content": f"{text}\n\n{next(counter)}"}),
+        )
+
+
+def introspection_scenarios(runner: Runner, template: str) -> None:
+    """
+    The src/dev template inspection helpers, with their output discarded.
+    """
+    from src.dev import print_layout_placeholders as placeholders
+    placeholders.TEMPLATE_PATH = template
+
+    def quiet(fn, *args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn(*args)
+
+    runner.run("dev/print_layout_placeholders", [None], lambda name: quiet(placeholders.print_layout_placeholders, name))
+    try:
+        from src.dev import maintain
+    except ImportError as e:
+        runner.skip("dev/create_layout_all", f"import failed: {e}")
+        return
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # create_layout_all writes layouts_all.yaml to the working directory
+        os.chdir(tmp)
+        try:
+            runner.run("dev/create_layout_all", [template], lambda path: quiet(maintain.create_layout_all, path))
+        finally:
+            os.chdir(cwd)
+
+
+def run(args) -> int:
+    sizes = [5, 25] if args.quick else args.sizes
+    corpus = build_corpus(args.template, sizes, args.seed)
+    coverage = corpus["coverage"]
+    print(
+        f"corpus {corpus_digest(corpus)}: {len(corpus['decks'])} decks, {coverage['layouts']} layout/theme pairs"
+        f" ({len(coverage['skipped'])} not in template), sizes {sizes}"
+    )
+    # Per-request log lines would drown the report
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    check_corpus(corpus, args.template)
+    runner = Runner(1 if args.quick else args.rounds, args.tracemalloc)
+    render_scenarios(runner, corpus, args.template, sizes, 0 if args.quick else args.large_slides)
+    api_scenarios(runner, corpus, args.template, sizes, args.tts_latency, args.llm_latency)
+    introspection_scenarios(runner, args.template)
+
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "template_digest": template_digest(args.template)[:16],
+            "corpus_digest": corpus_digest(corpus),
+            "coverage": coverage,
+            "args": {k: v for k, v in vars(args).items() if k not in ("func", "out", "baseline")},
+        },
+        "scenarios": runner.results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.out}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            return compare_reports(json.load(f), report, args.threshold)
+    return 0
+
+
+# (metric, True when higher is worse)
+COMPARED = (("p50_ms", True), ("p90_ms", True), ("throughput", False), ("traced_peak_mb", True))
+
+
+def compare_reports(baseline: dict, current: dict, threshold: float) -> int:
+    """
+    Print per-scenario changes and return 1 if any compared metric got
+    worse by more than `threshold` (a fraction).
+    """
+    if baseline["meta"].get("corpus_digest") != current["meta"].get("corpus_digest"):
+        print("warning: corpus differs from the baseline (template, sizes or seed changed)")
+    regressions = []
+    for name, result in current["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if base is None or "skipped" in base or "skipped" in result:
+            continue
+        changes = []
+        for metric, higher_is_worse in COMPARED:
+            old, new = base.get(metric, 0), result.get(metric, 0)
+            if not old or not new:
+                continue
+            change = (new - old) / old
+            worse = change > threshold if higher_is_worse else change < -threshold
+            changes.append(f"{metric} {change:+.0%}" + (" REGRESSED" if worse else ""))
+            if worse:
+                regressions.append(f"{name} {metric}")
+        print(f"{name:45s} " + ", ".join(changes))
+    missing = sorted(set(baseline["scenarios"]) - set(current["scenarios"]))
+    if missing:
+        print(f"not in current run: {missing}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {threshold:.0%}: {regressions}")
+        return 1
+    print(f"no regressions beyond {threshold:.0%}")
+    return 0
+
+
+def compare(args) -> int:
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    return compare_reports(baseline, current, args.threshold)
+
+
+def dump_corpus(args) -> int:
+    corpus = build_corpus(args.template, args.sizes, args.seed)
+    with open(args.out, "w") as f:
+        json.dump({"coverage": corpus["coverage"], "decks": list(corpus["decks"].values())}, f, indent=2)
+    print(f"wrote {len(corpus['decks'])} decks to {args.out}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render pipeline benchmark suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def corpus_args(p):
+        p.add_argument("--template", default=ppt_template)
+        p.add_argument("--sizes", type=int, nargs="+", default=[5, 25, 100])
+        p.add_argument("--seed", type=int, default=1)
+
+    p = commands.add_parser("run", help="run the suite")
+    corpus_args(p)
+    p.add_argument("--rounds", type=int, default=3)
+    p.add_argument("--large-slides", type=int, default=300, help="slides in the low-memory render scenario; 0 skips it")
+    p.add_argument("--tts-latency", type=float, default=0.005)
+    p.add_argument("--llm-latency", type=float, default=0.05)
+    p.add_argument("--tracemalloc", action="store_true", help="record peak traced memory (slows every scenario)")
+    p.add_argument("--quick", action="store_true", help="small sizes, one round; for checking the suite itself")
+    p.add_argument("--out", help="write the results as JSON (e.g. a new baseline)")
+    p.add_argument("--baseline", help="compare against this results file when done")
+    p.add_argument("--threshold", type=float, default=0.15)
+    p.set_defaults(func=run)
+
+    p = commands.add_parser("compare", help="compare two results files")
+    p.add_argument("baseline")
+    p.add_argument("current")
+    p.add_argument("--threshold", type=float, default=0.15)
+    p.set_defaults(func=compare)
+
+    p = commands.add_parser("corpus", help="write the synthetic decks as JSON")
+    corpus_args(p)
+    p.add_argument("--out", required=True)
+    p.set_defaults(func=dump_corpus)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
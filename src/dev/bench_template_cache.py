@@ -0,0 +1,47 @@
+import sys
+import time
+import argparse
+
+from pptx import Presentation
+
+from src.utils import ppt_template
+from src.template_cache import new_presentation, clear_template_cache
+
+
+def bench(fn, rounds):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "mean_ms": sum(timings) / len(timings) * 1000,
+        "p50_ms": timings[len(timings) // 2] * 1000,
+        "max_ms": timings[-1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold vs. warm template construction")
+    parser.add_argument("--template", default=ppt_template)
+    parser.add_argument("--rounds", type=int, default=30)
+    args = parser.parse_args()
+
+    cold = bench(lambda: Presentation(args.template), args.rounds)
+
+    clear_template_cache()
+    start = time.perf_counter()
+    new_presentation(args.template)
+    first = (time.perf_counter() - start) * 1000
+    warm = bench(lambda: new_presentation(args.template), args.rounds)
+
+    print(f"template: {args.template}")
+    print(f"cold  Presentation(path): mean {cold['mean_ms']:.1f} ms, p50 {cold['p50_ms']:.1f} ms, max {cold['max_ms']:.1f} ms")
+    print(f"first new_presentation(): {first:.1f} ms (fills the cache)")
+    print(f"warm  new_presentation(): mean {warm['mean_ms']:.1f} ms, p50 {warm['p50_ms']:.1f} ms, max {warm['max_ms']:.1f} ms")
+    print(f"speedup: {cold['mean_ms'] / warm['mean_ms']:.1f}x")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
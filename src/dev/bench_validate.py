@@ -0,0 +1,108 @@
+"""
+Request parsing and validation of large /generate_presentation bodies: the
+previous path (json.loads into dicts, a request model with
+`json_content: dict`, PresentationContent(**...) and a separate registry
+pass) vs. one TypeAdapter.validate_json call into the typed request model
+with the registry checks folded in.
+
+    PYTHONPATH=. python -m src.dev.bench_validate --slides 100 1000 5000 --html rich
+"""
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+from pydantic import BaseModel, TypeAdapter
+
+from src.dev.bench_suite import HTML_LEVELS, THEME_MODES, UNCLONED_NAMES, make_deck
+from src.layouts import get_registry
+from src.model import PresentationContent
+
+
+class LegacyRequest(BaseModel):
+    json_content: dict
+    incremental: bool = False
+
+
+class TypedRequest(BaseModel):
+    # Same shape as api_server.GeneratePresentationRequest
+    json_content: PresentationContent
+    incremental: bool = False
+
+
+TYPED = TypeAdapter(TypedRequest)
+
+
+def legacy(body: bytes):
+    data = LegacyRequest(**json.loads(body))
+    prs_content = PresentationContent(**data.json_content)
+    errors = get_registry().validate_slides(prs_content.slides, prs_content.theme_mode)
+    return prs_content, errors
+
+
+def single_pass(body: bytes):
+    return TYPED.validate_json(body, context={"registry": get_registry()}).json_content
+
+
+def registry_entries(theme_mode: str) -> list:
+    """
+    Every registry layout in `theme_mode` with the placeholders a rendered
+    slide would get (not date, footer or slide number).
+    """
+    registry = get_registry()
+    return [
+        (
+            layout, theme_mode,
+            sorted(
+                name for name, themes in entry["placeholders"].items()
+                if theme_mode in themes and not UNCLONED_NAMES.fullmatch(name)
+            ),
+        )
+        for layout, entry in sorted(registry.reverse_index.items())
+        if theme_mode in entry["layout_index"]
+    ]
+
+
+def timed(fn, body: bytes, rounds: int, trace: bool) -> tuple:
+    fn(body)
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(body)
+        best = min(best, time.perf_counter() - start)
+    peak = 0
+    if trace:
+        tracemalloc.start()
+        fn(body)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request validation benchmark")
+    parser.add_argument("--slides", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--html", choices=HTML_LEVELS, default="rich")
+    parser.add_argument("--theme", choices=THEME_MODES, default="light")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--tracemalloc", action="store_true", help="also report peak traced memory")
+    args = parser.parse_args()
+
+    entries = registry_entries(args.theme)
+    mb = 1024 * 1024
+    for slides in args.slides:
+        deck = make_deck(entries, args.theme, slides, args.html, slides, "bench_validate")
+        body = json.dumps({"json_content": deck}).encode("utf-8")
+        assert legacy(body)[0] == single_pass(body) and not legacy(body)[1]
+        results = {name: timed(fn, body, args.rounds, args.tracemalloc) for name, fn in (("legacy", legacy), ("single-pass", single_pass))}
+        for name, (seconds, peak) in results.items():
+            print(
+                f"{slides:5d} slides {len(body) / mb:6.2f} MB  {name:11s} {seconds * 1000:8.1f} ms  "
+                f"{len(body) / mb / seconds:6.1f} MB/s" + (f"  tracemalloc peak {peak / mb:6.1f} MB" if args.tracemalloc else "")
+            )
+        print(f"{'':26s}speedup {results['legacy'][0] / results['single-pass'][0]:.2f}x")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Local stand-in for the OpenAI chat completions API.
+
+Returns a canned deck built from layouts_template.yaml, either as a single
+completion or as an SSE chunk stream with a controlled delay, so the
+/generate_json_content paths can be exercised without network access:
+
+    python -m src.dev.fake_openai_server --port 9100 --chunk-chars 40 --delay 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:9100/v1 OPENAI_API_KEY=fake uvicorn src.api_server:app
+"""
+import json
+import time
+import asyncio
+import argparse
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from src.layouts import get_registry
+
+
+app = FastAPI(title="Fake OpenAI")
+app.state.chunk_chars = 40
+app.state.delay = 0.05
+app.state.latency = 0.0
+app.state.requests = 0
+
+
+def canned_deck(theme_mode: str = "light", slides: int = 6) -> dict:
+    registry = get_registry()
+    layouts = sorted(
+        name for name, entry in registry.reverse_index.items()
+        if theme_mode in entry["layout_index"] and entry["placeholders"]
+    )
+    deck = {"filename": "fake_deck", "theme_mode": theme_mode, "slides": []}
+    for n in range(1, slides + 1):
+        layout = layouts[(n - 1) % len(layouts)]
+        placeholders = list(registry.reverse_index[layout]["placeholders"])[:2]
+        deck["slides"].append({
+            "slide_number": n,
+            "layout": layout,
+            "placeholders": [
+                {"placeholder_name": name, "content": [f"<p level=\"1\"><span style=\"font-weight: bold\">Point {n}</span> for {name}</p>"]}
+                for name in placeholders
+            ],
+            "speaker_notes": f"Narration for slide {n}.",
+        })
+    return deck
+
+
+def _chunk(completion_id: str, content: str | None, finish_reason: str | None = None) -> str:
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": "fake",
+        "choices": [{"index": 0, "delta": {"content": content} if content is not None else {}, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    app.state.requests += 1
+    await asyncio.sleep(app.state.latency)
+    user_text = body["messages"][-1]["content"]
+    theme_mode = "dark" if "'dark'" in user_text else "light"
+    content = "```json\n" + json.dumps(canned_deck(theme_mode), indent=2) + "\n```"
+    completion_id = f"chatcmpl-fake{app.state.requests}"
+    usage = {"prompt_tokens": len(body["messages"][0]["content"]) // 4, "completion_tokens": len(content) // 4, "total_tokens": 0}
+    if not body.get("stream"):
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "fake",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    async def events():
+        for i in range(0, len(content), app.state.chunk_chars):
+            yield _chunk(completion_id, content[i:i + app.state.chunk_chars])
+            await asyncio.sleep(app.state.delay)
+        yield _chunk(completion_id, None, "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            # Like the real API: a last chunk with usage and no choices
+            payload = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                       "model": "fake", "choices": [], "usage": usage}
+            yield f"data: {json.dumps(payload)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+async def stats():
+    return {"requests": app.state.requests}
+
+
+def main():
+    import uvicorn
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible chat completions server")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--chunk-chars", type=int, default=40)
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds between streamed chunks")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before the first byte")
+    args = parser.parse_args()
+    app.state.chunk_chars = args.chunk_chars
+    app.state.delay = args.delay
+    app.state.latency = args.latency
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+In-memory stand-in for an S3-compatible object store (path-style).
+
+Implements the calls S3Storage makes: PUT/HEAD/GET object and the
+multipart upload trio, checks every request's payload hash and SigV4
+signature, and reports per-operation counters at /_stats:
+
+    python -m src.dev.fake_s3_server --port 9200 --access-key dev --secret-key devsecret
+    STORAGE_BACKEND=s3 S3_ENDPOINT=http://127.0.0.1:9200 S3_BUCKET=decks \\
+        S3_ACCESS_KEY=dev S3_SECRET_KEY=devsecret uvicorn src.api_server:app
+"""
+import re
+import sys
+import uuid
+import asyncio
+import hashlib
+import argparse
+import datetime
+from collections import Counter
+
+from aiohttp import web
+
+from src.storage import sigv4_headers
+
+
+class FakeS3:
+    def __init__(self, access_key: str, secret_key: str, region: str = "us-east-1", latency: float = 0.0):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.latency = latency
+        self.objects = {}
+        self.uploads = {}
+        self.ops = Counter()
+        self.max_parallel_parts = 0
+        self._parts_in_flight = 0
+
+    def _check(self, request: web.Request, body: bytes):
+        payload_hash = request.headers.get("x-amz-content-sha256", "")
+        if payload_hash != hashlib.sha256(body).hexdigest():
+            raise web.HTTPBadRequest(text="XAmzContentSHA256Mismatch")
+        authorization = request.headers.get("Authorization", "")
+        match = re.search(r"SignedHeaders=([^,]+), Signature=(\w+)", authorization)
+        if not match:
+            raise web.HTTPForbidden(text="Missing SigV4 authorization")
+        names = match.group(1).split(";")
+        headers = {name: request.headers[name] for name in names if name not in ("host", "x-amz-date", "x-amz-content-sha256")}
+        now = datetime.datetime.strptime(request.headers["x-amz-date"], "%Y%m%dT%H%M%SZ")
+        url = f"http://{request.host}{request.raw_path}"
+        expected = sigv4_headers(
+            request.method, url, payload_hash, self.access_key, self.secret_key, self.region, headers, now=now,
+        )["authorization"]
+        if expected != authorization:
+            raise web.HTTPForbidden(text="SignatureDoesNotMatch")
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        self._check(request, body)
+        await asyncio.sleep(self.latency)
+        path = (request.match_info["bucket"], request.match_info["key"])
+        query = request.query
+        if request.method == "PUT" and "partNumber" in query:
+            self.ops["upload_part"] += 1
+            self._parts_in_flight += 1
+            self.max_parallel_parts = max(self.max_parallel_parts, self._parts_in_flight)
+            try:
+                await asyncio.sleep(self.latency)
+            finally:
+                self._parts_in_flight -= 1
+            parts = self.uploads.get(query["uploadId"])
+            if parts is None:
+                raise web.HTTPNotFound(text="NoSuchUpload")
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            parts[int(query["partNumber"])] = (etag, body)
+            return web.Response(headers={"ETag": etag})
+        if request.method == "PUT":
+            self.ops["put"] += 1
+            self.objects[path] = body
+            return web.Response(headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+        if request.method == "POST" and "uploads" in query:
+            self.ops["create_multipart"] += 1
+            upload_id = uuid.uuid4().hex
+            self.uploads[upload_id] = {}
+            return web.Response(
+                content_type="application/xml",
+                text=f"<InitiateMultipartUploadResult><UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>",
+            )
+        if request.method == "POST" and "uploadId" in query:
+            self.ops["complete_multipart"] += 1
+            parts = self.uploads.pop(query["uploadId"], None)
+            if parts is None:
+                raise web.HTTPNotFound(text="NoSuchUpload")
+            listed = re.findall(r"<PartNumber>(\d+)</PartNumber><ETag>([^<]+)</ETag>", body.decode("utf-8"))
+            if [(int(n), etag) for n, etag in listed] != [(n, parts[n][0]) for n in sorted(parts)]:
+                return web.Response(content_type="application/xml", text="<Error><Code>InvalidPart</Code></Error>")
+            self.objects[path] = b"".join(parts[n][1] for n in sorted(parts))
+            return web.Response(content_type="application/xml", text="<CompleteMultipartUploadResult/>")
+        if request.method == "DELETE" and "uploadId" in query:
+            self.ops["abort_multipart"] += 1
+            self.uploads.pop(query["uploadId"], None)
+            return web.Response(status=204)
+        if request.method in ("GET", "HEAD"):
+            self.ops[request.method.lower()] += 1
+            if path not in self.objects:
+                raise web.HTTPNotFound()
+            return web.Response(body=self.objects[path] if request.method == "GET" else None)
+        raise web.HTTPMethodNotAllowed(request.method, ["GET", "HEAD", "PUT", "POST", "DELETE"])
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "ops": dict(self.ops),
+            "objects": len(self.objects),
+            "bytes": sum(len(data) for data in self.objects.values()),
+            "pending_uploads": len(self.uploads),
+            "max_parallel_parts": self.max_parallel_parts,
+        })
+
+
+def make_app(fake: FakeS3) -> web.Application:
+    app = web.Application(client_max_size=1024 * 1024 * 1024)
+    app.router.add_get("/_stats", fake.stats)
+    app.router.add_route("*", "/{bucket}/{key:.+}", fake.handle)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake S3-compatible object store")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--access-key", default="dev")
+    parser.add_argument("--secret-key", default="devsecret")
+    parser.add_argument("--region", default="us-east-1")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    args = parser.parse_args()
+    fake = FakeS3(args.access_key, args.secret_key, args.region, args.latency)
+    web.run_app(make_app(fake), host="127.0.0.1", port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,337 @@
+import io
+import os
+import re
+import json
+import codecs
+import zipfile
+import tempfile
+import posixpath
+import importlib.util
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+from lxml import etree
+
+from src.metrics import stage
+from src.utils import compile_html
+
+
+# .docx whose styles, page setup and existing body the generated documents
+# start from; empty = python-docx's default template (located without
+# importing python-docx, which nothing else here needs)
+DOCX_TEMPLATE = os.environ.get("DOCX_TEMPLATE", "") or os.path.join(
+    importlib.util.find_spec("docx").submodule_search_locations[0], "templates", "default.docx"
+)
+# Generated documents stay in memory up to this size, then spill to disk
+DOCX_SPOOL_MAX_MEMORY = int(os.environ.get("DOCX_SPOOL_MAX_MEMORY", 8 * 1024 * 1024))
+# Paragraph text handed to the writer per batch while reading a streamed body
+DOCX_BATCH_CHARS = int(os.environ.get("DOCX_BATCH_CHARS", 256 * 1024))
+# Largest request body accepted by the streaming endpoint
+DOCX_MAX_BYTES = int(os.environ.get("DOCX_MAX_BYTES", 64 * 1024 * 1024))
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+RT_OFFICE_DOCUMENT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+RT_HYPERLINK = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink"
+# Paragraph styles for <p level="n">, by style name
+LEVEL_STYLES = {1: "List Bullet", 2: "List Bullet 2", 3: "List Bullet 3"}
+LINK_COLOR = "0563C1"
+FORMATS = ("text", "html")
+
+# Characters XML 1.0 does not allow; python-docx raised on them
+_INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+_BODY_MARKER = "@@docx-body@@"
+
+
+class DocxBase:
+    """
+    A .docx template split once into what every generated document shares:
+    a zip of all parts except the main document and its relationships
+    (compressed once, copied as is), the document XML before and after the
+    paragraphs, and the style ids.
+    """
+
+    def __init__(self, path: str):
+        with zipfile.ZipFile(path) as z:
+            rels = etree.fromstring(z.read("_rels/.rels"))
+            target = next(
+                rel.get("Target") for rel in rels.iter(f"{{{PKG_REL_NS}}}Relationship")
+                if rel.get("Type") == RT_OFFICE_DOCUMENT
+            )
+            self.document_name = target.lstrip("/")
+            folder, name = posixpath.split(self.document_name)
+            self.rels_name = posixpath.join(folder, "_rels", f"{name}.rels")
+            prefix = io.BytesIO()
+            with zipfile.ZipFile(prefix, "w", compression=zipfile.ZIP_DEFLATED) as out:
+                for info in z.infolist():
+                    if info.filename not in (self.document_name, self.rels_name):
+                        out.writestr(
+                            zipfile.ZipInfo(info.filename, info.date_time), z.read(info.filename),
+                            compress_type=zipfile.ZIP_DEFLATED,
+                        )
+            self.prefix = prefix.getvalue()
+            document = etree.fromstring(z.read(self.document_name))
+            rels_xml = z.read(self.rels_name) if self.rels_name in z.namelist() else (
+                f'<Relationships xmlns="{PKG_REL_NS}"/>'.encode()
+            )
+            styles_name = posixpath.join(folder, "styles.xml")
+            styles = etree.fromstring(z.read(styles_name)) if styles_name in z.namelist() else None
+
+        # New paragraphs go after the template's own body content and
+        # before its final sectPr; a marker at that spot splits the XML
+        body = document.find(f"{{{W_NS}}}body")
+        children = list(body)
+        if children and children[-1].tag == f"{{{W_NS}}}sectPr":
+            before_sect = children[-1].getprevious()
+            if before_sect is None:
+                body.text = _BODY_MARKER
+            else:
+                before_sect.tail = _BODY_MARKER
+        elif children:
+            children[-1].tail = _BODY_MARKER
+        else:
+            body.text = _BODY_MARKER
+        head, tail = etree.tostring(document, encoding="unicode").split(_BODY_MARKER)
+        self.head = ("<?xml version='1.0' encoding='UTF-8' standalone='yes'?>\n" + head).encode("utf-8")
+        self.tail = tail.encode("utf-8")
+
+        rels_root = etree.fromstring(rels_xml)
+        ids = [int(m.group(1)) for rel in rels_root for m in [re.fullmatch(r"rId(\d+)", rel.get("Id", ""))] if m]
+        self.next_rid = max(ids, default=0) + 1
+        rels_text = etree.tostring(rels_root, encoding="unicode")
+        # Hyperlink relationships are appended before the closing tag
+        self.rels_head = "<?xml version='1.0' encoding='UTF-8' standalone='yes'?>\n" + (
+            rels_text[:rels_text.rindex("</Relationships>")] if rels_text.endswith("</Relationships>")
+            else rels_text[:-2] + ">"
+        )
+
+        self.style_ids = {}
+        if styles is not None:
+            for style in styles.iter(f"{{{W_NS}}}style"):
+                name = style.find(f"{{{W_NS}}}name")
+                if name is not None:
+                    self.style_ids[name.get(f"{{{W_NS}}}val")] = style.get(f"{{{W_NS}}}styleId")
+
+
+@lru_cache(maxsize=4)
+def _docx_base(path: str, mtime_ns: int) -> DocxBase:
+    return DocxBase(path)
+
+
+def docx_base(path: str = DOCX_TEMPLATE) -> DocxBase:
+    """
+    Parsed base of the .docx template at `path`, reloaded when the file
+    changes.
+    """
+    path = os.path.abspath(path)
+    return _docx_base(path, os.stat(path).st_mtime_ns)
+
+
+def split_paragraphs(text: str) -> Iterator[str]:
+    """
+    Same paragraphs as `text.split("\\n\\n")`, stripped, without building
+    the list.
+    """
+    start = 0
+    while True:
+        end = text.find("\n\n", start)
+        if end < 0:
+            yield text[start:].strip()
+            return
+        yield text[start:end].strip()
+        start = end + 2
+
+
+class ParagraphSplitter:
+    """
+    split_paragraphs over text that arrives in chunks.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, chunk: str) -> list:
+        self._buffer += chunk
+        end = self._buffer.rfind("\n\n")
+        if end < 0:
+            return []
+        paragraphs = list(split_paragraphs(self._buffer[:end]))
+        self._buffer = self._buffer[end + 2:]
+        return paragraphs
+
+    def close(self) -> list:
+        paragraphs = [self._buffer.strip()]
+        self._buffer = ""
+        return paragraphs
+
+
+def _text_xml(text: str) -> str:
+    # Same run content python-docx produces for run.text
+    parts = []
+    for i, line in enumerate(text.split("\n")):
+        if i:
+            parts.append("<w:br/>")
+        for j, piece in enumerate(line.split("\t")):
+            if j:
+                parts.append("<w:tab/>")
+            if piece:
+                parts.append(f'<w:t xml:space="preserve">{escape(piece)}</w:t>')
+    return "".join(parts)
+
+
+class DocxWriter:
+    """
+    Writes a .docx into `file` (an empty, readable and seekable binary
+    file) paragraph by paragraph: the template's parts first, then
+    document.xml streamed through one open zip entry, then the
+    relationships.
+    """
+
+    def __init__(self, file, base: Optional[DocxBase] = None):
+        self.base = base or docx_base()
+        self.file = file
+        # Append to a copy of the precompressed template parts
+        file.write(self.base.prefix)
+        self.zip = zipfile.ZipFile(file, "a", compression=zipfile.ZIP_DEFLATED)
+        self._document = self.zip.open(self.base.document_name, "w", force_zip64=True)
+        self._document.write(self.base.head)
+        self._links = {}
+        self.paragraphs = 0
+
+    def _link_id(self, url: str) -> str:
+        rid = self._links.get(url)
+        if rid is None:
+            rid = self._links[url] = f"rId{self.base.next_rid + len(self._links)}"
+        return rid
+
+    def paragraph_xml(self, content: str, fmt: str = "text") -> str:
+        """
+        One <w:p>: plain text as a single run, or the inline HTML subset
+        of process_html (levels, bold/italic/underline/color, links).
+        """
+        content = _INVALID_XML.sub("", content)
+        if fmt != "html":
+            return f"<w:p><w:r>{_text_xml(content)}</w:r></w:p>" if content else "<w:p/>"
+        level, runs = compile_html(content)
+        ppr = ""
+        style_id = self.base.style_ids.get(LEVEL_STYLES.get(level, ""))
+        if style_id:
+            ppr = f"<w:pPr><w:pStyle w:val={quoteattr(style_id)}/></w:pPr>"
+        out = ["<w:p>", ppr]
+        for spec in runs:
+            rpr = []
+            if spec.bold:
+                rpr.append("<w:b/>")
+            if spec.italic:
+                rpr.append("<w:i/>")
+            color = spec.color and "%02X%02X%02X" % spec.color
+            if spec.link:
+                color = color or LINK_COLOR
+            if color:
+                rpr.append(f'<w:color w:val="{color}"/>')
+            if spec.underline or spec.link:
+                rpr.append('<w:u w:val="single"/>')
+            run = f"<w:r>{'<w:rPr>' + ''.join(rpr) + '</w:rPr>' if rpr else ''}{_text_xml(spec.text)}</w:r>"
+            if spec.link:
+                run = f"<w:hyperlink r:id=\"{self._link_id(spec.link)}\">{run}</w:hyperlink>"
+            out.append(run)
+        out.append("</w:p>")
+        return "".join(out)
+
+    def write(self, paragraphs: Iterable, fmt: str = "text") -> None:
+        """
+        Append paragraphs; each is a string in `fmt`, or a (string, fmt)
+        pair.
+        """
+        with stage("docx_build"):
+            chunk = []
+            for paragraph in paragraphs:
+                if isinstance(paragraph, tuple):
+                    chunk.append(self.paragraph_xml(*paragraph))
+                else:
+                    chunk.append(self.paragraph_xml(paragraph, fmt))
+                self.paragraphs += 1
+                if len(chunk) >= 256:
+                    self._document.write("".join(chunk).encode("utf-8"))
+                    chunk = []
+            if chunk:
+                self._document.write("".join(chunk).encode("utf-8"))
+
+    def finish(self):
+        """
+        Close the package and return `file` rewound to the start.
+        """
+        with stage("serialize"):
+            self._document.write(self.base.tail)
+            self._document.close()
+            rels = [self.base.rels_head]
+            for url, rid in self._links.items():
+                rels.append(
+                    f'<Relationship Id="{rid}" Type="{RT_HYPERLINK}" Target={quoteattr(url)} TargetMode="External"/>'
+                )
+            rels.append("</Relationships>")
+            self.zip.writestr(self.base.rels_name, "".join(rels).encode("utf-8"))
+            self.zip.close()
+        self.file.seek(0)
+        return self.file
+
+    def close(self) -> None:
+        """
+        Close `file`; a document that was not finished is discarded.
+        """
+        if not self._document.closed:
+            self._document.close()
+        self.zip.close()
+        self.file.close()
+
+
+def spooled_docx_file():
+    return tempfile.SpooledTemporaryFile(max_size=DOCX_SPOOL_MAX_MEMORY)
+
+
+def write_docx(content: str, fmt: str = "text", file=None):
+    """
+    Build a document from `content` split on blank lines into `file`
+    (default: a new spooled temp file) and return it rewound.
+    """
+    writer = DocxWriter(file if file is not None else spooled_docx_file())
+    writer.write(split_paragraphs(content), fmt)
+    return writer.finish()
+
+
+class NdjsonSections:
+    """
+    Incremental parser for NDJSON section streams: one
+    {"content": str, "format": "text"|"html"} object per line, each split
+    into paragraphs on blank lines.
+    """
+
+    def __init__(self, default_format: str = "text"):
+        self.default_format = default_format
+        self._buffer = ""
+
+    def _section(self, line: str) -> list:
+        section = json.loads(line)
+        if not isinstance(section, dict) or not isinstance(section.get("content"), str):
+            raise ValueError('Each NDJSON line must be an object with a string "content"')
+        fmt = section.get("format", self.default_format)
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format {fmt!r}, expected one of {FORMATS}")
+        return [(paragraph, fmt) for paragraph in split_paragraphs(section["content"])]
+
+    def feed(self, chunk: str) -> list:
+        self._buffer += chunk
+        end = self._buffer.rfind("\n")
+        if end < 0:
+            return []
+        lines, self._buffer = self._buffer[:end], self._buffer[end + 1:]
+        return [p for line in lines.split("\n") if line.strip() for p in self._section(line)]
+
+    def close(self) -> list:
+        line, self._buffer = self._buffer, ""
+        return self._section(line) if line.strip() else []
+
+
+def utf8_decoder():
+    return codecs.getincrementaldecoder("utf-8")()
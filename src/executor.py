@@ -0,0 +1,184 @@
+import os
+import asyncio
+import threading
+import functools
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from src.metrics import call_timed, current_timings
+
+
+# Thread pool for blocking I/O (uploads, synchronous LLM calls)
+IO_WORKERS = int(os.environ.get("PPT_IO_WORKERS", 16))
+# Pool for CPU-bound rendering; "thread" or "process"
+CPU_EXECUTOR = os.environ.get("PPT_CPU_EXECUTOR", "thread")
+CPU_WORKERS = int(os.environ.get("PPT_CPU_WORKERS", os.cpu_count() or 1))
+# Maximum running + queued jobs per pool before new work is rejected
+IO_MAX_PENDING = int(os.environ.get("PPT_IO_MAX_PENDING", IO_WORKERS * 4))
+CPU_MAX_PENDING = int(os.environ.get("PPT_CPU_MAX_PENDING", CPU_WORKERS * 4))
+# Recycle process workers after about this many tasks each to return their
+# memory; 0 = never
+CPU_MAX_TASKS_PER_CHILD = int(os.environ.get("PPT_CPU_MAX_TASKS_PER_CHILD", 0))
+# multiprocessing start method for process workers; empty = Python's default
+CPU_START_METHOD = os.environ.get("PPT_CPU_START_METHOD", "")
+
+
+class ExecutorBusy(RuntimeError):
+    """
+    Raised when a pool already has its maximum number of pending jobs.
+    """
+
+    def __init__(self, name: str, max_pending: int):
+        self.name = name
+        self.max_pending = max_pending
+        super().__init__(f"{name} executor is at capacity ({max_pending} pending jobs), retry later")
+
+
+class BoundedExecutor:
+    """
+    A concurrent.futures executor with a cap on outstanding work, awaited
+    from the event loop.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        max_workers: int,
+        max_pending: int,
+        max_tasks_per_child: int = 0,
+        start_method: str = "",
+        ):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_tasks_per_child = max_tasks_per_child
+        self.start_method = start_method
+        self.pending = 0
+        self.recycled = 0
+        self._pool_tasks = 0
+        self.initializer = None
+        self.initargs = ()
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def set_initializer(self, initializer, initargs: tuple = ()) -> None:
+        """
+        Function run once in every new process worker (e.g. to preload
+        templates); takes effect for pools created afterwards.
+        """
+        self.initializer = initializer
+        self.initargs = initargs
+
+    def _get_executor(self):
+        with self._lock:
+            if (
+                self._executor is not None
+                and self.kind == "process"
+                and self.max_tasks_per_child
+                and self._pool_tasks >= self.max_tasks_per_child * self.max_workers
+            ):
+                # Swap in a fresh pool; the old one finishes its queued work and
+                # its workers exit. Done here rather than with the executor's own
+                # max_tasks_per_child, which hangs on some CPython 3.13 releases.
+                self._executor.shutdown(wait=False)
+                self._executor = None
+                self.recycled += 1
+            if self._executor is None:
+                self._pool_tasks = 0
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context(self.start_method) if self.start_method else None,
+                        initializer=self.initializer,
+                        initargs=self.initargs,
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix=f"ppt-{self.name}",
+                    )
+            self._pool_tasks += 1
+            return self._executor
+
+    async def run(self, fn, *args, **kwargs):
+        if self.pending >= self.max_pending:
+            raise ExecutorBusy(self.name, self.max_pending)
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            timings = current_timings()
+            if timings is None:
+                return await loop.run_in_executor(
+                    self._get_executor(), functools.partial(fn, *args, **kwargs)
+                )
+            # Bring the job's stage samples back into the request's timings;
+            # a profiled request also profiles jobs in process workers, which
+            # its own profiler cannot see
+            try:
+                result, samples, profile_stats = await loop.run_in_executor(
+                    self._get_executor(),
+                    functools.partial(call_timed, fn, args, kwargs, timings.profile and self.kind == "process"),
+                )
+            except Exception as e:
+                timings.fail(getattr(e, "failed_stage", None))
+                raise
+            timings.merge(samples, profile_stats)
+            return result
+        finally:
+            self.pending -= 1
+
+    async def prestart(self) -> None:
+        """
+        Start the workers now so process initializers run before the first
+        real job instead of inside it.
+        """
+        if self.kind != "process":
+            return
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*(loop.run_in_executor(executor, os.getpid) for _ in range(self.max_workers)))
+
+    def stats(self) -> dict:
+        stats = {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+        }
+        if self.kind == "process":
+            stats["max_tasks_per_child"] = self.max_tasks_per_child
+            stats["recycled"] = self.recycled
+        return stats
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+io_executor = BoundedExecutor("io", "thread", IO_WORKERS, IO_MAX_PENDING)
+cpu_executor = BoundedExecutor(
+    "cpu", CPU_EXECUTOR, CPU_WORKERS, CPU_MAX_PENDING, CPU_MAX_TASKS_PER_CHILD, CPU_START_METHOD,
+)
+
+
+async def run_io(fn, *args, **kwargs):
+    """
+    Run a blocking I/O call (upload, HTTP request) off the event loop.
+    """
+    return await io_executor.run(fn, *args, **kwargs)
+
+
+async def run_cpu(fn, *args, **kwargs):
+    """
+    Run CPU-bound work (slide building, serialization) off the event loop.
+    With PPT_CPU_EXECUTOR=process, `fn` and its arguments must be picklable.
+    """
+    return await cpu_executor.run(fn, *args, **kwargs)
+
+
+def executor_stats() -> dict:
+    return {"io": io_executor.stats(), "cpu": cpu_executor.stats()}
@@ -0,0 +1,336 @@
+import os
+import json
+import time
+import heapq
+import uuid
+import asyncio
+import sqlite3
+import threading
+import itertools
+import urllib.parse
+import urllib.request
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from loguru import logger
+
+from src.executor import run_io
+from src.metrics import collect
+
+
+# "memory" (per process) or "sqlite" (shared between workers on one host)
+JOB_STORE = os.environ.get("JOB_STORE", "memory")
+JOB_SQLITE_PATH = os.environ.get("JOB_SQLITE_PATH", "jobs.sqlite3")
+# Finished jobs kept by the in-memory store
+JOB_RETENTION = int(os.environ.get("JOB_RETENTION", 1000))
+JOB_MAX_CONCURRENCY = int(os.environ.get("JOB_MAX_CONCURRENCY", 4))
+JOB_MAX_QUEUED = int(os.environ.get("JOB_MAX_QUEUED", 100))
+JOB_WEBHOOK_TIMEOUT = float(os.environ.get("JOB_WEBHOOK_TIMEOUT", 10))
+# Hosts job webhooks may be posted to, comma-separated; "*" allows any host
+JOB_WEBHOOK_ALLOWED_HOSTS = frozenset(
+    host.strip().lower()
+    for host in os.environ.get("JOB_WEBHOOK_ALLOWED_HOSTS", "localhost,127.0.0.1,::1").split(",")
+    if host.strip()
+)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobQueueFull(RuntimeError):
+    def __init__(self, max_queued: int):
+        self.max_queued = max_queued
+        super().__init__(f"Job queue is full ({max_queued} queued jobs), retry later")
+
+
+def new_job(job_type: str, priority: int = 0, webhook_url: Optional[str] = None) -> dict:
+    now = time.time()
+    return {
+        "id": uuid.uuid4().hex,
+        "type": job_type,
+        "status": QUEUED,
+        "priority": priority,
+        "progress": {},
+        "result": None,
+        "error": None,
+        "webhook_url": webhook_url,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+class MemoryJobStore:
+    """
+    Job records in a dict, visible only to the current process.
+    """
+
+    def __init__(self, retention: int = JOB_RETENTION):
+        self.retention = retention
+        self._jobs: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, job: dict) -> None:
+        with self._lock:
+            self._jobs[job["id"]] = job
+            if len(self._jobs) > self.retention:
+                for job_id in [k for k, v in self._jobs.items() if v["status"] in (SUCCEEDED, FAILED)]:
+                    if len(self._jobs) <= self.retention:
+                        break
+                    del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return json.loads(json.dumps(job)) if job is not None else None
+
+    def update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            if "progress" in fields:
+                job["progress"] = {**job["progress"], **fields.pop("progress")}
+            job.update(fields, updated_at=time.time())
+
+
+class SqliteJobStore:
+    """
+    Job records in a local SQLite file so every worker process on the host
+    can answer status polls.
+    """
+
+    def __init__(self, path: str = JOB_SQLITE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        with self._lock:
+            self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        # A connection must not cross fork() (src.serve creates the store
+        # in the master), so each process opens its own
+        if self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+            self._pid = os.getpid()
+        return self._conn
+
+    def create(self, job: dict) -> None:
+        with self._lock:
+            self._connection().execute("INSERT INTO jobs (id, data) VALUES (?, ?)", (job["id"], json.dumps(job)))
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._connection().execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                job = json.loads(row[0])
+                if "progress" in fields:
+                    job["progress"] = {**job["progress"], **fields.pop("progress")}
+                job.update(fields, updated_at=time.time())
+                conn.execute("UPDATE jobs SET data = ? WHERE id = ?", (json.dumps(job), job_id))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+
+def create_job_store():
+    if JOB_STORE == "sqlite":
+        return SqliteJobStore()
+    return MemoryJobStore()
+
+
+def check_webhook_url(url: str, allowed_hosts=JOB_WEBHOOK_ALLOWED_HOSTS) -> str:
+    """
+    Return `url` if it is an http(s) URL on an allowed host, else raise
+    ValueError.
+    """
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ("http", "https"):
+        raise ValueError("webhook_url must be an http or https URL")
+    if "*" not in allowed_hosts and (parts.hostname or "").lower() not in allowed_hosts:
+        raise ValueError(f"webhook_url host {parts.hostname!r} is not in JOB_WEBHOOK_ALLOWED_HOSTS")
+    return url
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # A redirect could point the POST at a host outside the allowlist
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_webhook_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def _post_webhook(url: str, payload: dict) -> int:
+    check_webhook_url(url)
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with _webhook_opener.open(request, timeout=JOB_WEBHOOK_TIMEOUT) as response:
+        return response.status
+
+
+# A job body gets a progress(**fields) callback and returns the job result
+JobFunc = Callable[[Callable[..., None]], Awaitable[dict]]
+
+
+class JobScheduler:
+    """
+    Runs submitted jobs in the background, highest priority first, with a
+    global concurrency cap and optional per-type caps.
+    """
+
+    def __init__(
+        self,
+        store,
+        max_concurrency: int = JOB_MAX_CONCURRENCY,
+        per_type_concurrency: Optional[dict] = None,
+        max_queued: int = JOB_MAX_QUEUED,
+        ):
+        self.store = store
+        self.max_concurrency = max_concurrency
+        self.per_type_concurrency = per_type_concurrency or {}
+        self.max_queued = max_queued
+        self._queue = []
+        self._seq = itertools.count()
+        self._running = {}
+        self._tasks = set()
+
+    async def submit(
+        self,
+        job_type: str,
+        func: JobFunc,
+        priority: int = 0,
+        webhook_url: Optional[str] = None,
+        ) -> dict:
+        if len(self._queue) >= self.max_queued:
+            raise JobQueueFull(self.max_queued)
+        job = new_job(job_type, priority, webhook_url)
+        await self._store(self.store.create, job)
+        heapq.heappush(self._queue, (-priority, next(self._seq), job["id"], job_type, func))
+        self._start_ready()
+        return job
+
+    async def _store(self, method, *args, **kwargs):
+        # Store calls block (a SQLite transaction can wait on the file lock),
+        # so they run on the I/O pool instead of the event loop
+        return await run_io(method, *args, **kwargs)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await self._store(self.store.get, job_id)
+
+    async def _update_after(self, previous: Optional[asyncio.Future], job_id: str, **fields) -> None:
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        await self._store(self.store.update, job_id, **fields)
+
+    def _has_capacity(self, job_type: str) -> bool:
+        if sum(self._running.values()) >= self.max_concurrency:
+            return False
+        limit = self.per_type_concurrency.get(job_type)
+        return limit is None or self._running.get(job_type, 0) < limit
+
+    def _start_ready(self) -> None:
+        waiting = []
+        while self._queue and sum(self._running.values()) < self.max_concurrency:
+            item = heapq.heappop(self._queue)
+            job_type = item[3]
+            if not self._has_capacity(job_type):
+                waiting.append(item)
+                continue
+            self._running[job_type] = self._running.get(job_type, 0) + 1
+            task = asyncio.create_task(self._run(item[2], job_type, item[4]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        for item in waiting:
+            heapq.heappush(self._queue, item)
+
+    async def _run(self, job_id: str, job_type: str, func: JobFunc) -> None:
+        last_progress = None
+
+        def progress(**fields):
+            # Called synchronously from job bodies: the write runs in the
+            # background, after the previous one so updates stay in order
+            nonlocal last_progress
+            last_progress = asyncio.ensure_future(self._update_after(last_progress, job_id, progress=fields))
+
+        # The job outlives the request that submitted it, so it collects its own stage timings
+        with collect() as timings:
+            try:
+                await self._store(self.store.update, job_id, status=RUNNING, started_at=time.time())
+                result = await func(progress)
+            except Exception as e:
+                final = dict(
+                    status=FAILED, error=str(e), finished_at=time.time(),
+                    stages=timings.summary(), failed_stage=timings.failed_stage,
+                )
+                logger.bind(job_id=job_id, job_type=job_type, failed_stage=timings.failed_stage).error(
+                    "Job {} failed in stage {}: {!r}", job_id, timings.failed_stage, e,
+                )
+            else:
+                final = dict(status=SUCCEEDED, result=result, finished_at=time.time(), stages=timings.summary())
+            finally:
+                self._running[job_type] -= 1
+                self._start_ready()
+        await self._finish(last_progress, job_id, final)
+        try:
+            job = await self.get(job_id)
+        except Exception as e:
+            logger.bind(job_id=job_id).error("Could not load job {} for its webhook: {!r}", job_id, e)
+            return
+        if job and job.get("webhook_url"):
+            try:
+                status = await run_io(_post_webhook, job["webhook_url"], job)
+            except Exception as webhook_err:
+                status = f"error: {webhook_err}"
+            try:
+                await self._store(self.store.update, job_id, webhook_status=status)
+            except Exception as e:
+                logger.bind(job_id=job_id).error("Could not record webhook status of job {}: {!r}", job_id, e)
+
+    async def _finish(self, previous: Optional[asyncio.Future], job_id: str, fields: dict) -> None:
+        """
+        Record a job's terminal status. When the I/O pool refuses the write
+        (e.g. ExecutorBusy) it is made on the event loop instead, and a
+        result the store cannot take fails the job, so no job is left
+        running.
+        """
+        try:
+            await self._update_after(previous, job_id, **fields)
+            return
+        except Exception as e:
+            logger.bind(job_id=job_id).error("Could not record job {} as {}: {!r}", job_id, fields["status"], e)
+            error = e
+        try:
+            self.store.update(job_id, **fields)
+            return
+        except Exception as e:
+            error = e
+        try:
+            self.store.update(
+                job_id, status=FAILED, result=None, error=f"could not record job {fields['status']}: {error}",
+                finished_at=fields["finished_at"],
+            )
+        except Exception:
+            logger.bind(job_id=job_id).exception("Job {} is left in its last recorded state", job_id)
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._queue),
+            "running": dict(self._running),
+            "max_concurrency": self.max_concurrency,
+            "per_type_concurrency": self.per_type_concurrency,
+        }
@@ -0,0 +1,92 @@
+import json
+
+
+class SlideStreamParser:
+    """
+    Incremental parser for a PresentationContent JSON document arriving in
+    arbitrary text chunks (optionally wrapped in a ```json fence).
+
+    feed() returns the events completed by that chunk:
+      ("field", name, value) for top-level scalar fields (filename, theme_mode)
+      ("slide", slide_dict) for each object of the top-level "slides" array
+      ("invalid", raw_text, error) for a slide object that is not valid JSON
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.slides_depth = None
+        self.done = False
+        self._string = []
+        self._last_string = None
+        self._key = None
+        self._expect_value = False
+        self._capture = None
+
+    def feed(self, chunk: str) -> list:
+        events = []
+        capture = self._capture
+        for ch in chunk:
+            if self.done:
+                break
+            if capture is not None:
+                capture.append(ch)
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                    if self.depth == 1:
+                        self._string.append(ch)
+                elif ch == "\\":
+                    self.escape = True
+                    if self.depth == 1:
+                        self._string.append(ch)
+                elif ch == '"':
+                    self.in_string = False
+                    if self.depth == 1:
+                        text = "".join(self._string)
+                        if self._expect_value and self._key is not None:
+                            events.append(("field", self._key, json.loads(f'"{text}"')))
+                            self._key = None
+                            self._expect_value = False
+                        else:
+                            self._last_string = text
+                elif self.depth == 1:
+                    self._string.append(ch)
+                continue
+            if self.depth == 0 and ch != "{":
+                # Fences, prose or whitespace around the document
+                continue
+            if ch == '"':
+                self.in_string = True
+                self._string = []
+            elif ch == ":" and self.depth == 1:
+                self._key = json.loads(f'"{self._last_string}"') if self._last_string is not None else None
+                self._last_string = None
+                self._expect_value = True
+            elif ch == "," and self.depth == 1:
+                self._key = None
+                self._expect_value = False
+            elif ch in "{[":
+                if ch == "[" and self.depth == 1 and self._key == "slides":
+                    self.slides_depth = self.depth + 1
+                elif ch == "{" and self.slides_depth is not None and self.depth == self.slides_depth:
+                    capture = ["{"]
+                self.depth += 1
+            elif ch in "}]":
+                self.depth -= 1
+                if ch == "}" and capture is not None and self.depth == self.slides_depth:
+                    raw = "".join(capture)
+                    capture = None
+                    try:
+                        events.append(("slide", json.loads(raw)))
+                    except ValueError as e:
+                        events.append(("invalid", raw, str(e)))
+                elif ch == "]" and self.depth == 1 and self.slides_depth is not None:
+                    self.slides_depth = None
+                    self._key = None
+                    self._expect_value = False
+                elif self.depth == 0:
+                    self.done = True
+        self._capture = capture
+        return events
@@ -0,0 +1,223 @@
+import os
+import re
+import difflib
+import hashlib
+import threading
+from types import MappingProxyType
+
+from src.utils import (
+    layout_template,
+    get_layouts,
+    get_reverse_index,
+    safe_load_yaml,
+)
+
+
+def normalize_layout_name(name: str) -> str:
+    """
+    Canonical form of a layout name used for lenient matching.
+    """
+    return name.replace(" ", "").replace("/", "").replace("_", "").lower()
+
+
+# Prefixes the template uses in slide layout names, e.g. "Light - Title_Pillar"
+_THEME_PREFIXES = ("light -", "dark -")
+_RESOLVE_CACHE_SIZE = 1024
+_FUZZY_CUTOFF = 0.85
+_DIGITS = re.compile(r"\d+")
+
+
+def _numbers(canonical: str) -> tuple:
+    # Numbered variants (Speaker_5, "with 2 blocks") are different layouts,
+    # so fuzzy matching only considers names with the same numbers
+    return tuple(int(n) for n in _DIGITS.findall(canonical))
+
+
+class LayoutNotFoundError(ValueError):
+    def __init__(self, layout: str, valid_layouts):
+        self.layout = layout
+        self.valid_layouts = sorted(valid_layouts)
+        super().__init__(f"Layout '{layout}' not recognized. Valid layouts: {self.valid_layouts}")
+
+    def __reduce__(self):
+        # Keep the error picklable across process-pool boundaries
+        return (type(self), (self.layout, self.valid_layouts))
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    return value
+
+
+class LayoutRegistry:
+    """
+    Read-only, pre-indexed view of layouts_template.yaml.
+
+    Built once per file version so that per-request layout resolution is
+    only dictionary lookups.
+    """
+
+    def __init__(self, layouts_template: dict, version: str, mtime_ns: int = 0):
+        self.version = version
+        self.mtime_ns = mtime_ns
+        self.reverse_index = _freeze(get_reverse_index(layouts_template))
+        self.layouts_prompt = get_layouts(layouts_template)
+        self.layout_keys = frozenset(self.reverse_index.keys())
+        normalized = {}
+        for key in sorted(self.layout_keys):
+            normalized.setdefault(normalize_layout_name(key), key)
+        self.normalized = MappingProxyType(normalized)
+        # Other names LLMs tend to use for a layout: the YAML key and the
+        # template's own slide layout names without the theme prefix.
+        aliases = {}
+        for k, v in layouts_template.items():
+            names = [k, *(v.get("layout_name") or {}).values()]
+            for name in names:
+                lowered = name.lower()
+                for prefix in _THEME_PREFIXES:
+                    if lowered.startswith(prefix):
+                        name = name[len(prefix):]
+                        break
+                canonical = normalize_layout_name(name)
+                if canonical not in normalized:
+                    aliases.setdefault(canonical, v["alias"])
+        self.aliases = MappingProxyType(aliases)
+        candidates = {}
+        for candidate in [*normalized.keys(), *aliases.keys()]:
+            candidates.setdefault(_numbers(candidate), []).append(candidate)
+        self._candidates = MappingProxyType(candidates)
+        self._resolved = {}
+
+    def __len__(self) -> int:
+        return len(self.reverse_index)
+
+    def resolve_layout(self, name: str) -> str | None:
+        """
+        Map a (possibly misspelled) layout name to a registry key.
+
+        Exact names are a set lookup; everything else goes through the
+        canonical-form and alias tables, then a fuzzy match against names
+        with the same numbers, and the outcome is memoized per registry.
+        """
+        if name in self.layout_keys:
+            return name
+        try:
+            return self._resolved[name]
+        except KeyError:
+            pass
+        resolved = self._resolve_uncached(name)
+        if len(self._resolved) >= _RESOLVE_CACHE_SIZE:
+            self._resolved.clear()
+        self._resolved[name] = resolved
+        return resolved
+
+    def _resolve_uncached(self, name: str) -> str | None:
+        alt = name.replace("_", "/").strip()
+        if alt in self.layout_keys:
+            return alt
+        canonical = normalize_layout_name(name.strip())
+        if canonical in self.normalized:
+            return self.normalized[canonical]
+        if canonical in self.aliases:
+            return self.aliases[canonical]
+        candidates = self._candidates.get(_numbers(canonical), ())
+        match = difflib.get_close_matches(canonical, candidates, n=1, cutoff=_FUZZY_CUTOFF)
+        if match:
+            return self.normalized.get(match[0]) or self.aliases[match[0]]
+        return None
+
+    def slide_problems(self, slide, theme_mode: str | None) -> list:
+        """
+        Layout problems of one slide as (location within the slide, message,
+        offending value); empty when it can be rendered in `theme_mode`.
+        Theme variants are not checked when `theme_mode` is None.
+        """
+        layout = self.resolve_layout(slide.layout)
+        if layout is None:
+            return [(("layout",), f"layout '{slide.layout}' not recognized", slide.layout)]
+        entry = self.reverse_index[layout]
+        if theme_mode is not None and theme_mode not in entry["layout_index"]:
+            return [(("layout",), f"layout '{layout}' has no '{theme_mode}' variant", slide.layout)]
+        problems = []
+        for i, placeholder in enumerate(slide.placeholders):
+            name = placeholder.placeholder_name
+            themes = entry["placeholders"].get(name)
+            if themes is None:
+                problems.append((
+                    ("placeholders", i, "placeholder_name"),
+                    f"placeholder '{name}' not in layout '{layout}' (valid: {sorted(entry['placeholders'])})",
+                    name,
+                ))
+            elif theme_mode is not None and theme_mode not in themes:
+                problems.append((
+                    ("placeholders", i, "placeholder_name"),
+                    f"placeholder '{name}' of layout '{layout}' has no '{theme_mode}' variant",
+                    name,
+                ))
+        return problems
+
+    def slide_errors(self, slide, theme_mode: str) -> list:
+        """
+        Layout problems of one slide as messages; empty when it can be
+        rendered in `theme_mode`.
+        """
+        return [message for _, message, _ in self.slide_problems(slide, theme_mode)]
+
+    def validate_slides(self, slides, theme_mode: str) -> list:
+        """
+        Layout problems in a deck as messages; empty when every slide can
+        be rendered in `theme_mode`.
+        """
+        errors = []
+        for n, slide in enumerate(slides, start=1):
+            errors.extend(f"Slide {n}: {error}" for error in self.slide_errors(slide, theme_mode))
+        return errors
+
+    def require_layout(self, name: str) -> str:
+        layout = self.resolve_layout(name)
+        if layout is None:
+            raise LayoutNotFoundError(name, self.layout_keys)
+        return layout
+
+    @classmethod
+    def from_file(cls, path: str) -> "LayoutRegistry":
+        mtime_ns = os.stat(path).st_mtime_ns
+        with open(path, "rb") as f:
+            raw = f.read()
+        layouts_template = safe_load_yaml(raw.decode("utf-8"))
+        version = hashlib.sha1(raw).hexdigest()[:12]
+        return cls(layouts_template, version, mtime_ns)
+
+
+_registry: LayoutRegistry | None = None
+_registry_lock = threading.Lock()
+HOT_RELOAD = os.environ.get("LAYOUTS_HOT_RELOAD", "1") != "0"
+
+
+def reload_registry() -> LayoutRegistry:
+    """
+    Recompile the layout registry from disk unconditionally.
+    """
+    global _registry
+    with _registry_lock:
+        _registry = LayoutRegistry.from_file(layout_template)
+        return _registry
+
+
+def get_registry() -> LayoutRegistry:
+    """
+    Return the compiled layout registry, rebuilding it when the YAML file
+    has changed on disk (unless LAYOUTS_HOT_RELOAD=0).
+    """
+    registry = _registry
+    if registry is None:
+        return reload_registry()
+    if HOT_RELOAD:
+        try:
+            mtime_ns = os.stat(layout_template).st_mtime_ns
+        except OSError:
+            return registry
+        if mtime_ns != registry.mtime_ns:
+            return reload_registry()
+    return registry
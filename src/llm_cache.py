@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", 3600))
+LLM_CACHE_SIZE = int(os.environ.get("LLM_CACHE_SIZE", 256))
+
+
+def completion_key(
+    model: str,
+    prompt_version: str,
+    user_prompt: str,
+    temperature: float,
+    max_tokens: int,
+    ) -> str:
+    """
+    Cache key of one completion; whitespace-only differences in the user
+    prompt map to the same key.
+    """
+    payload = json.dumps(
+        [model, prompt_version, " ".join(user_prompt.split()), temperature, max_tokens],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    """
+    LRU-bounded mapping whose entries expire `ttl` seconds after insertion.
+    """
+
+    def __init__(self, maxsize: int = LLM_CACHE_SIZE, ttl: float = LLM_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one in-flight call
+    whose result (or exception) is shared by every caller.
+    """
+
+    def __init__(self):
+        self._inflight: "dict[str, asyncio.Task]" = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]) -> tuple:
+        """
+        Returns (result, shared) where `shared` is True for callers that
+        joined an already running call. The call runs as its own task so a
+        disconnecting caller does not cancel it for the others.
+        """
+        task = self._inflight.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+
+            def forget(done_task):
+                if self._inflight.get(key) is done_task:
+                    del self._inflight[key]
+
+            task.add_done_callback(forget)
+        return await asyncio.shield(task), shared
+
+
+class CompletionCache:
+    """
+    Response cache plus single-flight coalescing for LLM completions.
+    """
+
+    def __init__(self, maxsize: int = LLM_CACHE_SIZE, ttl: float = LLM_CACHE_TTL):
+        self.cache = TTLCache(maxsize, ttl)
+        self.flight = SingleFlight()
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0}
+
+    async def get_or_compute(self, key: str, fn: Callable[[], Awaitable], use_cache: bool = True):
+        if use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.counters["hits"] += 1
+                return cached
+        result, shared = await self.flight.do(key, fn)
+        if shared:
+            self.counters["coalesced"] += 1
+        else:
+            self.counters["misses"] += 1
+            self.cache.set(key, result)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "entries": len(self.cache),
+            "maxsize": self.cache.maxsize,
+            "ttl": self.cache.ttl,
+        }
+
+
+completion_cache = CompletionCache()
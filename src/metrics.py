@@ -0,0 +1,351 @@
+import os
+import re
+import sys
+import time
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from loguru import logger
+
+
+# Upper bounds (seconds) of the /metrics histogram buckets
+METRICS_BUCKETS = tuple(
+    float(b) for b in os.environ.get("METRICS_BUCKETS", "0.001,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30,60").split(",")
+)
+# Requests whose X-Profile header equals this token are run under cProfile;
+# empty disables profiling
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_HEADER = "x-profile"
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "tmp/profiles")
+# Log one JSON object per line instead of loguru's text format
+LOG_JSON = os.environ.get("LOG_JSON", "0") == "1"
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """
+    Prometheus histogram with a fixed set of label names.
+    """
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = METRICS_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    le = 'le="%g"' % bound
+                    lines.append(f"{self.name}_bucket{_labels(self.labels, label_values, le)} {bucket_count}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, label_values, le)} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, label_values)} {total:.6f}")
+                lines.append(f"{self.name}_count{_labels(self.labels, label_values)} {count}")
+        return lines
+
+
+class Counter:
+    """
+    Prometheus counter with a fixed set of label names.
+    """
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *label_values) -> None:
+        with self._lock:
+            self._series[label_values] = self._series.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._series.items()):
+                lines.append(f"{self.name}{_labels(self.labels, label_values)} {value:g}")
+        return lines
+
+
+class Gauge:
+    """
+    Prometheus gauge with a fixed set of label names.
+    """
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, *label_values) -> None:
+        with self._lock:
+            self._series[label_values] = value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for label_values, value in sorted(self._series.items()):
+                lines.append(f"{self.name}{_labels(self.labels, label_values)} {value:g}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("ppt_stage_seconds", "Time spent per pipeline stage.", ("stage",))
+REQUEST_SECONDS = Histogram("ppt_request_seconds", "HTTP request duration.", ("method", "route", "status"))
+LLM_TOKENS = Counter("ppt_llm_tokens_total", "LLM tokens used.", ("model", "kind"))
+ADMISSION_UTILIZATION = Gauge(
+    "ppt_admission_utilization", "Admitted request cost over budget, per scope (global or endpoint).", ("scope",),
+)
+ADMISSION_QUEUED = Gauge("ppt_admission_queued", "Requests waiting for admission.", ("endpoint",))
+ADMISSION_SHED = Counter("ppt_admission_shed_total", "Requests rejected by admission control.", ("endpoint", "reason"))
+TTS_BATCHES = Counter(
+    "ppt_tts_batches_total", "Batched TTS sessions, split into per-slide clips or redone per slide.", ("outcome",),
+)
+METRICS = [STAGE_SECONDS, REQUEST_SECONDS, LLM_TOKENS, ADMISSION_UTILIZATION, ADMISSION_QUEUED, ADMISSION_SHED, TTS_BATCHES]
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class Timings:
+    """
+    Stage samples of one request or job. Samples are observed into the
+    histograms once, when the request ends; samples recorded after that
+    (e.g. while a streamed body is still being produced) go straight in.
+    """
+
+    def __init__(self, profile: bool = False):
+        self.samples = []
+        self.notes = {}
+        self.failed_stage = None
+        self.profile = profile
+        self.worker_profiles = []
+        self.closed = False
+
+    def add(self, name: str, seconds: float) -> None:
+        if self.closed:
+            STAGE_SECONDS.observe(seconds, name)
+        else:
+            self.samples.append((name, seconds))
+
+    def fail(self, name: Optional[str]) -> None:
+        if self.failed_stage is None:
+            self.failed_stage = name
+
+    def merge(self, samples: list, profile_stats: Optional[dict] = None) -> None:
+        for name, seconds in samples:
+            self.add(name, seconds)
+        if profile_stats:
+            self.worker_profiles.append(profile_stats)
+
+    def summary(self) -> dict:
+        """
+        {stage: {"ms": total milliseconds, "count": samples}}, in order of
+        first appearance.
+        """
+        stages = {}
+        for name, seconds in self.samples:
+            entry = stages.setdefault(name, {"ms": 0.0, "count": 0})
+            entry["ms"] += seconds * 1000
+            entry["count"] += 1
+        for entry in stages.values():
+            entry["ms"] = round(entry["ms"], 3)
+        return stages
+
+    def server_timing(self) -> str:
+        entries = []
+        for name, entry in self.summary().items():
+            desc = f';desc="{entry["count"]}x"' if entry["count"] > 1 else ""
+            entries.append(f"{name};dur={entry['ms']:.1f}{desc}")
+        for name, desc in self.notes.items():
+            entries.append(f'{name};desc="{desc}"')
+        return ", ".join(entries)
+
+    def close(self) -> None:
+        self.closed = True
+        for name, seconds in self.samples:
+            STAGE_SECONDS.observe(seconds, name)
+
+
+_current: ContextVar[Optional[Timings]] = ContextVar("ppt_timings", default=None)
+
+
+def current_timings() -> Optional[Timings]:
+    return _current.get()
+
+
+def record(name: str, seconds: float) -> None:
+    """
+    Add a stage sample to the current request, or straight to the
+    histograms outside of one.
+    """
+    timings = _current.get()
+    if timings is None:
+        STAGE_SECONDS.observe(seconds, name)
+    else:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Time the block as stage `name`; a block that raises marks the request's
+    failed stage (the first one wins).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        timings = _current.get()
+        if timings is not None:
+            timings.fail(name)
+        raise
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def annotate(name: str, desc: str) -> None:
+    """
+    Attach a value without a duration (e.g. token counts) to the current
+    request's Server-Timing header.
+    """
+    timings = _current.get()
+    if timings is not None:
+        timings.notes[name] = desc
+
+
+@contextmanager
+def collect(profile: bool = False):
+    """
+    Collect stage samples of everything run in this context (including
+    executor jobs it awaits) into a new Timings.
+    """
+    timings = Timings(profile)
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+        timings.close()
+
+
+def call_timed(fn, args: tuple, kwargs: dict, profile: bool = False) -> tuple:
+    """
+    Executor-side wrapper: run `fn` collecting its stage samples (and a
+    cProfile of it when `profile`) to hand back to the awaiting request.
+    Returns (result, samples, profile_stats).
+    """
+    timings = Timings()
+    token = _current.set(timings)
+    profiler = cProfile.Profile() if profile else None
+    try:
+        if profiler is not None:
+            profiler.enable()
+        result = fn(*args, **kwargs)
+    except Exception as e:
+        # Kept in the exception's __dict__, so it also survives pickling
+        e.failed_stage = timings.failed_stage
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        _current.reset(token)
+    profile_stats = None
+    if profiler is not None:
+        profiler.create_stats()
+        profile_stats = profiler.stats
+    return result, timings.samples, profile_stats
+
+
+class _StatsDump:
+    # What pstats.Stats.add accepts, for stats sent back by process workers
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+# cProfile can only have one active profiler per process
+_profile_lock = threading.Lock()
+
+
+@contextmanager
+def profiling(timings: Timings, label: str):
+    """
+    Run the block under cProfile when `timings.profile` is set and no other
+    request is being profiled, then dump the stats (merged with those of
+    process workers) to PROFILE_DIR; the file name is stored in
+    timings.notes["profile"]. The profiler sees the whole event loop and
+    thread pools, so concurrent requests show up in the dump too.
+    """
+    if not timings.profile or not _profile_lock.acquire(blocking=False):
+        if timings.profile:
+            timings.profile = False
+            timings.notes["profile"] = "busy"
+        yield
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+    finally:
+        _profile_lock.release()
+        stats = pstats.Stats(profiler)
+        for worker_stats in timings.worker_profiles:
+            stats.add(_StatsDump(worker_stats))
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}_{os.getpid()}_{re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_')}.prof"
+        stats.dump_stats(os.path.join(PROFILE_DIR, name))
+        timings.notes["profile"] = name
+
+
+def profile_path(name: str) -> Optional[str]:
+    """
+    Path of a dump written by profiling(), or None for unknown names.
+    """
+    if not re.fullmatch(r"[A-Za-z0-9_]+\.prof", name):
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+def configure_logging() -> None:
+    if LOG_JSON:
+        logger.remove()
+        logger.add(sys.stderr, serialize=True)
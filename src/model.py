@@ -1,4 +1,5 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError, ValidationInfo, field_validator, model_validator
+from pydantic_core import InitErrorDetails, PydanticCustomError
 from typing import List, Optional, Literal
 
 class Placeholder(BaseModel):
@@ -11,7 +12,51 @@ class Slide(BaseModel):
     placeholders: List[Placeholder] 
     speaker_notes: Optional[str] = None  # Optional speaker notes for this slide
 
+    @model_validator(mode="after")
+    def _check_layout(self, info: ValidationInfo) -> "Slide":
+        # Validated with {"registry": LayoutRegistry, "theme_mode": ...} as
+        # context, unknown layouts and placeholders are validation errors
+        # at their own location, reported together with schema errors
+        context = info.context or {}
+        registry = context.get("registry")
+        if registry is None:
+            return self
+        problems = registry.slide_problems(self, context.get("theme_mode"))
+        if problems:
+            raise ValidationError.from_exception_data("Slide", [
+                InitErrorDetails(
+                    type=PydanticCustomError("layout_registry", "{message}", {"message": message}),
+                    loc=loc,
+                    input=value,
+                )
+                for loc, message, value in problems
+            ])
+        return self
+
 class PresentationContent(BaseModel):
     filename: str
     theme_mode: Literal['light', 'dark']
     slides: List[Slide]
+
+    @field_validator("theme_mode")
+    @classmethod
+    def _theme_for_slides(cls, value: str, info: ValidationInfo) -> str:
+        # Slides (validated after this field) are checked against the
+        # registry in this deck's theme. An "after" validator on a plain
+        # field keeps validate_json from materializing the slides as dicts.
+        if info.context is not None:
+            info.context["theme_mode"] = value
+        return value
+
+class NarratedPresentationContent(PresentationContent):
+    # Narration voice, "male" or "female"
+    audio: Optional[str] = "female"
+
+    def presentation(self) -> PresentationContent:
+        """
+        The deck without the narration settings, so it renders and caches
+        exactly like the same deck sent to /generate_presentation.
+        """
+        return PresentationContent.model_construct(
+            filename=self.filename, theme_mode=self.theme_mode, slides=self.slides
+        )
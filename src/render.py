@@ -0,0 +1,177 @@
+import io
+import json
+import time
+import hashlib
+from collections import defaultdict, deque
+from typing import Optional
+
+from pptx import Presentation
+from pptx.presentation import Presentation as PresentationType
+from pptx.shapes.shapetree import SlideShapeFactory
+
+from src.docx_engine import write_docx
+from src.layouts import LayoutRegistry, get_registry
+from src.metrics import record, stage
+from src.model import Slide, PresentationContent
+from src.template_cache import new_presentation, template_digest
+from src.slide_skeletons import SkeletonSet, add_notes_slide, slide_skeletons
+from src.utils import process_html, ppt_template
+
+
+def add_slide(
+    prs: PresentationType,
+    slide_content: Slide,
+    theme_mode: str,
+    registry: LayoutRegistry,
+    skeletons: SkeletonSet,
+    ):
+    """
+    Append one slide built from `slide_content` to `prs` and return it.
+
+    The slide is cloned from the layout's skeleton in `skeletons` and
+    placeholders are looked up by idx directly.
+    Raises LayoutNotFoundError when the layout name cannot be resolved.
+    """
+    start = time.perf_counter()
+    with stage("layout"):
+        layout_name = registry.require_layout(slide_content.layout)
+        layout_index = registry.reverse_index[layout_name]["layout_index"][theme_mode]
+        placeholders_reverse = registry.reverse_index[layout_name]["placeholders"]
+        slide_layout = prs.slide_layouts[layout_index]
+    slide, placeholder_elements = skeletons.get(slide_layout, layout_index).add_to(prs, slide_layout)
+    # One timing sample per slide, not per bullet
+    with stage("html"):
+        for placeholder in slide_content.placeholders:
+            name = placeholder.placeholder_name
+            content = placeholder.content
+            try:
+                index = placeholders_reverse[name][theme_mode]
+                ph = SlideShapeFactory(placeholder_elements[index], slide.shapes)
+                text_frame = ph.text_frame
+                if isinstance(content, list):
+                    # The skeleton left one empty paragraph for the first bullet
+                    for n, c in enumerate(content):
+                        p = text_frame.paragraphs[0] if n == 0 else text_frame.add_paragraph()
+                        process_html(c, p)
+            except Exception as e:
+                break
+    # Add speaker notes if provided
+    if slide_content.speaker_notes:
+        add_notes_slide(slide).notes_text_frame.text = slide_content.speaker_notes
+    record("slide", time.perf_counter() - start)
+    return slide
+
+
+def render_pptx_bytes(
+    prs_content: PresentationContent,
+    template: str = ppt_template,
+    ) -> bytes:
+    """
+    Build the whole deck and return the saved .pptx bytes.
+
+    Module-level and argument-picklable so it can run in a process pool.
+    """
+    registry = get_registry()
+    skeletons = slide_skeletons(template)
+    with stage("template"):
+        prs = new_presentation(template)
+    for slide_content in prs_content.slides:
+        add_slide(prs, slide_content, prs_content.theme_mode, registry, skeletons)
+    with stage("serialize"):
+        pptx_buffer = io.BytesIO()
+        prs.save(pptx_buffer)
+        return pptx_buffer.getvalue()
+
+
+def slide_hash(slide_content: Slide, theme_mode: str) -> str:
+    """
+    Content hash of what one slide renders from. slide_number is left out
+    so inserting a slide does not change the hashes of the ones after it.
+    """
+    payload = json.dumps(
+        [theme_mode, slide_content.model_dump(mode="json", exclude={"slide_number"})],
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def render_pptx_incremental(
+    prs_content: PresentationContent,
+    previous: Optional[tuple] = None,
+    template: str = ppt_template,
+    ) -> tuple:
+    """
+    Render the deck reusing the unchanged slides of `previous`, a
+    (pptx_bytes, slide_hashes) pair from an earlier render of the same
+    template and registry version. Changed and added slides are built into
+    the previous package, removed ones are dropped and the slide list is
+    put in the new order.
+
+    Returns (pptx_bytes, slide_hashes, rebuilt) where `rebuilt` lists the
+    1-based positions of the slides that were built.
+    """
+    hashes = [slide_hash(slide, prs_content.theme_mode) for slide in prs_content.slides]
+    if previous is None:
+        return render_pptx_bytes(prs_content, template), hashes, list(range(1, len(hashes) + 1))
+    registry = get_registry()
+    skeletons = slide_skeletons(template)
+    old_bytes, old_hashes = previous
+    with stage("template"):
+        prs = Presentation(io.BytesIO(old_bytes))
+    sld_id_lst = prs.slides._sldIdLst
+    old_ids = list(sld_id_lst)
+    if len(old_ids) != len(old_hashes):
+        return render_pptx_bytes(prs_content, template), hashes, list(range(1, len(hashes) + 1))
+
+    available = defaultdict(deque)
+    for sld_id, old_hash in zip(old_ids, old_hashes):
+        available[old_hash].append(sld_id)
+    order = []
+    rebuilt = []
+    for position, (slide_content, new_hash) in enumerate(zip(prs_content.slides, hashes), start=1):
+        if available[new_hash]:
+            order.append(available[new_hash].popleft())
+            continue
+        add_slide(prs, slide_content, prs_content.theme_mode, registry, skeletons)
+        order.append(sld_id_lst[-1])
+        rebuilt.append(position)
+
+    kept = {id(sld_id) for sld_id in order}
+    for sld_id in old_ids:
+        if id(sld_id) not in kept:
+            rId = sld_id.rId
+            sld_id_lst.remove(sld_id)
+            prs.part.drop_rel(rId)
+    for sld_id in order:
+        # lxml append moves the element, leaving the list in `order`
+        sld_id_lst.append(sld_id)
+    prs.part.rename_slide_parts([sld_id.rId for sld_id in sld_id_lst])
+    with stage("serialize"):
+        pptx_buffer = io.BytesIO()
+        prs.save(pptx_buffer)
+        return pptx_buffer.getvalue(), hashes, rebuilt
+
+
+def deck_fingerprint(
+    prs_content: PresentationContent,
+    template: str = ppt_template,
+    ) -> str:
+    """
+    Content hash of everything a rendered deck depends on: the slides, the
+    template file and the layout registry version. Used instead of hashing
+    the .pptx itself, whose zip entries carry the save time.
+    """
+    payload = json.dumps(
+        [prs_content.model_dump(mode="json"), template_digest(template), get_registry().version],
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def render_docx_bytes(content: str, fmt: str = "text") -> bytes:
+    """
+    .docx bytes of `content` split on blank lines (see src.docx_engine).
+    """
+    return write_docx(content, fmt, io.BytesIO()).getvalue()
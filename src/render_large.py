@@ -0,0 +1,119 @@
+import os
+import zipfile
+import tempfile
+
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.oxml import serialize_part_xml
+from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from pptx.opc.serialized import _ContentTypesItem
+from pptx.oxml import parse_xml
+
+from src.layouts import get_registry
+from src.metrics import stage
+from src.model import PresentationContent
+from src.render import add_slide
+from src.slide_skeletons import slide_skeletons
+from src.template_cache import new_presentation
+from src.utils import ppt_template
+
+
+# Decks with at least this many slides are rendered in low-memory mode
+LARGE_DECK_SLIDES = int(os.environ.get("LARGE_DECK_SLIDES", 150))
+# Slides built between two flushes to the output zip
+LARGE_DECK_CHUNK = int(os.environ.get("LARGE_DECK_CHUNK", 25))
+# Where low-memory renders write their output; default: the system temp dir
+RENDER_TMP_DIR = os.environ.get("RENDER_TMP_DIR") or None
+
+# Stands in for the XML of parts that were already written out
+_STUB = parse_xml(b'<p:sld xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main"/>')
+
+
+class StreamingPackageWriter:
+    """
+    Writes the parts of a python-pptx package into a zip as soon as they
+    are final, then the rest of the package on finish().
+    """
+
+    def __init__(self, file):
+        self.zip = zipfile.ZipFile(file, "w", compression=zipfile.ZIP_DEFLATED, strict_timestamps=False)
+        self.written = set()
+
+    def write_part(self, part) -> None:
+        self.zip.writestr(part.partname.membername, part.blob)
+        if part._rels:
+            self.zip.writestr(part.partname.rels_uri.membername, part.rels.xml)
+        self.written.add(part.partname)
+
+    def flush_slides(self, slide_parts: list) -> None:
+        """
+        Write finished slides and their notes, then swap their XML for a
+        stub so the trees can be freed. The parts stay in the package so
+        relationships, content types and the slide list stay correct.
+        """
+        for slide_part in slide_parts:
+            parts = [slide_part]
+            if slide_part.has_notes_slide:
+                parts.append(slide_part.part_related_by(RT.NOTES_SLIDE))
+            for part in parts:
+                self.write_part(part)
+                part._element = _STUB
+                # Drop lazily cached proxies that still reference the old tree
+                part.__dict__.pop("slide", None)
+                part.__dict__.pop("notes_slide", None)
+
+    def finish(self, package) -> None:
+        parts = tuple(package.iter_parts())
+        for part in parts:
+            if part.partname not in self.written:
+                self.write_part(part)
+        self.zip.writestr(CONTENT_TYPES_URI.membername, serialize_part_xml(_ContentTypesItem.xml_for(parts)))
+        self.zip.writestr(PACKAGE_URI.rels_uri.membername, package._rels.xml)
+        self.zip.close()
+
+
+def render_pptx_file(
+    prs_content: PresentationContent,
+    path: str,
+    template: str = ppt_template,
+    chunk_size: int = LARGE_DECK_CHUNK,
+    ) -> int:
+    """
+    Build the deck into the .pptx file at `path`, flushing every
+    `chunk_size` slides so only one chunk of slide trees is in memory at a
+    time. Returns the file size.
+    """
+    registry = get_registry()
+    skeletons = slide_skeletons(template)
+    with stage("template"):
+        prs = new_presentation(template)
+    with open(path, "wb") as f:
+        writer = StreamingPackageWriter(f)
+        chunk = []
+        for slide_content in prs_content.slides:
+            chunk.append(add_slide(prs, slide_content, prs_content.theme_mode, registry, skeletons).part)
+            if len(chunk) >= chunk_size:
+                with stage("serialize"):
+                    writer.flush_slides(chunk)
+                chunk = []
+        with stage("serialize"):
+            writer.flush_slides(chunk)
+            writer.finish(prs.part.package)
+        return f.tell()
+
+
+def render_pptx_tempfile(
+    prs_content: PresentationContent,
+    template: str = ppt_template,
+    chunk_size: int = LARGE_DECK_CHUNK,
+    ) -> tuple:
+    """
+    render_pptx_file into a new temp file; returns (path, size). The caller
+    deletes the file. Picklable, so it can run in a process pool.
+    """
+    fd, path = tempfile.mkstemp(suffix=".pptx", dir=RENDER_TMP_DIR)
+    os.close(fd)
+    try:
+        return path, render_pptx_file(prs_content, path, template, chunk_size)
+    except BaseException:
+        os.unlink(path)
+        raise
@@ -0,0 +1,111 @@
+import os
+import glob
+import uuid
+import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
+from typing import NamedTuple, Optional
+
+from loguru import logger
+
+from src.executor import cpu_executor, run_cpu
+from src.layouts import get_registry
+from src.model import PresentationContent
+from src.render import render_pptx_incremental
+from src.render_large import render_pptx_tempfile
+from src.slide_skeletons import slide_skeletons
+from src.template_cache import new_presentation
+from src.utils import compile_html, ppt_template
+
+
+# Rendered decks at least this large come back from process workers through
+# shared memory instead of being pickled over the result pipe
+RENDER_SHM_MIN_BYTES = int(os.environ.get("RENDER_SHM_MIN_BYTES", 256 * 1024))
+SHM_PREFIX = "ppt_"
+
+
+class SharedBytes(NamedTuple):
+    name: str
+    size: int
+
+
+def warm_worker(template: str = ppt_template) -> None:
+    """
+    Process pool initializer: load the layout registry, template, slide
+    skeletons and HTML parser once per worker instead of in its first job.
+    """
+    get_registry()
+    compile_html("<p level=\"1\"><span style=\"font-weight: bold\">warm</span></p>")
+    try:
+        new_presentation(template)
+        slide_skeletons(template)
+    except OSError as e:
+        logger.warning("Render worker {} could not preload {}: {}", os.getpid(), template, e)
+
+
+def _to_shared(data: bytes, owner_pid: int):
+    if multiprocessing.parent_process() is None or len(data) < RENDER_SHM_MIN_BYTES:
+        return data
+    # Unlinked by the parent once read; track=False keeps this worker's
+    # resource tracker from removing it when the worker exits
+    shm = SharedMemory(
+        name=f"{SHM_PREFIX}{owner_pid}_{uuid.uuid4().hex[:16]}", create=True, size=len(data), track=False,
+    )
+    try:
+        shm.buf[:len(data)] = data
+    finally:
+        shm.close()
+    return SharedBytes(shm.name, len(data))
+
+
+def _from_shared(result) -> bytes:
+    if not isinstance(result, SharedBytes):
+        return result
+    shm = SharedMemory(name=result.name, track=False)
+    try:
+        return bytes(shm.buf[:result.size])
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _render_job(prs_content: PresentationContent, previous: Optional[tuple], template: str, owner_pid: int) -> tuple:
+    pptx_bytes, slide_hashes, rebuilt = render_pptx_incremental(prs_content, previous, template)
+    return _to_shared(pptx_bytes, owner_pid), slide_hashes, rebuilt
+
+
+async def render_deck(
+    prs_content: PresentationContent,
+    previous: Optional[tuple] = None,
+    template: str = ppt_template,
+    ) -> tuple:
+    """
+    Render a deck on the CPU pool; same result as render_pptx_incremental.
+    """
+    result, slide_hashes, rebuilt = await run_cpu(_render_job, prs_content, previous, template, os.getpid())
+    return _from_shared(result), slide_hashes, rebuilt
+
+
+async def render_deck_file(prs_content: PresentationContent, template: str = ppt_template) -> tuple:
+    """
+    Render a large deck on the CPU pool in low-memory mode into a temp
+    file; returns (path, size). The caller deletes the file.
+    """
+    return await run_cpu(render_pptx_tempfile, prs_content, template)
+
+
+def sweep_shared_memory(owner_pid: Optional[int] = None) -> int:
+    """
+    Unlink result segments of `owner_pid` (default: this process) that were
+    never collected, e.g. because the request was cancelled mid-render.
+    """
+    removed = 0
+    for path in glob.glob(f"/dev/shm/{SHM_PREFIX}{owner_pid or os.getpid()}_*"):
+        try:
+            os.unlink(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+cpu_executor.set_initializer(warm_worker, (ppt_template,))
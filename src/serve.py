@@ -0,0 +1,171 @@
+"""
+Preload-and-fork launcher: the master process imports the app, builds the
+shared read-only state (layout registry, parsed templates, slide
+skeletons, system prompt) and the heavy integration SDKs once, freezes it
+out of the garbage collector and forks the uvicorn workers, which share
+those pages copy-on-write and serve from a socket bound by the master.
+Workers that die are replaced.
+
+    python -m src.serve --host 0.0.0.0 --port 8000 --workers 4
+"""
+import gc
+import os
+import sys
+import time
+import signal
+import socket
+import argparse
+import importlib
+import threading
+
+from loguru import logger
+
+
+# Worker processes forked from the master
+SERVE_WORKERS = int(os.environ.get("SERVE_WORKERS", os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)))
+# Modules imported in the master so forked workers share them instead of
+# each importing them on first use; the app itself defers them
+SERVE_PRELOAD_IMPORTS = os.environ.get("SERVE_PRELOAD_IMPORTS", "openai,edge_tts,cloudinary.utils")
+# Seconds a worker gets to finish in-flight requests after SIGTERM
+SERVE_GRACEFUL_TIMEOUT = float(os.environ.get("SERVE_GRACEFUL_TIMEOUT", 30))
+# Workers exiting within this many seconds of being forked are restarted
+# only after the same delay, so a crashing worker does not spin the master
+SERVE_RESTART_DELAY = float(os.environ.get("SERVE_RESTART_DELAY", 1))
+
+# uvicorn's exit code when the app's lifespan startup fails
+STARTUP_FAILURE = 3
+
+
+def preload(imports: str = SERVE_PRELOAD_IMPORTS):
+    """
+    Import the app and build everything workers can share; returns the app.
+    """
+    start = time.perf_counter()
+    from src import api_server
+    api_server.preload()
+    for name in filter(None, (name.strip() for name in imports.split(","))):
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logger.warning("Could not preload {}: {}", name, e)
+    # Long-lived objects from here on are never collected; keeping them out
+    # of the collector's generations stops every worker's GC passes from
+    # writing to (and so copying) the shared pages
+    gc.collect()
+    gc.freeze()
+    if threading.active_count() > 1:
+        logger.warning("{} threads running before fork; only the calling thread survives in workers", threading.active_count())
+    logger.info("Preloaded app in {:.0f} ms", (time.perf_counter() - start) * 1000)
+    return api_server.app
+
+
+def bind(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket, args) -> int:
+    import uvicorn
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, signal.SIG_DFL)
+    config = uvicorn.Config(
+        app,
+        log_level=args.log_level,
+        timeout_graceful_shutdown=SERVE_GRACEFUL_TIMEOUT,
+        proxy_headers=args.proxy_headers,
+        forwarded_allow_ips=args.forwarded_allow_ips,
+    )
+    server = uvicorn.Server(config)
+    try:
+        server.run(sockets=[sock])
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else 1
+    return 0 if server.started else STARTUP_FAILURE
+
+
+def spawn(app, sock: socket.socket, args) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+    code = 1
+    try:
+        code = _run_worker(app, sock, args)
+    except BaseException:
+        logger.exception("Worker {} crashed", os.getpid())
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def serve(app, sock: socket.socket, args) -> int:
+    """
+    Fork args.workers workers and supervise them until SIGTERM/SIGINT,
+    which is passed on to every worker.
+    """
+    workers = {}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(args.workers):
+        workers[spawn(app, sock, args)] = time.monotonic()
+    logger.info("Master {} serving on {}:{} with {} workers", os.getpid(), args.host, args.port, args.workers)
+
+    exit_code = 0
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = workers.pop(pid, None)
+        if started is None or stopping:
+            continue
+        code = os.waitstatus_to_exitcode(status)
+        if code == STARTUP_FAILURE:
+            # The app cannot start; restarting would fail the same way
+            logger.error("Worker {} failed to start, shutting down", pid)
+            exit_code = STARTUP_FAILURE
+            stop(signal.SIGTERM, None)
+            continue
+        logger.warning("Worker {} exited with {}, restarting", pid, code)
+        if time.monotonic() - started < SERVE_RESTART_DELAY:
+            time.sleep(SERVE_RESTART_DELAY)
+        if not stopping:
+            workers[spawn(app, sock, args)] = time.monotonic()
+    return exit_code
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preloading multi-worker server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--proxy-headers", action="store_true")
+    parser.add_argument("--forwarded-allow-ips", default=None)
+    parser.add_argument("--preload-imports", default=SERVE_PRELOAD_IMPORTS,
+                        help="comma-separated modules to import in the master (empty for none)")
+    args = parser.parse_args()
+
+    app = preload(args.preload_imports)
+    sock = bind(args.host, args.port)
+    return serve(app, sock, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
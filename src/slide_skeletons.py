@@ -0,0 +1,129 @@
+import re
+import copy
+import weakref
+import threading
+from collections import OrderedDict
+
+from pptx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+from pptx.opc.packuri import PackURI
+from pptx.oxml.slide import CT_NotesSlide
+from pptx.parts.slide import NotesSlidePart, SlidePart
+from pptx.presentation import Presentation as PresentationType
+from pptx.slide import NotesSlide, Slide, SlideLayout
+
+from src.template_cache import TEMPLATE_CACHE_SIZE, template_digest
+
+
+class SlideSkeleton:
+    """
+    Slide XML with the layout's placeholders already cloned and their text
+    cleared, deep-copied for every new slide, plus the position of each
+    placeholder idx in the shape tree so fills need no shape scan.
+    """
+
+    def __init__(self, slide_layout: SlideLayout):
+        # Built the same way as Slides.add_slide, on a part that is never
+        # related to the presentation
+        part = SlidePart.new(PackURI("/ppt/slides/skeleton.xml"), slide_layout.part.package, slide_layout.part)
+        part.slide.shapes.clone_layout_placeholders(slide_layout)
+        self.element = part._element
+        self.positions = {}
+        for position, child in enumerate(self.element.cSld.spTree):
+            ph = getattr(child, "ph", None)
+            if ph is not None:
+                self.positions[ph.idx] = position
+                # Pre-clear the text once here instead of on every slide:
+                # a single empty paragraph, the one a body must have, which
+                # takes the first bullet
+                txBody = getattr(child, "txBody", None)
+                if txBody is not None:
+                    txBody.clear_content()
+                    txBody.add_p()
+
+    def add_to(self, prs: PresentationType, slide_layout: SlideLayout) -> tuple:
+        """
+        Append a slide cloned from the skeleton to `prs`; returns the slide
+        and its {placeholder idx: shape element} map.
+        """
+        prs_part = prs.part
+        slide_part = SlidePart(prs_part._next_slide_partname, CT.PML_SLIDE, prs_part.package, copy.deepcopy(self.element))
+        slide_part.relate_to(slide_layout.part, RT.SLIDE_LAYOUT)
+        # The part is new, so skip relate_to's scan of every existing relationship
+        prs.slides._sldIdLst.add_sldId(prs_part.rels._add_relationship(RT.SLIDE, slide_part))
+        shapes = list(slide_part._element.cSld.spTree)
+        return slide_part.slide, {idx: shapes[position] for idx, position in self.positions.items()}
+
+
+class SkeletonSet:
+    """
+    Skeletons of one template, built lazily per layout index.
+    """
+
+    def __init__(self):
+        self._skeletons = {}
+
+    def get(self, slide_layout: SlideLayout, layout_index: int) -> SlideSkeleton:
+        skeleton = self._skeletons.get(layout_index)
+        if skeleton is None:
+            skeleton = self._skeletons[layout_index] = SlideSkeleton(slide_layout)
+        return skeleton
+
+    def __len__(self) -> int:
+        return len(self._skeletons)
+
+
+_sets: "OrderedDict[str, SkeletonSet]" = OrderedDict()
+_sets_lock = threading.Lock()
+
+
+def slide_skeletons(template: str) -> SkeletonSet:
+    """
+    Skeleton set of the template file at `template`, shared by every
+    render of the same file content in this process.
+    """
+    digest = template_digest(template)
+    with _sets_lock:
+        skeletons = _sets.get(digest)
+        if skeletons is None:
+            skeletons = _sets[digest] = SkeletonSet()
+            while len(_sets) > TEMPLATE_CACHE_SIZE:
+                _sets.popitem(last=False)
+        _sets.move_to_end(digest)
+        return skeletons
+
+
+_NOTES_PARTNAME = re.compile(r"/ppt/notesSlides/notesSlide(\d+)\.xml$")
+# Last notes slide number used per package
+_notes_numbers: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def add_notes_slide(slide: Slide) -> NotesSlide:
+    """
+    Same as `slide.notes_slide` for a slide without notes, but numbers the
+    new part from a per-package counter: python-pptx's next_partname walks
+    every part of the package, which made notes quadratic in deck size.
+    """
+    slide_part = slide.part
+    package = slide_part.package
+    number = _notes_numbers.get(package)
+    if number is None:
+        number = max(
+            (int(m.group(1)) for part in package.iter_parts() if (m := _NOTES_PARTNAME.match(part.partname))),
+            default=0,
+        )
+    number += 1
+    _notes_numbers[package] = number
+    notes_master_part = package.presentation_part.notes_master_part
+    notes_part = NotesSlidePart(
+        PackURI(f"/ppt/notesSlides/notesSlide{number}.xml"), CT.PML_NOTES_SLIDE, package, CT_NotesSlide.new(),
+    )
+    notes_part.relate_to(notes_master_part, RT.NOTES_MASTER)
+    notes_part.relate_to(slide_part, RT.SLIDE)
+    notes_part.notes_slide.clone_master_placeholders(notes_master_part.notes_master)
+    slide_part.relate_to(notes_part, RT.NOTES_SLIDE)
+    return notes_part.notes_slide
+
+
+def clear_slide_skeletons() -> None:
+    with _sets_lock:
+        _sets.clear()
@@ -0,0 +1,485 @@
+import os
+import hmac
+import time
+import asyncio
+import hashlib
+import tempfile
+import datetime
+import threading
+import urllib.parse
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+from xml.etree import ElementTree
+
+from yarl import URL
+
+from src.executor import run_io
+from src.metrics import stage
+from src.clients import get_http_session, cloudinary_upload, cloudinary_utils
+
+
+# "cloudinary", "local" (files served by this app) or "s3" (any S3-compatible store)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "cloudinary")
+# Uploads in flight per backend
+STORAGE_CONCURRENCY = int(os.environ.get("STORAGE_CONCURRENCY", 8))
+# Ask the backend whether a content-addressed key already exists before uploading
+STORAGE_CHECK_EXISTS = os.environ.get("STORAGE_CHECK_EXISTS", "1") != "0"
+# Keys known to exist, remembered per process
+STORAGE_KNOWN_KEYS = int(os.environ.get("STORAGE_KNOWN_KEYS", 4096))
+
+LOCAL_STORAGE_DIR = os.environ.get("LOCAL_STORAGE_DIR", os.path.join(tempfile.gettempdir(), "ppt_storage"))
+LOCAL_STORAGE_URL = os.environ.get("LOCAL_STORAGE_URL", "/files")
+
+S3_ENDPOINT = os.environ.get("S3_ENDPOINT", "https://s3.amazonaws.com")
+S3_BUCKET = os.environ.get("S3_BUCKET", "")
+S3_REGION = os.environ.get("S3_REGION", "us-east-1")
+S3_ACCESS_KEY = os.environ.get("S3_ACCESS_KEY", "")
+S3_SECRET_KEY = os.environ.get("S3_SECRET_KEY", "")
+# Base of the returned object URLs, defaults to the path-style endpoint URL
+S3_PUBLIC_URL = os.environ.get("S3_PUBLIC_URL", "")
+# Objects above the threshold are sent as a multipart upload of S3_PART_SIZE parts
+S3_MULTIPART_THRESHOLD = int(os.environ.get("S3_MULTIPART_THRESHOLD", 16 * 1024 * 1024))
+S3_PART_SIZE = int(os.environ.get("S3_PART_SIZE", 8 * 1024 * 1024))
+S3_PART_CONCURRENCY = int(os.environ.get("S3_PART_CONCURRENCY", 4))
+
+
+class StorageError(RuntimeError):
+    pass
+
+
+class StoredObject(NamedTuple):
+    key: str
+    url: str
+    size: int
+    # True when the key already existed and the upload was skipped
+    skipped: bool
+
+
+def content_digest(data) -> str:
+    """
+    sha256 of bytes or of a seekable binary file (read in blocks).
+    """
+    if not hasattr(data, "read"):
+        return hashlib.sha256(data).hexdigest()
+    digest = hashlib.sha256()
+    data.seek(0)
+    for block in iter(lambda: data.read(1024 * 1024), b""):
+        digest.update(block)
+    data.seek(0)
+    return digest.hexdigest()
+
+
+def object_key(folder: str, digest: str, name: str, ext: str = "") -> str:
+    """
+    Deterministic key for an artifact: identical content gives the same
+    key, so a second upload of it can be skipped.
+    """
+    name = name[:-len(ext)] if ext and name.endswith(ext) else name
+    safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in name) or "file"
+    return f"{folder}/{digest[:32]}/{safe_name}{ext}"
+
+
+def _data_size(data) -> int:
+    if not hasattr(data, "read"):
+        return len(data)
+    position = data.tell()
+    data.seek(0, os.SEEK_END)
+    size = data.tell()
+    data.seek(position)
+    return size
+
+
+class StorageBackend:
+    """
+    Base class for artifact storage: bounded concurrency, skip-if-exists
+    for content-addressed keys and upload timing metrics. Subclasses
+    implement _upload, _exists and url_for.
+    """
+
+    name = "base"
+
+    def __init__(self, concurrency: int = STORAGE_CONCURRENCY, check_exists: bool = STORAGE_CHECK_EXISTS):
+        self.concurrency = concurrency
+        self.check_exists = check_exists
+        self._semaphore = None
+        self._known: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {
+            "uploads": 0,
+            "skipped": 0,
+            "failed": 0,
+            "bytes": 0,
+            "in_flight": 0,
+            "upload_seconds_total": 0.0,
+            "upload_seconds_max": 0.0,
+        }
+
+    def _remember(self, key: str, url: str) -> None:
+        with self._lock:
+            self._known[key] = url
+            self._known.move_to_end(key)
+            while len(self._known) > STORAGE_KNOWN_KEYS:
+                self._known.popitem(last=False)
+
+    async def lookup(self, key: str, attachment: bool = False) -> Optional[str]:
+        """
+        URL of `key` when it is already stored (counted as a skipped
+        upload), else None.
+        """
+        with self._lock:
+            url = self._known.get(key)
+        if url is None and self.check_exists:
+            try:
+                with stage("storage_check"):
+                    exists = await self._exists(key)
+            except Exception:
+                exists = False
+            if exists:
+                url = self.url_for(key)
+                self._remember(key, url)
+        if url is None:
+            return None
+        self.counters["skipped"] += 1
+        return self.attachment_url(url) if attachment else url
+
+    async def put(self, data, key: str, content_type: str, attachment: bool = False) -> StoredObject:
+        """
+        Store bytes or a seekable binary file under `key` and return its
+        URL; an existing key is not uploaded again. Raises StorageError.
+        """
+        size = _data_size(data)
+        url = await self.lookup(key, attachment)
+        if url is not None:
+            return StoredObject(key, url, size, True)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(max(1, self.concurrency))
+        async with self._semaphore:
+            self.counters["in_flight"] += 1
+            start = time.perf_counter()
+            try:
+                with stage("upload"):
+                    url = await self._upload(data, key, content_type, size)
+            except Exception as e:
+                self.counters["failed"] += 1
+                raise StorageError(f"{self.name} upload of {key} failed: {e}") from e
+            finally:
+                self.counters["in_flight"] -= 1
+            elapsed = time.perf_counter() - start
+        self.counters["uploads"] += 1
+        self.counters["bytes"] += size
+        self.counters["upload_seconds_total"] += elapsed
+        self.counters["upload_seconds_max"] = max(self.counters["upload_seconds_max"], elapsed)
+        self._remember(key, url)
+        return StoredObject(key, self.attachment_url(url) if attachment else url, size, False)
+
+    def attachment_url(self, url: str) -> str:
+        return url
+
+    def url_for(self, key: str) -> str:
+        raise NotImplementedError
+
+    async def _exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    async def _upload(self, data, key: str, content_type: str, size: int) -> str:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        uploads = self.counters["uploads"]
+        return {
+            "backend": self.name,
+            "concurrency": self.concurrency,
+            **self.counters,
+            "upload_seconds_avg": self.counters["upload_seconds_total"] / uploads if uploads else 0.0,
+            "known_keys": len(self._known),
+        }
+
+
+class LocalStorage(StorageBackend):
+    """
+    Files under `root`, served by the API itself at `base_url`.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str = LOCAL_STORAGE_DIR, base_url: str = LOCAL_STORAGE_URL, **kwargs):
+        super().__init__(**kwargs)
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+
+    def path_for(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(os.path.abspath(self.root) + os.sep):
+            raise StorageError(f"Invalid key {key!r}")
+        return path
+
+    def url_for(self, key: str) -> str:
+        return f"{self.base_url}/{urllib.parse.quote(key)}"
+
+    async def _exists(self, key: str) -> bool:
+        return os.path.exists(self.path_for(key))
+
+    def _write(self, data, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if hasattr(data, "read"):
+                    data.seek(0)
+                    for block in iter(lambda: data.read(1024 * 1024), b""):
+                        f.write(block)
+                else:
+                    f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    async def _upload(self, data, key: str, content_type: str, size: int) -> str:
+        await run_io(self._write, data, self.path_for(key))
+        return self.url_for(key)
+
+
+class CloudinaryStorage(StorageBackend):
+    """
+    Cloudinary uploads over the pooled session; mp3 clips go in as video
+    resources, everything else as raw files.
+    """
+
+    name = "cloudinary"
+
+    @staticmethod
+    def _resource(key: str, content_type: str = "") -> dict:
+        if content_type.startswith("audio/") or key.endswith(".mp3"):
+            public_id, _, fmt = key.rpartition(".")
+            return {"resource_type": "video", "public_id": public_id, "format": fmt}
+        return {"resource_type": "raw", "public_id": key}
+
+    def url_for(self, key: str) -> str:
+        resource = self._resource(key)
+        return cloudinary_utils().cloudinary_url(resource.pop("public_id"), secure=True, **resource)[0]
+
+    def attachment_url(self, url: str) -> str:
+        return url + "?fl_attachment"
+
+    async def _exists(self, key: str) -> bool:
+        # Delivery URLs of public resources answer HEAD without credentials
+        async with get_http_session().head(self.url_for(key), allow_redirects=True) as response:
+            return response.status == 200
+
+    async def _upload(self, data, key: str, content_type: str, size: int) -> str:
+        resource = self._resource(key, content_type)
+        resource.pop("format", None)
+        upload_result = await cloudinary_upload(
+            data,
+            overwrite=True,
+            type="upload",
+            **resource,
+        )
+        return upload_result.get("secure_url")
+
+
+def sigv4_headers(
+    method: str,
+    url: str,
+    payload_hash: str,
+    access_key: str,
+    secret_key: str,
+    region: str,
+    headers: Optional[dict] = None,
+    service: str = "s3",
+    now: Optional[datetime.datetime] = None,
+    ) -> dict:
+    """
+    AWS Signature Version 4 headers for one request. `url` must already be
+    percent-encoded; the returned headers include Authorization but not Host.
+    """
+    parts = urllib.parse.urlsplit(url)
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    signed = {k.lower(): " ".join(str(v).split()) for k, v in (headers or {}).items()}
+    signed.update({"host": parts.netloc, "x-amz-date": amz_date, "x-amz-content-sha256": payload_hash})
+    names = sorted(signed)
+    query = sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=True))
+    canonical_request = "\n".join([
+        method,
+        parts.path or "/",
+        "&".join(f"{urllib.parse.quote(k, safe='-_.~')}={urllib.parse.quote(v, safe='-_.~')}" for k, v in query),
+        "".join(f"{name}:{signed[name]}\n" for name in names),
+        ";".join(names),
+        payload_hash,
+    ])
+    scope = f"{amz_date[:8]}/{region}/{service}/aws4_request"
+    string_to_sign = "\n".join([
+        "AWS4-HMAC-SHA256",
+        amz_date,
+        scope,
+        hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+    ])
+    key = ("AWS4" + secret_key).encode("utf-8")
+    for part in (amz_date[:8], region, service, "aws4_request"):
+        key = hmac.new(key, part.encode("utf-8"), hashlib.sha256).digest()
+    signature = hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+    signed["authorization"] = (
+        f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, "
+        f"SignedHeaders={';'.join(names)}, Signature={signature}"
+    )
+    del signed["host"]
+    return signed
+
+
+def _xml_text(body: bytes, tag: str) -> Optional[str]:
+    for element in ElementTree.fromstring(body).iter():
+        if element.tag.rsplit("}", 1)[-1] == tag:
+            return element.text
+    return None
+
+
+class S3Storage(StorageBackend):
+    """
+    S3-compatible object store (AWS, MinIO, src/dev/fake_s3_server.py)
+    addressed path-style and signed with SigV4. Large objects are sent as
+    multipart uploads whose parts go out in parallel.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        endpoint: str = S3_ENDPOINT,
+        bucket: str = S3_BUCKET,
+        region: str = S3_REGION,
+        access_key: str = S3_ACCESS_KEY,
+        secret_key: str = S3_SECRET_KEY,
+        public_url: str = S3_PUBLIC_URL,
+        multipart_threshold: int = S3_MULTIPART_THRESHOLD,
+        part_size: int = S3_PART_SIZE,
+        part_concurrency: int = S3_PART_CONCURRENCY,
+        **kwargs,
+        ):
+        super().__init__(**kwargs)
+        self.endpoint = endpoint.rstrip("/")
+        self.bucket = bucket
+        self.region = region
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.public_url = (public_url or f"{self.endpoint}/{bucket}").rstrip("/")
+        self.multipart_threshold = multipart_threshold
+        self.part_size = part_size
+        self.part_concurrency = part_concurrency
+        self._part_semaphore = None
+        self.counters.update({"multipart_uploads": 0, "parts": 0})
+
+    def _object_url(self, key: str, query: str = "") -> str:
+        url = f"{self.endpoint}/{self.bucket}/{urllib.parse.quote(key, safe='/-_.~')}"
+        return f"{url}?{query}" if query else url
+
+    def url_for(self, key: str) -> str:
+        return f"{self.public_url}/{urllib.parse.quote(key, safe='/-_.~')}"
+
+    async def _request(self, method: str, url: str, body=b"", headers: Optional[dict] = None) -> tuple:
+        payload_hash = hashlib.sha256(body).hexdigest()
+        signed = sigv4_headers(
+            method, url, payload_hash, self.access_key, self.secret_key, self.region, headers,
+        )
+        async with get_http_session().request(method, URL(url, encoded=True), data=body, headers=signed) as response:
+            return response.status, response.headers, await response.read()
+
+    async def _exists(self, key: str) -> bool:
+        status, _, _ = await self._request("HEAD", self._object_url(key))
+        return status == 200
+
+    async def _upload(self, data, key: str, content_type: str, size: int) -> str:
+        if size > self.multipart_threshold:
+            await self._upload_multipart(data, key, content_type, size)
+        else:
+            if hasattr(data, "read"):
+                data.seek(0)
+                data = data.read()
+            status, _, body = await self._request(
+                "PUT", self._object_url(key), data, {"content-type": content_type},
+            )
+            if status != 200:
+                raise StorageError(f"PUT returned HTTP {status}: {body[:200]!r}")
+        return self.url_for(key)
+
+    async def _upload_multipart(self, data, key: str, content_type: str, size: int) -> None:
+        status, _, body = await self._request(
+            "POST", self._object_url(key, "uploads="), b"", {"content-type": content_type},
+        )
+        if status != 200:
+            raise StorageError(f"CreateMultipartUpload returned HTTP {status}: {body[:200]!r}")
+        upload_id = _xml_text(body, "UploadId")
+        upload_query = f"uploadId={urllib.parse.quote(upload_id, safe='')}"
+        if self._part_semaphore is None:
+            self._part_semaphore = asyncio.Semaphore(max(1, self.part_concurrency))
+        read_lock = asyncio.Lock()
+
+        async def read_part(offset: int) -> bytes:
+            if not hasattr(data, "read"):
+                return bytes(memoryview(data)[offset:offset + self.part_size])
+            async with read_lock:
+                data.seek(offset)
+                return data.read(self.part_size)
+
+        async def send_part(number: int, offset: int) -> str:
+            async with self._part_semaphore:
+                part = await read_part(offset)
+                status, headers, body = await self._request(
+                    "PUT", self._object_url(key, f"partNumber={number}&{upload_query}"), part,
+                )
+            if status != 200:
+                raise StorageError(f"UploadPart {number} returned HTTP {status}: {body[:200]!r}")
+            self.counters["parts"] += 1
+            return headers["ETag"]
+
+        offsets = range(0, size, self.part_size)
+        try:
+            etags = await asyncio.gather(*(
+                send_part(number, offset) for number, offset in enumerate(offsets, start=1)
+            ))
+            complete = "".join(
+                f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>"
+                for number, etag in enumerate(etags, start=1)
+            )
+            status, _, body = await self._request(
+                "POST",
+                self._object_url(key, upload_query),
+                f"<CompleteMultipartUpload>{complete}</CompleteMultipartUpload>".encode("utf-8"),
+                {"content-type": "application/xml"},
+            )
+            # S3 can report a failed completion inside a 200 response
+            if status != 200 or b"<Error>" in body:
+                raise StorageError(f"CompleteMultipartUpload returned HTTP {status}: {body[:200]!r}")
+        except BaseException:
+            try:
+                await self._request("DELETE", self._object_url(key, upload_query))
+            except Exception:
+                pass
+            raise
+        self.counters["multipart_uploads"] += 1
+
+    def stats(self) -> dict:
+        return {**super().stats(), "part_concurrency": self.part_concurrency}
+
+
+STORAGE_BACKENDS = {
+    "cloudinary": CloudinaryStorage,
+    "local": LocalStorage,
+    "s3": S3Storage,
+}
+
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    """
+    Process-wide backend selected by STORAGE_BACKEND.
+    """
+    global _storage
+    if _storage is None:
+        backend = STORAGE_BACKENDS.get(STORAGE_BACKEND)
+        if backend is None:
+            raise ValueError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r}, expected one of {sorted(STORAGE_BACKENDS)}")
+        _storage = backend()
+    return _storage
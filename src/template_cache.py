@@ -0,0 +1,99 @@
+import os
+import io
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from pptx import Presentation
+
+from src.utils import ppt_template
+
+
+# Number of distinct (path, mtime) templates kept warm per worker
+TEMPLATE_CACHE_SIZE = int(os.environ.get("TEMPLATE_CACHE_SIZE", 4))
+
+
+class _CachedTemplate:
+    """
+    One template kept in memory as raw bytes plus a parsed package that is
+    never handed out directly, only deep-copied.
+    """
+
+    def __init__(self, path: str, mtime_ns: int):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        with open(path, "rb") as f:
+            self.data = f.read()
+        prs = Presentation(io.BytesIO(self.data))
+        # Touch the lazily built objects so that copies start warm and the
+        # shared original is never mutated after this point.
+        for layout in prs.slide_layouts:
+            layout.placeholders
+        self.package = prs.part.package
+
+    def clone(self):
+        package = copy.deepcopy(self.package)
+        return package.presentation_part.presentation
+
+
+_cache: "OrderedDict[tuple, _CachedTemplate]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _get_cached(path: str) -> _CachedTemplate:
+    path = os.path.abspath(path)
+    key = (path, os.stat(path).st_mtime_ns)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+    cached = _CachedTemplate(path, key[1])
+    with _cache_lock:
+        # Drop stale versions of the same file, then bound the cache size
+        for old_key in [k for k in _cache if k[0] == path]:
+            del _cache[old_key]
+        _cache[key] = cached
+        while len(_cache) > TEMPLATE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return cached
+
+
+def new_presentation(path: str = ppt_template):
+    """
+    Return a fresh, independent Presentation for the template at `path`.
+    """
+    return _get_cached(path).clone()
+
+
+def template_bytes(path: str = ppt_template) -> bytes:
+    return _get_cached(path).data
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _file_digest(path: str, mtime_ns: int) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def template_digest(path: str = ppt_template) -> str:
+    """
+    sha256 of the template file, without parsing it.
+    """
+    path = os.path.abspath(path)
+    return _file_digest(path, os.stat(path).st_mtime_ns)
+
+
+def clear_template_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+def template_cache_info() -> list:
+    with _cache_lock:
+        return [
+            {"path": k[0], "mtime_ns": k[1], "size_bytes": len(v.data)}
+            for k, v in _cache.items()
+        ]
@@ -0,0 +1,189 @@
+import bisect
+from typing import List, NamedTuple, Sequence
+
+
+# Characters of the batch text a boundary event may skip before the word it
+# names (symbols read out differently, punctuation-only tokens, ...)
+BOUNDARY_SLACK = 32
+# Sentence ends added to notes that lack one, so slides never run together
+_SENTENCE_ENDS = ".!?;:…"
+
+# MPEG audio frame header tables, Layer III only
+_BITRATES_KBPS = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),  # MPEG-1
+    2: (22050, 24000, 16000),  # MPEG-2
+    0: (11025, 12000, 8000),   # MPEG-2.5
+}
+
+
+class Boundary(NamedTuple):
+    """
+    A word (or sentence) boundary event: where the engine spoke `text`, in
+    seconds from the start of the audio.
+    """
+    offset: float
+    duration: float
+    text: str
+
+
+class BoundaryMismatch(ValueError):
+    """
+    Raised when a batch's audio cannot be cut back into per-slide clips:
+    boundary events that do not match the text, a slide without events,
+    or audio that is not a stream of MPEG Layer III frames.
+    """
+
+
+class Mp3Frame(NamedTuple):
+    start: int
+    length: int
+    seconds: float
+
+
+def _id3_size(data: bytes) -> int:
+    # ID3v2 tag in front of the first frame: 10 byte header, synchsafe size
+    if len(data) >= 10 and data[:3] == b"ID3":
+        size = 0
+        for byte in data[6:10]:
+            size = size << 7 | byte & 0x7F
+        return 10 + size + (10 if data[5] & 0x10 else 0)
+    return 0
+
+
+def mp3_frames(data: bytes) -> List[Mp3Frame]:
+    """
+    The MPEG Layer III frames of `data`, which must follow each other
+    without gaps (as TTS engines stream them).
+    """
+    frames = []
+    pos = _id3_size(data)
+    while pos + 4 <= len(data):
+        b1, b2 = data[pos + 1], data[pos + 2]
+        version = b1 >> 3 & 0x3
+        if data[pos] != 0xFF or b1 & 0xE0 != 0xE0 or version == 1 or b1 >> 1 & 0x3 != 1:
+            raise BoundaryMismatch(f"no MPEG Layer III frame at byte {pos}")
+        bitrate_index, rate_index = b2 >> 4, b2 >> 2 & 0x3
+        if bitrate_index in (0, 15) or rate_index == 3:
+            raise BoundaryMismatch(f"unsupported MPEG frame header at byte {pos}")
+        bitrate = _BITRATES_KBPS[1 if version == 3 else 2][bitrate_index] * 1000
+        sample_rate = _SAMPLE_RATES[version][rate_index]
+        samples = 1152 if version == 3 else 576
+        length = samples // 8 * bitrate // sample_rate + (b2 >> 1 & 0x1)
+        frames.append(Mp3Frame(pos, length, samples / sample_rate))
+        pos += length
+    if not frames:
+        raise BoundaryMismatch("audio holds no MPEG frame")
+    return frames
+
+
+def split_mp3(data: bytes, cuts: Sequence[float]) -> List[bytes]:
+    """
+    Cut an mp3 stream at frame boundaries: clip k holds the frames that
+    start between cuts[k - 1] and cuts[k] seconds. Cuts should fall in
+    silence; Layer III frames may borrow bits from the frame before them,
+    so the first frame of a clip can decode as a few ms of silence.
+    """
+    frames = mp3_frames(data)
+    clips = [bytearray() for _ in range(len(cuts) + 1)]
+    elapsed = 0.0
+    for frame in frames:
+        clip = bisect.bisect_right(cuts, elapsed)
+        clips[clip] += data[frame.start:frame.start + frame.length]
+        elapsed += frame.seconds
+    return [bytes(clip) for clip in clips]
+
+
+def _normalized(text: str) -> str:
+    return "".join(ch for ch in text.casefold() if ch.isalnum())
+
+
+def batch_text(texts: Sequence[str]) -> str:
+    """
+    One TTS input for the notes of several slides, each ending a sentence
+    so the engine pauses between slides.
+    """
+    parts = []
+    for text in texts:
+        text = text.strip()
+        parts.append(text if text[-1:] in _SENTENCE_ENDS else text + ".")
+    return "\n\n".join(parts)
+
+
+def slide_spans(boundaries: Sequence[Boundary], texts: Sequence[str]) -> List[tuple]:
+    """
+    (start, end) seconds of each text's speech in a batch synthesized from
+    batch_text(texts), found by matching boundary events to the texts in
+    order. Raises BoundaryMismatch when the events do not account for every
+    text from its first word to its last.
+    """
+    normalized = [_normalized(text) for text in texts]
+    starts, ends, pos = [], [], 0
+    for norm in normalized:
+        starts.append(pos)
+        pos += len(norm)
+        ends.append(pos)
+    joined = "".join(normalized)
+    spans = [None] * len(texts)
+    covered = [None] * len(texts)
+    pos = 0
+    for boundary in boundaries:
+        token = _normalized(boundary.text)
+        if not token:
+            continue
+        found = joined.find(token, pos, pos + BOUNDARY_SLACK + len(token))
+        if found < 0:
+            raise BoundaryMismatch(f"boundary {boundary.text!r} does not follow the text at character {pos}")
+        index = bisect.bisect_right(starts, found) - 1
+        if found + len(token) > ends[index]:
+            raise BoundaryMismatch(f"boundary {boundary.text!r} spans two slides")
+        end = boundary.offset + boundary.duration
+        if spans[index] is None:
+            spans[index] = (boundary.offset, end)
+            covered[index] = (found, found + len(token))
+        else:
+            spans[index] = (spans[index][0], max(spans[index][1], end))
+            covered[index] = (covered[index][0], found + len(token))
+        pos = found + len(token)
+    for index, span in enumerate(spans):
+        if span is None:
+            raise BoundaryMismatch(f"no boundary events for text {index + 1} of the batch")
+        first, last = covered[index]
+        if first - starts[index] > BOUNDARY_SLACK or ends[index] - last > BOUNDARY_SLACK:
+            raise BoundaryMismatch(f"boundary events cover only part of text {index + 1} of the batch")
+        if index and span[0] < spans[index - 1][1]:
+            raise BoundaryMismatch(f"text {index + 1} of the batch starts before the previous one ends")
+    return spans
+
+
+def split_batch(audio: bytes, boundaries: Sequence[Boundary], texts: Sequence[str]) -> List[bytes]:
+    """
+    Cut the audio of batch_text(texts) into one mp3 clip per text, halfway
+    through the pause between consecutive texts. Raises BoundaryMismatch.
+    """
+    spans = slide_spans(boundaries, texts)
+    cuts = [(spans[i][1] + spans[i + 1][0]) / 2 for i in range(len(spans) - 1)]
+    clips = split_mp3(audio, cuts)
+    if not all(clips):
+        raise BoundaryMismatch("boundary events lie beyond the end of the audio")
+    return clips
+
+
+def plan_batches(texts: Sequence[str], max_chars: int) -> List[List[int]]:
+    """
+    Group consecutive texts (by index) into batches of at most `max_chars`
+    characters; a text longer than that is a batch of its own.
+    """
+    batches, current, size = [], [], 0
+    for index, text in enumerate(texts):
+        if current and size + len(text) + 2 > max_chars:
+            batches.append(current)
+            current, size = [], 0
+        current.append(index)
+        size += len(text) + 2
+    if current:
+        batches.append(current)
+    return batches
@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+TTS_CACHE_ENABLED = os.environ.get("TTS_CACHE_ENABLED", "1") != "0"
+TTS_CACHE_DIR = os.environ.get("TTS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ppt_tts_cache"))
+# Disk tier bound; least recently used clips are evicted beyond it
+TTS_CACHE_MAX_BYTES = int(os.environ.get("TTS_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+# In-memory tier bound; 0 disables the memory tier
+TTS_CACHE_MEMORY_BYTES = int(os.environ.get("TTS_CACHE_MEMORY_BYTES", 32 * 1024 * 1024))
+# How long an uploaded clip URL is reused before uploading again
+TTS_URL_TTL = int(os.environ.get("TTS_URL_TTL", 7 * 24 * 3600))
+
+
+def normalize_notes(text: str) -> str:
+    return " ".join(text.split())
+
+
+def cache_key(voice: str, text: str, params: Optional[dict] = None) -> str:
+    """
+    Content address of one synthesized clip.
+    """
+    payload = json.dumps(
+        {"voice": voice, "text": normalize_notes(text), "params": params or {}},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """
+    Content-addressed mp3 cache: a size-bounded LRU directory on disk with
+    an optional LRU memory tier in front of it. Uploaded URLs are kept in a
+    JSON sidecar next to each clip.
+    """
+
+    def __init__(
+        self,
+        directory: str = TTS_CACHE_DIR,
+        max_bytes: int = TTS_CACHE_MAX_BYTES,
+        memory_bytes: int = TTS_CACHE_MEMORY_BYTES,
+        url_ttl: int = TTS_URL_TTL,
+        ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self.url_ttl = url_ttl
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_size = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_size = 0
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "url_hits": 0,
+            "evictions": 0,
+        }
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _path(self, key: str, ext: str = ".mp3") -> str:
+        return os.path.join(self.directory, key + ext)
+
+    def _scan(self) -> None:
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".mp3"):
+                continue
+            st = os.stat(os.path.join(self.directory, name))
+            entries.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_size += size
+
+    def _remember(self, key: str, data: bytes) -> None:
+        if self.memory_bytes <= 0 or len(data) > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, old = self._memory.popitem(last=False)
+            self._memory_size -= len(old)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.counters["hits"] += 1
+                self.counters["memory_hits"] += 1
+                return data
+            on_disk = key in self._disk
+        data = None
+        if on_disk:
+            try:
+                with open(self._path(key), "rb") as f:
+                    data = f.read()
+                os.utime(self._path(key))
+            except OSError:
+                data = None
+        with self._lock:
+            if data is None:
+                self.counters["misses"] += 1
+                return None
+            if key in self._disk:
+                self._disk.move_to_end(key)
+            self.counters["hits"] += 1
+            self.counters["disk_hits"] += 1
+            self._remember(key, data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        evicted = []
+        with self._lock:
+            self._disk_size += len(data) - self._disk.pop(key, 0)
+            self._disk[key] = len(data)
+            self._remember(key, data)
+            while self._disk_size > self.max_bytes and len(self._disk) > 1:
+                old_key, size = self._disk.popitem(last=False)
+                self._disk_size -= size
+                self.counters["evictions"] += 1
+                evicted.append(old_key)
+        for old_key in evicted:
+            for ext in (".mp3", ".json"):
+                try:
+                    os.remove(self._path(old_key, ext))
+                except OSError:
+                    pass
+
+    def get_url(self, key: str, public_id: str) -> Optional[str]:
+        try:
+            with open(self._path(key, ".json"), "r", encoding="utf-8") as f:
+                urls = json.load(f)
+        except (OSError, ValueError):
+            return None
+        entry = urls.get(public_id)
+        if not entry or time.time() - entry.get("uploaded_at", 0) > self.url_ttl:
+            return None
+        with self._lock:
+            self.counters["url_hits"] += 1
+        return entry.get("url")
+
+    def put_url(self, key: str, public_id: str, url: str) -> None:
+        if not url:
+            return
+        path = self._path(key, ".json")
+        with self._lock:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    urls = json.load(f)
+            except (OSError, ValueError):
+                urls = {}
+            urls[public_id] = {"url": url, "uploaded_at": time.time()}
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(urls, f)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_ratio": self.counters["hits"] / lookups if lookups else 0.0,
+                "entries": len(self._disk),
+                "disk_bytes": self._disk_size,
+                "memory_bytes": self._memory_size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_tts_cache: Optional[TTSCache] = None
+_tts_cache_lock = threading.Lock()
+
+
+def get_tts_cache() -> Optional[TTSCache]:
+    """
+    The process-wide TTS cache, or None when TTS_CACHE_ENABLED=0.
+    """
+    global _tts_cache
+    if not TTS_CACHE_ENABLED:
+        return None
+    if _tts_cache is None:
+        with _tts_cache_lock:
+            if _tts_cache is None:
+                _tts_cache = TTSCache()
+    return _tts_cache
@@ -4,7 +4,9 @@ from datetime import datetime
 from pptx.dml.color import RGBColor
 from pptx.text.text import TextFrame
 from bs4 import BeautifulSoup
-from bs4.element import NavigableString, Tag
+from bs4.element import Tag
+from functools import lru_cache
+from typing import NamedTuple
 import json
 import yaml
 
@@ -13,6 +15,8 @@ ASSETS_DIR = 'assets'
 PPT_TEMPLATE = 'Oracle_PPT-template_FY26_blank.pptx'
 LAYOUT_TEMPLATE = 'layouts_template.yaml'
 PROMPT_TEMPLATE = 'prompt_template.txt'
+# Distinct HTML fragments kept compiled by compile_html
+HTML_CACHE_SIZE = int(os.environ.get("HTML_CACHE_SIZE", 4096))
 
 
 curdir = os.path.dirname(os.path.abspath(__file__))
@@ -30,10 +34,17 @@ def generate_timestamped_filename(
     filename = f"{name}_{timestamp}.{ext}"
     return os.path.join(save_location, filename)
 
+# libyaml's parser when PyYAML was built with it; several times faster on
+# layouts_template.yaml, which is parsed at every worker start
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+def safe_load_yaml(yaml_data: str):
+    return yaml.load(yaml_data, Loader=_YamlLoader)
+
 def load_layout_template() -> dict:
     with open(layout_template, "r",encoding="utf-8") as f:
         yaml_data = f.read()
-    layouts_template = yaml.safe_load(yaml_data)
+    layouts_template = safe_load_yaml(yaml_data)
     return layouts_template
 
 def load_prompt_template() -> str:
@@ -41,11 +52,12 @@ def load_prompt_template() -> str:
         prompt_str = f.read()
     return prompt_str
 
-def get_layouts() -> str:
+def get_layouts(layouts_template: dict | None = None) -> str:
     """
     Get the layouts template as text prompt.
     """
-    layouts_template = load_layout_template()
+    if layouts_template is None:
+        layouts_template = load_layout_template()
     layout_dict = {}
     for k,v in layouts_template.items():
         placeholder_dict = {}        
@@ -70,8 +82,9 @@ def get_layouts() -> str:
     layout_str = json.dumps(layout_dict, indent=4)
     return layout_str
 
-def get_reverse_index() -> dict:
-    layouts_template = load_layout_template()
+def get_reverse_index(layouts_template: dict | None = None) -> dict:
+    if layouts_template is None:
+        layouts_template = load_layout_template()
     reverse_index = {}
     for k,v in layouts_template.items():
         alias = v["alias"]
@@ -107,47 +120,96 @@ def parse_style(
             style_dict[k.strip()] = v.strip()
     return style_dict
 
-def process_html(
-    html: str, 
-    p:TextFrame.paragraphs
-    ) -> None:
+class RunSpec(NamedTuple):
+    """
+    One text run of a compiled HTML fragment.
+    """
+    text: str
+    bold: bool = False
+    italic: bool = False
+    underline: bool = False
+    color: tuple | None = None
+    link: str | None = None
+
+
+def _is_plain_text(html: str) -> bool:
+    # Without tags or entities, html.parser would return the string as is
+    return "<" not in html and "&" not in html
+
+
+@lru_cache(maxsize=HTML_CACHE_SIZE)
+def compile_html(
+    html: str
+    ) -> tuple:
+    """
+    Compile an HTML fragment into (paragraph level or None, run specs).
+
+    Results are immutable and memoized, so repeated bullets are parsed once.
+    """
+    if _is_plain_text(html):
+        return None, (RunSpec(html),)
+    level = None
+    runs = []
     soup = BeautifulSoup(html, 'html.parser')
     p_tag = soup.find('p')
     s_tag = soup.find('span')
     if not p_tag and not s_tag:
-        run = p.add_run()
-        run.text = soup.get_text()
+        runs.append(RunSpec(soup.get_text()))
     else:
         if p_tag:
             if p_tag.has_attr('level'):
-                p.level = int(p_tag.get('level'))                
+                level = int(p_tag.get('level'))
             p_tag.unwrap()
         if s_tag:
             for element in soup.contents:
-                run = p.add_run()
-                run.text = element.get_text()
-                if isinstance(element, NavigableString):
-                    pass
-                elif isinstance(element, Tag) and element.name == 'span':
-                    if element.has_attr('data-link'):
-                        run.hyperlink.address = element.get('data-link')
+                text = element.get_text()
+                if isinstance(element, Tag) and element.name == 'span':
+                    link = element.get('data-link') if element.has_attr('data-link') else None
+                    style_dict = {}
                     if element.has_attr('style'):
-                        style_str = element.get('style', '')
-                        style_dict = parse_style(style_str)
-                        #print(style_dict)
-                        if style_dict.get('font-weight') == 'bold':
-                            run.font.bold = True
-                            #print("bold")
-                        if style_dict.get('font-style') == 'italic':
-                            run.font.italic = True
-                        if style_dict.get('text-decoration') == 'underline':
-                            run.font.underline = True
-                            #print("underline")
-                        if style_dict.get('color'):
-                            hex_color = style_dict.get('color')
-                            run.font.color.rgb = RGBColor(*hex_to_rgb(hex_color))
-                    #print(p.text)
+                        style_dict = parse_style(element.get('style', ''))
+                    color = None
+                    if style_dict.get('color'):
+                        color = hex_to_rgb(style_dict.get('color'))
+                    runs.append(RunSpec(
+                        text,
+                        bold=style_dict.get('font-weight') == 'bold',
+                        italic=style_dict.get('font-style') == 'italic',
+                        underline=style_dict.get('text-decoration') == 'underline',
+                        color=color,
+                        link=link,
+                    ))
+                else:
+                    runs.append(RunSpec(text))
         else:
-            run = p.add_run()
-            run.text = soup.get_text()
-            
\ No newline at end of file
+            runs.append(RunSpec(soup.get_text()))
+    return level, tuple(runs)
+
+
+def apply_runs(
+    compiled: tuple,
+    p:TextFrame.paragraphs
+    ) -> None:
+    level, runs = compiled
+    if level is not None:
+        p.level = level
+    for spec in runs:
+        run = p.add_run()
+        run.text = spec.text
+        if spec.link:
+            run.hyperlink.address = spec.link
+        if spec.bold:
+            run.font.bold = True
+        if spec.italic:
+            run.font.italic = True
+        if spec.underline:
+            run.font.underline = True
+        if spec.color:
+            run.font.color.rgb = RGBColor(*spec.color)
+
+
+def process_html(
+    html: str, 
+    p:TextFrame.paragraphs
+    ) -> None:
+    apply_runs(compile_html(html), p)
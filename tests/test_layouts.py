@@ -0,0 +1,60 @@
+import unittest
+
+from pydantic import ValidationError
+
+from src.layouts import LayoutNotFoundError, get_registry
+from src.model import PresentationContent
+
+# Numbered variants missing from layouts_template.yaml, each one edit away
+# from a layout that exists
+UNKNOWN_VARIANTS = [
+    "Speaker_5",
+    "Speaker_7",
+    "Title/Cover_2",
+    "Title/Cover_11",
+    "Divider_11",
+    "Title/Subtitle with 5 blocks",
+    "Title with 2 blocks",
+    "Title 9",
+]
+
+
+class ResolveLayoutTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = get_registry()
+
+    def test_unknown_numbered_variants_are_not_matched(self):
+        for name in UNKNOWN_VARIANTS:
+            with self.subTest(name=name):
+                self.assertIsNone(self.registry.resolve_layout(name))
+                with self.assertRaises(LayoutNotFoundError):
+                    self.registry.require_layout(name)
+
+    def test_unknown_numbered_variants_fail_validation(self):
+        # What /generate_presentation turns into a 422
+        for name in UNKNOWN_VARIANTS:
+            with self.subTest(name=name):
+                deck = {
+                    "filename": "deck",
+                    "theme_mode": "light",
+                    "slides": [{"slide_number": 1, "layout": name, "placeholders": []}],
+                }
+                with self.assertRaises(ValidationError) as caught:
+                    PresentationContent.model_validate(deck, context={"registry": self.registry})
+                self.assertIn("not recognized", str(caught.exception))
+
+    def test_lenient_names_still_resolve(self):
+        for name, layout in [
+            ("Speaker_6", "Speaker_6"),
+            ("speaker 6", "Speaker_6"),
+            ("Title_Cover_9", "Title/Cover_9"),
+            ("Speker_6", "Speaker_6"),
+            ("Titel/Cover_9", "Title/Cover_9"),
+            ("Title/Subtitle with 2 block", "Title/Subtitle with 2 blocks"),
+        ]:
+            with self.subTest(name=name):
+                self.assertEqual(self.registry.resolve_layout(name), layout)
+
+
+if __name__ == "__main__":
+    unittest.main()